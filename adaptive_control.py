@@ -0,0 +1,113 @@
+"""Feedback controller that adapts capture rate and quality to measured latency."""
+import threading
+from typing import Dict, Optional
+import config
+
+
+# Upload widths and JPEG qualities, best first
+WIDTH_STEPS = [1280, 960, 640, 480]
+QUALITY_STEPS = [0.85, 0.75, 0.65, 0.5]
+
+
+class CaptureController:
+    """
+    AIMD controller for one session's capture parameters.
+
+    Latency above the target backs off multiplicatively (longer frame
+    interval, and smaller/lower-quality uploads when the network share of
+    the round trip dominates); latency comfortably below target recovers
+    additively. The frame interval never drops below what the session's
+    analysis budget allows.
+    """
+
+    def __init__(self, target_latency: Optional[float] = None):
+        """
+        Initialize capture controller.
+
+        Args:
+            target_latency: Target round-trip latency per frame, in seconds
+        """
+        self.target_latency = target_latency or config.Config.TARGET_LATENCY_MS / 1000.0
+        self.min_interval = max(
+            config.Config.CAPTURE_INTERVAL_MIN_MS,
+            60000.0 / config.Config.SESSION_ANALYSES_PER_MINUTE
+        )
+        self.max_interval = config.Config.CAPTURE_INTERVAL_MAX_MS
+        self.interval_ms = max(self.min_interval, config.Config.CAPTURE_INTERVAL_MS)
+        self.width_step = 0
+        self.quality_step = 0
+        self.face_interval = config.Config.FACE_DETECTION_INTERVAL
+        self.service_latency = None
+        self.round_trip_latency = None
+        self.lock = threading.Lock()
+
+    def observe(self, service_time: float, round_trip: Optional[float] = None):
+        """
+        Feed one latency measurement into the controller.
+
+        Args:
+            service_time: Server-side analysis time in seconds
+            round_trip: Client-measured round trip of the previous frame in seconds
+        """
+        with self.lock:
+            self.service_latency = self._smooth(self.service_latency, service_time)
+            if round_trip is not None:
+                self.round_trip_latency = self._smooth(self.round_trip_latency, round_trip)
+
+            latency = self.round_trip_latency or self.service_latency
+            network_time = latency - self.service_latency
+
+            if latency > self.target_latency:
+                self.interval_ms = min(self.max_interval, self.interval_ms * 1.5)
+                self.face_interval = min(config.Config.FACE_DETECTION_INTERVAL * 4, self.face_interval * 2)
+                # Shrink uploads only when transfer, not analysis, is the bottleneck
+                if network_time > self.service_latency:
+                    self._degrade_upload()
+            elif latency < self.target_latency * 0.7:
+                self.interval_ms = max(self.min_interval, self.interval_ms - 100)
+                self.face_interval = max(config.Config.FACE_DETECTION_INTERVAL, self.face_interval // 2)
+                self._restore_upload()
+
+    def on_shed(self):
+        """Back off after the server refused a frame because it was saturated."""
+        with self.lock:
+            self.interval_ms = min(self.max_interval, self.interval_ms * 2)
+
+    def frame_stride(self, source_fps: float = 30.0) -> int:
+        """Convert the frame interval to a stride for a camera running at source_fps."""
+        return max(1, round(self.interval_ms / (1000.0 / source_fps)))
+
+    def params(self) -> Dict:
+        """Get the capture parameters to advertise to the client."""
+        return {
+            'interval_ms': int(self.interval_ms),
+            'max_width': WIDTH_STEPS[self.width_step],
+            'jpeg_quality': QUALITY_STEPS[self.quality_step],
+            'face_interval': self.face_interval
+        }
+
+    def get_stats(self) -> Dict:
+        """Get controller state including smoothed latencies."""
+        stats = self.params()
+        stats['service_latency_ms'] = round(self.service_latency * 1000) if self.service_latency else None
+        stats['round_trip_latency_ms'] = round(self.round_trip_latency * 1000) if self.round_trip_latency else None
+        stats['target_latency_ms'] = round(self.target_latency * 1000)
+        return stats
+
+    def _smooth(self, current: Optional[float], sample: float) -> float:
+        """Exponentially weighted moving average."""
+        return sample if current is None else 0.7 * current + 0.3 * sample
+
+    def _degrade_upload(self):
+        """Lower JPEG quality first, then resolution."""
+        if self.quality_step < len(QUALITY_STEPS) - 1:
+            self.quality_step += 1
+        elif self.width_step < len(WIDTH_STEPS) - 1:
+            self.width_step += 1
+
+    def _restore_upload(self):
+        """Raise resolution first, then JPEG quality."""
+        if self.width_step > 0:
+            self.width_step -= 1
+        elif self.quality_step > 0:
+            self.quality_step -= 1
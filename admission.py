@@ -0,0 +1,82 @@
+"""Admission control and load shedding for frame analysis."""
+import math
+import threading
+from typing import Dict, Optional
+import config
+
+
+class AdmissionController:
+    """
+    Decide whether a new analysis may start right now.
+
+    Tracks the number of analyses in flight and an exponentially weighted
+    average of backend service time. Requests beyond the limit are rejected
+    immediately instead of queueing, so latency of admitted requests stays
+    bounded. When the backend slows down past the latency budget, the
+    concurrency limit shrinks proportionally (Little's law).
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, latency_budget: Optional[float] = None):
+        """
+        Initialize admission controller.
+
+        Args:
+            max_in_flight: Maximum concurrent analyses
+            latency_budget: Target service time for an admitted analysis, in seconds
+        """
+        self.max_in_flight = max_in_flight or config.Config.ANALYSIS_MAX_IN_FLIGHT
+        self.latency_budget = latency_budget or config.Config.ANALYSIS_LATENCY_BUDGET_MS / 1000.0
+        self.in_flight = 0
+        self.service_time = self.latency_budget / 2  # Optimistic initial estimate
+        self.lock = threading.Lock()
+        self.admitted_count = 0
+        self.shed_count = 0
+        self.expired_count = 0
+
+    def current_limit(self) -> int:
+        """Get the concurrency limit given the current service-time estimate."""
+        if self.service_time <= self.latency_budget:
+            return self.max_in_flight
+        return max(1, math.floor(self.max_in_flight * self.latency_budget / self.service_time))
+
+    def try_admit(self) -> bool:
+        """Reserve an analysis slot. Returns False if the pipeline is saturated."""
+        with self.lock:
+            if self.in_flight >= self.current_limit():
+                self.shed_count += 1
+                return False
+            self.in_flight += 1
+            self.admitted_count += 1
+            return True
+
+    def release(self, service_time: Optional[float] = None):
+        """
+        Release an analysis slot.
+
+        Args:
+            service_time: Measured analysis time in seconds (None if it failed early)
+        """
+        with self.lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if service_time is not None:
+                self.service_time = 0.8 * self.service_time + 0.2 * service_time
+
+    def record_expired(self):
+        """Count a frame dropped for exceeding the freshness deadline."""
+        with self.lock:
+            self.expired_count += 1
+
+    def retry_after(self) -> int:
+        """Suggested seconds before a rejected client retries."""
+        return max(1, math.ceil(self.service_time))
+
+    def get_stats(self) -> Dict:
+        """Get admission statistics."""
+        return {
+            'in_flight': self.in_flight,
+            'limit': self.current_limit(),
+            'estimated_service_ms': round(self.service_time * 1000),
+            'admitted': self.admitted_count,
+            'shed': self.shed_count,
+            'expired': self.expired_count
+        }
@@ -0,0 +1,464 @@
+"""Vision pipeline for one encoded frame, shared by the web app and analysis workers.
+
+The pipeline runs either as one pass ('full') or as two lanes: the 'fast'
+lane detects objects and obstacles only, so warnings are not held up by
+slower calls; the 'slow' lane adds the scene description, OCR text and faces.
+"""
+import importlib
+from typing import Callable, Collection, Dict, FrozenSet, List, Optional, Tuple
+import config
+import metrics
+
+
+# VISION_BACKEND name -> (module, class)
+VISION_BACKENDS = {
+    'azure': ('azure_vision', 'AzureVisionService'),
+    'azure_secondary': ('azure_vision', 'AzureVisionService'),  # Second region, for hedging
+    'azure_unified': ('azure_rest', 'AzureUnifiedVisionService'),  # Image Analysis 4.0, one call per frame
+    'azure_rest': ('azure_rest', 'AzureVisionRestService'),  # v3.2 calls without the SDK (AZURE_CLIENT=rest)
+    'detectron2': ('detectron2_vision', 'Detectron2VisionService')
+}
+
+LANES = ('full', 'fast', 'slow')
+
+# Result fields a caller can ask for (the 'features' parameter); None means all of them
+FEATURES = ('objects', 'obstacles', 'description', 'tags', 'categories', 'text', 'faces')
+SCENE_FEATURES = frozenset(('objects', 'obstacles', 'description', 'tags', 'categories'))  # From analyze_image
+FAST_LANE_FEATURES = frozenset(('objects', 'obstacles'))
+DESCRIBE_FEATURES = frozenset(('description', 'tags', 'categories'))  # From describe_scene
+SLOW_LANE_FEATURES = DESCRIBE_FEATURES | {'text', 'faces'}
+
+
+def parse_features(value: Optional[str]) -> Optional[FrozenSet[str]]:
+    """
+    Parse a comma-separated list of FEATURES.
+
+    Args:
+        value: e.g. 'objects,obstacles'; None or empty for all features
+
+    Returns:
+        The requested features, or None for all
+
+    Raises:
+        ValueError: If a name is not one of FEATURES
+    """
+    if not value or not value.strip():
+        return None
+    features = frozenset(name.strip().lower() for name in value.split(',') if name.strip())
+    unknown = features - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(sorted(unknown))} (expected some of {', '.join(FEATURES)})")
+    return features
+
+
+def wants(features: Optional[Collection[str]], *names: str) -> bool:
+    """Check whether any of the named features is requested (None requests all)."""
+    return features is None or any(name in features for name in names)
+
+
+def subset(features: Optional[Collection[str]], group: FrozenSet[str]) -> Optional[FrozenSet[str]]:
+    """
+    Restrict requested features to one backend call's group.
+
+    Returns:
+        None if the whole group is wanted, else the wanted part of it
+        (empty if the call can be skipped)
+    """
+    if features is None:
+        return None
+    wanted = group.intersection(features)
+    return None if wanted == group else wanted
+
+
+def select_fields(result: Dict, features: Optional[Collection[str]]) -> Dict:
+    """Drop result fields that were not requested (other keys, such as 'error', are kept)."""
+    if features is None:
+        return result
+    return {k: v for k, v in result.items() if k in features or k not in FEATURES}
+
+
+def create_vision_service(backend: str = None):
+    """
+    Construct the configured vision backend.
+
+    The Azure backends use Image Analysis 4.0 (one call per frame) instead of
+    the v3.2 API when AZURE_UNIFIED_ANALYSIS allows and the endpoint
+    supports it, and make the v3.2 calls over plain REST if AZURE_CLIENT
+    is 'rest'.
+
+    Args:
+        backend: Key of VISION_BACKENDS (defaults to Config.VISION_BACKEND)
+    """
+    backend = backend or config.Config.VISION_BACKEND
+    if backend not in VISION_BACKENDS:
+        raise ValueError(f"Unknown vision backend '{backend}' (expected one of {', '.join(VISION_BACKENDS)})")
+    module_name, class_name = VISION_BACKENDS[backend]
+    kwargs = {}
+    if backend == 'azure_secondary':
+        kwargs = {
+            'endpoint': config.Config.AZURE_COMPUTER_VISION_SECONDARY_ENDPOINT,
+            'key': config.Config.AZURE_COMPUTER_VISION_SECONDARY_KEY
+        }
+        if not kwargs['endpoint'] or not kwargs['key']:
+            raise ValueError("Secondary Azure Computer Vision region not configured")
+    if backend in ('azure', 'azure_secondary'):
+        if use_unified_analysis(**kwargs):
+            module_name, class_name = VISION_BACKENDS['azure_unified']
+        elif config.Config.AZURE_CLIENT == 'rest':
+            module_name, class_name = VISION_BACKENDS['azure_rest']
+    return getattr(importlib.import_module(module_name), class_name)(**kwargs)
+
+
+def use_unified_analysis(endpoint: Optional[str] = None, key: Optional[str] = None) -> bool:
+    """Check AZURE_UNIFIED_ANALYSIS ('auto' probes the endpoint once)."""
+    mode = config.Config.AZURE_UNIFIED_ANALYSIS.lower()
+    if mode == 'auto':
+        if not (key or config.Config.AZURE_COMPUTER_VISION_KEY):
+            return False
+        from azure_rest import probe_unified_analysis
+        return probe_unified_analysis(endpoint, key)
+    return mode == 'true'
+
+
+def create_face_service():
+    """Construct the Azure Face service, through the SDK or plain REST (AZURE_CLIENT)."""
+    if config.Config.AZURE_CLIENT == 'rest':
+        from azure_rest import AzureFaceRestService
+        return AzureFaceRestService()
+    from azure_vision import AzureFaceService
+    return AzureFaceService()
+
+
+def create_services(backend: str = None) -> Tuple[object, object]:
+    """
+    Construct the vision backend (hedged if configured) and face service for a
+    process that runs the pipeline outside the web app.
+
+    Args:
+        backend: Key of VISION_BACKENDS (defaults to Config.VISION_BACKEND)
+
+    Returns:
+        (vision_service, face_service) - face_service is None if unavailable
+    """
+    backend = backend or config.Config.VISION_BACKEND
+    vision_service = create_vision_service(backend)
+    if config.Config.VISION_HEDGE_BACKENDS:
+        from hedging import create_hedged_service
+        vision_service = create_hedged_service(backend, vision_service)
+    face_service = None
+    try:
+        face_service = create_face_service()
+    except Exception as e:
+        print(f"Face service not available: {e}")
+    return vision_service, face_service
+
+
+def vision_backend_class(backend: str = None) -> str:
+    """Get the class name of a vision backend without importing it."""
+    return VISION_BACKENDS[backend or config.Config.VISION_BACKEND][1]
+
+
+def _direct_call(call: str, func: Callable, *args):
+    return func(*args)
+
+
+def read_in_analysis(vision_service, image_bytes: bytes, features: Optional[Collection[str]] = None) -> bool:
+    """
+    Decide whether to ask a backend that reads text in its analysis call
+    (reads_text, e.g. Image Analysis 4.0) for OCR in that call.
+
+    The OCR gate still applies: a frame where the local detector finds no
+    text is not read. There is no separate request to crop, so frames with
+    text are read whole.
+
+    Returns:
+        True to add 'text' to the analysis call's features
+    """
+    if not wants(features, 'text') or not getattr(vision_service, 'reads_text', False):
+        return False
+    if not config.Config.OCR_GATE_ENABLED:
+        return True
+    from text_detector import has_text  # Imports cv2, so only on first use
+    found = has_text(image_bytes)
+    metrics.OCR_GATE_DECISIONS.inc(decision='full' if found else 'skip')
+    return found
+
+
+def with_text(features: Optional[FrozenSet[str]], group: FrozenSet[str], read: bool) -> Optional[FrozenSet[str]]:
+    """Add 'text' to a call's features (see subset()) if text is read in that call."""
+    if not read:
+        return features
+    return (group if features is None else features) | {'text'}
+
+
+def read_text_gated(vision_service, image_bytes: bytes, call: Callable = _direct_call) -> Dict:
+    """
+    Run OCR on a frame only where the local text detector finds text.
+
+    Frames without text skip OCR; otherwise only a mosaic of the text
+    regions is sent and line bounding boxes are mapped back to the frame
+    (see text_detector.prepare_ocr).
+
+    Args:
+        vision_service: Vision backend (read_text)
+        image_bytes: Encoded image
+        call: Wrapper used for each backend call (see analyze_frame_bytes)
+
+    Returns:
+        OCR result with 'text' and 'lines', or 'error'
+    """
+    from text_detector import prepare_ocr, map_lines  # Imports cv2, so only on first use
+    decision, ocr_bytes, placements, scale = prepare_ocr(image_bytes)
+    metrics.OCR_GATE_DECISIONS.inc(decision=decision)
+    metrics.OCR_BYTES.inc(len(image_bytes), kind='frame')
+    if decision == 'skip':
+        return {'text': '', 'lines': []}
+
+    metrics.OCR_BYTES.inc(len(ocr_bytes), kind='sent')
+    text_result = call('read_text', vision_service.read_text, ocr_bytes)
+    if placements and text_result.get('lines'):
+        text_result['lines'] = map_lines(text_result['lines'], placements, scale)
+    return text_result
+
+
+def detect_faces_gated(face_service, image_bytes: bytes, call: Callable = _direct_call,
+                       face_tracker=None) -> List[Dict]:
+    """
+    Detect faces, calling the Face API only for new faces found locally.
+
+    A local pre-detector looks for faces first. Frames without faces skip
+    the Face API. Faces the tracker has already identified are reported from
+    the tracker at their current position. Only crops of the remaining faces
+    are sent, and their positions are mapped back to the frame. Without a
+    pre-detector, the whole frame is sent.
+
+    Args:
+        face_service: Face backend (detect_faces)
+        image_bytes: Encoded image
+        call: Wrapper used for each backend call (see analyze_frame_bytes)
+        face_tracker: The session's face_predetector.FaceTracker, or None
+            to treat every face as new
+
+    Returns:
+        Detected faces (see AzureFaceService.detect_faces)
+    """
+    from face_predetector import CROP_PADDING, get_face_predetector  # Imports cv2, so only on first use
+    predetector = get_face_predetector()
+    if predetector is None:
+        metrics.FACE_GATE_DECISIONS.inc(decision='full')
+        return call('detect_faces', face_service.detect_faces, image_bytes)
+
+    import cv2
+    from image_utils import build_mosaic, decode_image, find_placement, map_box, pad_box, scale_box
+    frame, scale = decode_image(image_bytes, config.Config.DECODE_MIN_SIZE)
+    if frame is None:
+        return call('detect_faces', face_service.detect_faces, image_bytes)
+    # Tracks and reported positions are in original image coordinates; crops come from the decoded frame
+    boxes = [scale_box(box, 1 / scale) for box in predetector.detect(frame)]
+    if not boxes:
+        metrics.FACE_GATE_DECISIONS.inc(decision='skip')
+        return []
+
+    if face_tracker is not None:
+        tracks = face_tracker.update(boxes)
+        pending = [t for t in tracks if face_tracker.needs_check(t)]
+    else:
+        tracks = pending = [{'box': box, 'face': None} for box in boxes]
+    if not pending:
+        metrics.FACE_GATE_DECISIONS.inc(decision='tracked')
+    else:
+        metrics.FACE_GATE_DECISIONS.inc(decision='cropped')
+        crops = [pad_box(box, int(max(box[2:]) * CROP_PADDING), frame.shape)
+                 for box in (scale_box(t['box'], scale) for t in pending)]
+        mosaic, placements = build_mosaic(frame, crops, spacing=32, min_size=64, fill=0)
+        mosaic_bytes = cv2.imencode('.jpg', mosaic, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+        metrics.FACE_BYTES.inc(len(image_bytes), kind='frame')
+        metrics.FACE_BYTES.inc(len(mosaic_bytes), kind='sent')
+
+        try:
+            detected = call('detect_faces', face_service.detect_faces, mosaic_bytes, True)
+        except Exception:
+            # Already logged by the service. The tracks stay unchecked, so the next frame retries them
+            detected = None
+            pending = []
+
+        # One Face API result per crop; a crop without one was a false alarm
+        found = {}
+        for face in detected or []:
+            p = face['position']
+            box = (p['x'], p['y'], p['width'], p['height'])
+            index = find_placement(box[0] + box[2] / 2, box[1] + box[3] / 2, placements)
+            if index is not None and index not in found:
+                found[index] = dict(face, position=_position(scale_box(map_box(box, placements), 1 / scale)))
+        for index, track in enumerate(pending):
+            if face_tracker is not None:
+                face_tracker.record(track, found.get(index))
+            else:
+                track['face'] = found.get(index)
+
+    # Faces identified earlier are reported where the pre-detector sees them now
+    fresh = {id(t) for t in pending}
+    return [
+        t['face'] if id(t) in fresh else dict(t['face'], position=_position(t['box']))
+        for t in tracks if t['face']
+    ]
+
+
+def _position(box) -> Dict:
+    x, y, w, h = box
+    return {'x': int(x), 'y': int(y), 'width': int(w), 'height': int(h)}
+
+
+def analyze_frame_bytes(vision_service, face_service, image_bytes: bytes, want_faces: bool,
+                        call: Callable = _direct_call, face_tracker=None,
+                        features: Optional[Collection[str]] = None) -> Tuple[Dict, bool]:
+    """
+    Run scene analysis, OCR and (optionally) face detection on one frame.
+
+    Only the steps needed for the requested features run: scene analysis
+    asks the backend for just those fields, and OCR and face detection are
+    skipped unless 'text' and 'faces' are requested.
+
+    Args:
+        vision_service: Vision backend (analyze_image, read_text)
+        face_service: Face backend, or None
+        image_bytes: Encoded image
+        want_faces: Whether to run face detection on this frame
+        call: Wrapper used for each backend call as call(name, func, *args),
+            e.g. to record metrics
+        face_tracker: The session's face_predetector.FaceTracker, so only
+            new faces are sent to the Face API
+        features: Result fields to produce (see FEATURES); None for all
+
+    Returns:
+        (analysis, complete) - analysis contains 'error' if scene analysis
+        failed; complete is False if any step failed, so the result should
+        not be cached
+    """
+    analysis = _analyze_scene(vision_service, image_bytes, 'analyze_image', SCENE_FEATURES, call, features)
+    if 'error' in analysis:
+        return analysis, False
+    extras, complete = analyze_text_and_faces(vision_service, face_service, image_bytes, want_faces, call,
+                                              face_tracker, features)
+    analysis.update(extras)
+    return analysis, complete
+
+
+def analyze_fast_lane(vision_service, image_bytes: bytes, call: Callable = _direct_call,
+                      features: Optional[Collection[str]] = None) -> Tuple[Dict, bool]:
+    """
+    Detect objects and obstacles on one frame.
+
+    Args:
+        vision_service: Vision backend (detect_obstacles)
+        image_bytes: Encoded image
+        call: Wrapper used for each backend call (see analyze_frame_bytes)
+        features: Result fields to produce (see FEATURES); None for all
+
+    Returns:
+        (result, complete) - result has 'objects' and 'obstacles' (those
+        requested), or 'error'
+    """
+    if not wants(features, *FAST_LANE_FEATURES):
+        return {}, True
+    result = call('detect_obstacles', vision_service.detect_obstacles, image_bytes)
+    return select_fields(result, features), 'error' not in result
+
+
+def analyze_slow_lane(vision_service, face_service, image_bytes: bytes, want_faces: bool,
+                      call: Callable = _direct_call, objects: Optional[List[Dict]] = None,
+                      face_tracker=None, features: Optional[Collection[str]] = None) -> Tuple[Dict, bool]:
+    """
+    Describe the scene, read text and (optionally) detect faces on one frame.
+
+    Args:
+        vision_service: Vision backend (describe_scene, read_text)
+        face_service: Face backend, or None
+        image_bytes: Encoded image
+        want_faces: Whether to run face detection on this frame
+        call: Wrapper used for each backend call (see analyze_frame_bytes)
+        objects: Objects found by the fast lane, for backends that describe
+            the scene from them
+        face_tracker: See analyze_frame_bytes
+        features: See analyze_frame_bytes
+
+    Returns:
+        (enrichment, complete) - as for analyze_frame_bytes()
+    """
+    enrichment = _analyze_scene(vision_service, image_bytes, 'describe_scene', DESCRIBE_FEATURES, call, features,
+                                objects)
+    if 'error' in enrichment:
+        return enrichment, False
+    extras, complete = analyze_text_and_faces(vision_service, face_service, image_bytes, want_faces, call,
+                                              face_tracker, features)
+    enrichment.update(extras)
+    return enrichment, complete
+
+
+def _analyze_scene(vision_service, image_bytes: bytes, name: str, group: FrozenSet[str], call: Callable,
+                   features: Optional[Collection[str]], *args) -> Dict:
+    """
+    Run a scene call (analyze_image or describe_scene) for the requested part of its group.
+
+    The call also reads text if read_in_analysis() says so, and is skipped
+    if nothing it returns is wanted.
+
+    Returns:
+        The call's result ({} if skipped), or 'error'
+    """
+    read = read_in_analysis(vision_service, image_bytes, features)
+    if not read and not wants(features, *group):
+        return {}
+    return call(name, getattr(vision_service, name), image_bytes, *args,
+                with_text(subset(features, group), group, read))
+
+
+def analyze_text_and_faces(vision_service, face_service, image_bytes: bytes, want_faces: bool,
+                           call: Callable = _direct_call, face_tracker=None,
+                           features: Optional[Collection[str]] = None) -> Tuple[Dict, bool]:
+    """
+    Read text (unless the scene call did) and detect faces on one frame.
+
+    The OCR and face gates apply (see read_text_gated and detect_faces_gated).
+    Both the combined pass and the slow lane finish with this step.
+
+    Args:
+        See analyze_frame_bytes
+
+    Returns:
+        (result, complete) - result has 'text' and 'faces' where found;
+        complete is False if OCR failed
+    """
+    result = {}
+    text_result = {}
+    if wants(features, 'text') and not getattr(vision_service, 'reads_text', False):
+        text_result = read_text_gated(vision_service, image_bytes, call)
+        if text_result.get('text'):
+            result['text'] = text_result['text']
+
+    if want_faces and wants(features, 'faces') and face_service and face_service.client:
+        try:
+            faces = detect_faces_gated(face_service, image_bytes, call, face_tracker)
+            if faces:
+                result['faces'] = faces
+        except Exception:
+            pass  # Face detection is optional
+
+    return result, 'error' not in text_result
+
+
+def analyze_lane(lane: str, vision_service, face_service, image_bytes: bytes, want_faces: bool,
+                 call: Callable = _direct_call, objects: Optional[List[Dict]] = None,
+                 face_tracker=None, features: Optional[Collection[str]] = None) -> Tuple[Dict, bool]:
+    """
+    Run one lane of the pipeline ('full', 'fast' or 'slow').
+
+    Returns:
+        (analysis, complete)
+    """
+    if lane == 'fast':
+        return analyze_fast_lane(vision_service, image_bytes, call, features)
+    if lane == 'slow':
+        return analyze_slow_lane(vision_service, face_service, image_bytes, want_faces, call, objects,
+                                 face_tracker, features)
+    return analyze_frame_bytes(vision_service, face_service, image_bytes, want_faces, call, face_tracker, features)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Analysis worker: runs the vision pipeline for frames queued by the web tier.
+
+Usage:
+    python analysis_worker.py [--backend azure|detectron2] [--threads N] [--processes N]
+
+Start as many workers, on as many machines, as the broker's desired_workers
+signal (/api/status, navassist_job_workers_desired) asks for. Use threads for
+the network-bound Azure backend and processes for the CPU-bound Detectron2
+backend.
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import config
+import job_queue
+from analysis_pipeline import analyze_lane, create_services
+
+
+class AnalysisWorker:
+    """Takes jobs from the broker and returns analysis results."""
+
+    def __init__(self, backend: str, threads: int, address: str = None):
+        """
+        Initialize worker.
+
+        Args:
+            backend: Vision backend to run (key of analysis_pipeline.VISION_BACKENDS)
+            threads: Jobs processed concurrently
+            address: Broker 'host:port'
+        """
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.backend = backend
+        self.threads = threads
+        self.address = address
+        self.vision_service, self.face_service = create_services(backend)
+        self.manager = job_queue.connect(address)
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.processed = 0
+        self.expired = 0
+        self.failed = 0
+        self.service_time_total = 0.0
+
+    def run(self):
+        """Process jobs until stopped."""
+        print(f"[Worker {self.worker_id}] Running {self.backend} backend with {self.threads} threads")
+        runners = [threading.Thread(target=self._run_jobs, daemon=True) for _ in range(self.threads)]
+        for runner in runners:
+            runner.start()
+        broker = self.manager.broker()
+        while not self.stop_event.is_set():
+            try:
+                broker.heartbeat(self.worker_id, self.get_stats())
+            except Exception as e:
+                print(f"[Worker {self.worker_id}] Heartbeat failed: {e}")
+            self.stop_event.wait(job_queue.WORKER_HEARTBEAT_INTERVAL)
+
+    def _run_jobs(self):
+        """Job loop for one thread (each thread has its own broker connection)."""
+        jobs = self.manager.job_queue()
+        reply_queues = {}
+        while not self.stop_event.is_set():
+            try:
+                job = jobs.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except Exception as e:
+                print(f"[Worker {self.worker_id}] Job queue error: {e}")
+                time.sleep(1.0)
+                continue
+
+            started = time.time()
+            reply = {'job_id': job['job_id'], 'worker': self.worker_id, 'queue_wait': started - job['enqueued_at']}
+            if started >= job['deadline']:
+                # Nobody is waiting for this result any more
+                reply['status'] = 'expired'
+                with self.lock:
+                    self.expired += 1
+            else:
+                with self.lock:
+                    self.busy += 1
+                try:
+                    analysis, complete = analyze_lane(
+                        job.get('lane', 'full'), self.vision_service, self.face_service,
+                        job['image'], job['want_faces'], features=job.get('features')
+                    )
+                    reply.update(status='ok', analysis=analysis, complete=complete)
+                except Exception as e:
+                    reply.update(status='error', error=str(e))
+                    with self.lock:
+                        self.failed += 1
+                finally:
+                    service_time = time.time() - started
+                    reply['service_time'] = service_time
+                    with self.lock:
+                        self.busy -= 1
+                        self.processed += 1
+                        self.service_time_total += service_time
+
+            try:
+                reply_queue = reply_queues.get(job['reply_to'])
+                if reply_queue is None:
+                    reply_queue = reply_queues[job['reply_to']] = self.manager.reply_queue(job['reply_to'])
+                reply_queue.put(reply)
+            except Exception as e:
+                print(f"[Worker {self.worker_id}] Could not return result for {job['job_id']}: {e}")
+
+    def get_stats(self):
+        """Get worker statistics for the broker heartbeat."""
+        with self.lock:
+            return {
+                'host': socket.gethostname(),
+                'pid': os.getpid(),
+                'backend': self.backend,
+                'slots': self.threads,
+                'busy': self.busy,
+                'processed': self.processed,
+                'expired': self.expired,
+                'failed': self.failed,
+                'avg_service_time': round(self.service_time_total / self.processed, 3) if self.processed else None
+            }
+
+
+def run_worker(backend: str, threads: int, address: str):
+    """Entry point for one worker process."""
+    try:
+        AnalysisWorker(backend, threads, address).run()
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run analysis jobs from the job queue")
+    parser.add_argument('--backend', default=config.Config.VISION_BACKEND, help="Vision backend (azure or detectron2)")
+    parser.add_argument('--threads', type=int, default=config.Config.WORKER_THREADS, help="Concurrent jobs per process")
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes to start")
+    parser.add_argument('--address', help=f"Broker host:port (default: {config.Config.JOB_QUEUE_ADDRESS})")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker(args.backend, args.threads, args.address)
+        return 0
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.backend, args.threads, args.address))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
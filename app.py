@@ -1,14 +1,30 @@
 """Main Flask application for AI Navigation Assistant."""
-from flask import Flask, render_template, jsonify, request, Response
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, g, make_response
 from flask_cors import CORS
 import json
 import config
-from camera_processor import CameraProcessor
-from azure_vision import AzureVisionService, AzureFaceService
+import metrics
+import tracing
+# Camera (cv2), vision SDKs, result store and job queue are imported when
+# first needed, so the app imports and binds its port quickly
 # from detectron2_vision import Detectron2VisionService  # Optional: keep as fallback
 from audio_service import AudioService
+from session_state import SessionRegistry, SessionState
+from admission import AdmissionController
+from serialization import dumps, encode_analysis, encode_record, parse_profile
+from analysis_pipeline import (
+    SLOW_LANE_FEATURES, analyze_lane, create_face_service, create_vision_service, parse_features, select_fields, vision_backend_class, wants
+)
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import functools
+import io
+import math
+import os
+from contextlib import contextmanager
+import re
 import threading
 import time
+import zipfile
 
 app = Flask(__name__)
 CORS(app)
@@ -17,90 +33,569 @@ CORS(app)
 camera_processor = None
 vision_service = None
 face_service = None
-audio_service = AudioService()
+job_client = None  # Set when ANALYSIS_MODE=queue: analysis runs on analysis_worker.py processes
+audio_service = AudioService()  # TTS engine is created on first use
 
 # Processing state
-processing_enabled = False
-last_analysis = {}
-frame_count = 0  # Track frames for rate limiting
+services_ready = False  # Set once load_services() has finished
+services_lock = threading.Lock()
+warm_up_lock = threading.Lock()
+warm_up_thread = None
+sessions = SessionRegistry()
+admission = AdmissionController()
+camera_session = None  # Session that owns the server camera
+result_store = None  # Persistent analysis results, see initialize_services()
+slow_lane_executor = ThreadPoolExecutor(  # Enrichment lane; threads start on first use
+    max_workers=config.Config.SLOW_LANE_WORKERS, thread_name_prefix='slow-lane'
+)
+# Each open SSE stream holds a gunicorn thread; leave the rest for /api/process
+stream_slots = threading.BoundedSemaphore(max(1, min(config.Config.SSE_MAX_STREAMS, config.Config.WEB_THREADS - 1)))
+batch_executor = ThreadPoolExecutor(  # /api/process/batch images
+    max_workers=config.Config.BATCH_WORKERS, thread_name_prefix='batch'
+)
 
+DEFAULT_SESSION_ID = 'default'
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
 
-def process_frame(frame):
-    """Process frame when available."""
-    global last_analysis, processing_enabled, frame_count
+
+def get_session() -> SessionState:
+    """Get the session for the current request (X-Session-ID header or ?session=)."""
+    session_id = request.headers.get('X-Session-ID') or request.args.get('session') or DEFAULT_SESSION_ID
+    if not SESSION_ID_PATTERN.match(session_id):
+        session_id = DEFAULT_SESSION_ID
+    g.session = sessions.get(session_id)
+    return g.session
+
+
+def get_frame_age():
+    """Get the age of the uploaded frame in seconds, if the client reported it."""
+    try:
+        client_age = float(request.headers.get('X-Frame-Age-Ms', '')) / 1000.0
+    except ValueError:
+        return None
+    return client_age + (time.time() - g.request_started)
+
+
+def analysis_response(result: dict, profile: str = 'full', session: SessionState = None) -> Response:
+    """JSON response for an analysis result, encoded for a response profile (cached if it is the session's latest)."""
+    payload = session.encode(result, profile) if session is not None else encode_analysis(result, profile)
+    return Response(payload, mimetype='application/json')
+
+
+def shed_response(session: SessionState, reason: str, retry_after: int, features=None, profile: str = 'full'):
+    """Answer without analysing: the session's latest result (its requested fields) if there is one, else 429."""
+    metrics.FRAMES_DROPPED.inc(reason=reason)
+    cached, published_at = session.latest()
+    if cached and 'error' not in cached:
+        response = analysis_response(select_fields(cached, features), profile, session)
+        response.headers['X-Analysis-Cached'] = 'true'
+        response.headers['X-Analysis-Age-Ms'] = str(int((time.time() - published_at) * 1000))
+    elif reason == 'low_quality':
+        response = jsonify({
+            'error': 'Frame too blurred or badly exposed, not analysed.',
+            'error_code': 'LOW_QUALITY'
+        })
+        response.status_code = 422
+    else:
+        response = jsonify({
+            'error': 'Server busy, frame not analysed. Please retry shortly.',
+            'error_code': 'RATE_LIMIT'
+        })
+        response.status_code = 429
+    response.headers['X-Shed-Reason'] = reason
+    if retry_after > 0:
+        response.headers['Retry-After'] = str(retry_after)
+    if reason == 'saturated':
+        session.capture.on_shed()
+    return response
+
+
+def record_client_timings():
+    """Record capture/encode timings reported by browser clients."""
+    try:
+        capture = float(request.headers['X-Client-Capture-Ms']) / 1000.0
+        encode = float(request.headers['X-Client-Encode-Ms']) / 1000.0
+        age = float(request.headers['X-Frame-Age-Ms']) / 1000.0
+    except (KeyError, ValueError):
+        return
+    metrics.STAGE_LATENCY.observe(capture, stage='client_capture')
+    metrics.STAGE_LATENCY.observe(encode, stage='client_encode')
+    
+    # Place the client stages on the server timeline, ending when the request arrived
+    captured_ns = int((g.request_started - age) * 1e9)
+    root = tracing.current_span()
+    if root is not None and root.sampled:
+        root.start_ns = min(root.start_ns, captured_ns)
+    encoded_ns = captured_ns + int((capture + encode) * 1e9)
+    tracing.record_span('client_capture', captured_ns, captured_ns + int(capture * 1e9))
+    tracing.record_span('client_encode', captured_ns + int(capture * 1e9), encoded_ns)
+    tracing.record_span('upload', encoded_ns, int(g.request_started * 1e9))
+
+
+def get_client_round_trip():
+    """Get the client's measured round trip for its previous frame, in seconds."""
+    try:
+        return float(request.headers.get('X-Client-RTT-Ms', '')) / 1000.0
+    except ValueError:
+        return None
+
+
+@app.before_request
+def record_request_start():
+    """Remember when the request started (used for frame freshness)."""
+    g.request_started = time.time()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record handler time per route."""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_LATENCY.observe(
+        time.time() - g.request_started,
+        route=route, method=request.method, status=str(response.status_code)
+    )
+    return response
+
+
+@app.after_request
+def advertise_capture_params(response):
+    """Tell frame-uploading clients which capture parameters to use next."""
+    session = g.get('session')
+    if session is not None and request.endpoint == 'process_image':
+        response.headers['X-Capture-Params'] = json.dumps(session.capture.params())
+    return response
+
+
+@contextmanager
+def pipeline_stage(stage: str, **attributes):
+    """Time a pipeline stage as both a latency metric and a trace span."""
+    with metrics.STAGE_LATENCY.time(stage=stage), tracing.span(stage, **attributes) as span:
+        yield span
+
+
+def run_vision_call(call: str, func, *args):
+    """Run one vision backend call, recording its latency, API usage and errors."""
+    metrics.VISION_CALLS.inc(call=call)
+    with pipeline_stage(call) as span:
+        result = func(*args)
+        if isinstance(result, dict) and 'error' in result:
+            metrics.VISION_ERRORS.inc(call=call, error_code=result.get('error_code', 'UNKNOWN'))
+            if span:
+                span.set_error(result['error'])
+    return result
+
+
+def analysis_available() -> bool:
+    """Check whether frames can be analysed, locally or through the job queue."""
+    return vision_service is not None or job_client is not None
+
+
+def faces_available() -> bool:
+    """Check whether face detection can run."""
+    return job_client is not None or (face_service is not None and face_service.client is not None)
+
+
+def face_detection_wanted(due: bool, tracked: bool = True) -> bool:
+    """
+    Decide whether to run face detection on a frame.
+    
+    When the frame is analysed in this process with the session's face
+    tracker and a local face pre-detector, every analysed frame is checked,
+    since the Face API is then only called for new faces. Otherwise (no
+    pre-detector, or analysis on a queue worker or in a capture analysis
+    process, which keep no tracker) only frames where the face_interval
+    cadence is due.
+    
+    Args:
+        due: Whether the face_interval cadence is due on this frame
+        tracked: False if the frame is analysed outside analyze_frame() (in a
+            capture analysis process)
+    """
+    if not faces_available():
+        return False
+    if due:
+        return True
+    if job_client is not None or not tracked:
+        return False
+    from face_predetector import get_face_predetector
+    return get_face_predetector() is not None
+
+
+def session_face_tracker(session: SessionState):
+    """Get the session's face tracker, creating it on first use."""
+    if session.face_tracker is None:
+        from face_predetector import FaceTracker
+        session.face_tracker = FaceTracker()
+    return session.face_tracker
+
+
+def lanes_enabled() -> bool:
+    """Check whether frames run through the fast and slow lanes separately."""
+    return config.Config.PIPELINE_LANES == 'split'
+
+
+def vision_store_key(content_hash: str, calls: str, features=None) -> str:
+    """Build the result store key for a vision result of the configured backend (and requested features)."""
+    vision_backend = job_client.backend_name if job_client else type(vision_service).__name__
+    if features is not None:
+        calls = f"{calls}:{','.join(sorted(features))}"
+    return result_store.make_key(content_hash, vision_backend, calls)
+
+
+def face_store_key(content_hash: str):
+    """Build the result store key for face results (None if faces are unavailable)."""
+    if not faces_available():
+        return None
+    face_backend = type(face_service).__name__ if face_service else 'AzureFaceService'
+    return result_store.make_key(content_hash, face_backend, 'faces')
+
+
+def lookup_stored_result(image_bytes: bytes, calls: str, features=None, with_faces: bool = True,
+                         content_hash: str = None):
+    """
+    Look up an earlier result for an identical image in the result store.
     
-    if not processing_enabled:
+    Args:
+        image_bytes: Encoded image
+        calls: Backend calls the result comes from (see vision_store_key)
+        features: Requested features
+        with_faces: Whether stored faces are added to the result (if 'faces' is requested)
+        content_hash: The image's hash, if already computed
+    
+    Returns:
+        (stored result or None, content_hash, vision_key, face_key) - all None
+        without a result store; pass the keys to store_result() after analysing
+    """
+    if result_store is None:
+        return None, None, None, None
+    with pipeline_stage('result_store_lookup'):
+        content_hash = content_hash or result_store.content_hash(image_bytes)
+        vision_key = vision_store_key(content_hash, calls, features)
+        face_key = face_store_key(content_hash) if with_faces and wants(features, 'faces') else None
+        stored = result_store.get(vision_key)
+        if stored is not None and face_key:
+            faces = result_store.get(face_key)
+            if faces:
+                stored['faces'] = faces
+    metrics.RESULT_STORE_LOOKUPS.inc(result='hit' if stored is not None else 'miss')
+    return stored, content_hash, vision_key, face_key
+
+
+def store_result(vision_key: str, face_key: str, analysis: dict, complete: bool):
+    """Save a result under the keys from lookup_stored_result() (faces separately; the rest only if complete)."""
+    if vision_key and complete:
+        result_store.put(vision_key, {k: v for k, v in analysis.items() if k != 'faces'})
+    if face_key and analysis.get('faces'):
+        result_store.put(face_key, analysis['faces'])
+
+
+def quality_rejected(session: SessionState, image_bytes: bytes, source: str, streak: bool = True) -> bool:
+    """
+    Run the quality gate (QUALITY_GATE_ENABLED) on an uploaded image.
+    
+    Args:
+        session: Session the image belongs to
+        image_bytes: Encoded image
+        source: Frame source label for metrics ('upload' or 'batch')
+        streak: Whether the image is part of the session's frame stream, so
+            it is accepted anyway after QUALITY_MAX_SKIPPED_WINDOWS rejections
+            in a row (batch images are judged on their own)
+    
+    Returns:
+        True if the image should not be analysed
+    """
+    if not config.Config.QUALITY_GATE_ENABLED:
+        return False
+    from frame_quality import score_image_bytes  # Imports cv2
+    with pipeline_stage('quality_check') as span:
+        quality = score_image_bytes(image_bytes)
+        if span and quality:
+            span.set_attribute('frame.sharpness', quality['sharpness'])
+    if quality is None:
+        return False
+    give_up = streak and session.low_quality_streak >= config.Config.QUALITY_MAX_SKIPPED_WINDOWS
+    if not quality['acceptable'] and not give_up:
+        if streak:
+            session.low_quality_streak += 1
+        metrics.FRAMES_LOW_QUALITY.inc(source=source)
+        return True
+    if streak:
+        session.low_quality_streak = 0
+    metrics.CHOSEN_FRAME_SHARPNESS.observe(quality['sharpness'])
+    return False
+
+
+def admit_analysis(session: SessionState):
+    """
+    Take an admission slot, then a token of the session's rate budget, for one analysis.
+    
+    The slot is released again if the budget is exhausted, so a refused
+    request never holds either.
+    
+    Returns:
+        None if admitted (the caller must call admission.release() when the
+        analysis is done), else (reason, retry_after) - reason is
+        'saturated' or 'rate_budget'
+    """
+    if not admission.try_admit():
+        return 'saturated', admission.retry_after()
+    if not session.rate_budget.try_consume():
+        admission.release()
+        return 'rate_budget', max(1, math.ceil(session.rate_budget.seconds_until_available()))
+    return None
+
+
+def analyze_frame(image_bytes: bytes, want_faces: bool, lane: str = 'full', objects=None, face_tracker=None,
+                  features=None):
+    """
+    Run the vision pipeline (or one lane of it) for one encoded frame.
+    
+    Runs in this process, or on an analysis worker when ANALYSIS_MODE=queue.
+    
+    Args:
+        image_bytes: Encoded image
+        want_faces: Whether to run face detection
+        lane: 'full', 'fast' or 'slow' (see analysis_pipeline)
+        objects: Objects found by the fast lane, reused by the slow lane
+            where the backend allows (local mode only)
+        face_tracker: The session's face tracker, so only new faces are sent
+            to the Face API (local mode only)
+        features: Result fields to produce (see analysis_pipeline.FEATURES); None for all
+    
+    Returns:
+        (analysis, complete) - see analysis_pipeline.analyze_frame_bytes()
+    """
+    if job_client is None:
+        return analyze_lane(lane, vision_service, face_service, image_bytes, want_faces, run_vision_call,
+                            objects, face_tracker, features)
+    
+    with pipeline_stage('queued_analysis', lane=lane) as span:
+        analysis, complete, reply = job_client.analyze(image_bytes, want_faces, lane=lane, features=features)
+        if span:
+            span.set_attribute('job.status', reply.get('status'))
+            span.set_attribute('job.worker', reply.get('worker', ''))
+            if 'error' in analysis:
+                span.set_error(analysis['error'])
+    metrics.JOB_RESULTS.inc(status=reply.get('status'))
+    if 'queue_wait' in reply:
+        metrics.JOB_QUEUE_WAIT.observe(reply['queue_wait'])
+    if 'error' in analysis:
+        metrics.VISION_ERRORS.inc(call='queued_analysis', error_code=analysis.get('error_code', 'UNKNOWN'))
+    return analysis, complete
+
+
+def process_frame(frame, session: SessionState):
+    """Process frame when available."""
+    if not session.processing_enabled:
         return
     
-    if not vision_service:
+    ensure_services()
+    if not analysis_available():
         print("Warning: Vision service not available, skipping frame processing")
         return
     
-    frame_count += 1
+    metrics.FRAMES_TOTAL.inc(source='camera')
+    if not admission.try_admit():
+        metrics.FRAMES_DROPPED.inc(reason='saturated')
+        return  # Backend saturated - drop this frame rather than fall behind
     
-    try:
-        # Get frame bytes
-        import cv2
-        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        frame_bytes = buffer.tobytes()
-        
-        # Analyze image
-        print("[Processing] Analyzing frame...")
-        analysis = vision_service.analyze_image(frame_bytes)
-        print(f"[Processing] Analysis keys: {list(analysis.keys())}")
+    frame_count = session.next_frame()
+    started = time.time()
+    
+    capture_params = session.capture.params()
+    if camera_processor:
+        camera_processor.set_frame_stride(session.capture.frame_stride())
+    
+    with tracing.start_trace('frame', source='camera', session=session.session_id, frame=frame_count):
+        if camera_processor and camera_processor.last_capture_ns:
+            tracing.record_span('capture', *camera_processor.last_capture_ns)
+        if camera_processor and camera_processor.last_frame_quality:
+            tracing.current_span().set_attribute('frame.sharpness', camera_processor.last_frame_quality['sharpness'])
         
-        # Check for critical errors
-        if 'error' in analysis:
-            error_code = analysis.get('error_code', 'UNKNOWN')
-            if error_code == 'PUBLIC_ACCESS_DISABLED':
-                # Only show this message once every 50 frames to avoid spam
-                if frame_count % 50 == 0:
-                    print("\n" + "="*60)
-                    print("❌ CRITICAL ERROR: Azure Computer Vision Public Access Disabled")
-                    print("="*60)
-                    print("Your Azure Computer Vision resource has public access disabled.")
-                    print("To fix: Azure Portal → Your Resource → Networking → Enable Public Access")
-                    print("See AZURE_FIX_GUIDE.md for detailed instructions")
-                    print("="*60 + "\n")
-            elif error_code == 'RATE_LIMIT':
-                if frame_count % 10 == 0:
-                    print(f"[Processing] Rate limit hit. Waiting before next analysis...")
+        try:
+            # Analyze image, extract text and detect faces (only every Nth frame to reduce API calls);
+            # with lanes, only obstacles are found here and the rest is added by the slow lane
+            lane = 'fast' if lanes_enabled() else 'full'
+            want_faces = lane == 'full' and face_detection_wanted(frame_count % capture_params['face_interval'] == 0,
+                                                                  tracked=not hasattr(frame, 'seq'))
+            max_width, jpeg_quality = capture_params['max_width'], int(capture_params['jpeg_quality'] * 100)
+            print("[Processing] Analyzing frame...")
+            analysis = None
+            if hasattr(frame, 'seq'):
+                # A RingFrame (CAMERA_MODE=process): encoded, and analysed unless the job queue
+                # does that, in an analysis process
+                processor = camera_processor
+                if processor is None:
+                    return  # Camera stopped
+                frame_bytes, analysis, _ = processor.process_ring_frame(
+                    frame, max_width, jpeg_quality, lane if job_client is None else None, want_faces
+                )
+                if frame_bytes is None:
+                    return
+            else:
+                # Get frame bytes (resolution and quality chosen by the capture controller)
+                from image_utils import encode_frame
+                with pipeline_stage('encode'):
+                    frame_bytes = encode_frame(frame, max_width, jpeg_quality)
+            if analysis is None:
+                analysis, _ = analyze_frame(frame_bytes, want_faces, lane=lane, face_tracker=session_face_tracker(session))
+            print(f"[Processing] Analysis keys: {list(analysis.keys())}")
+            
+            # Check for critical errors
+            if 'error' in analysis:
+                error_code = analysis.get('error_code', 'UNKNOWN')
+                if error_code == 'PUBLIC_ACCESS_DISABLED':
+                    # Only show this message once every 50 frames to avoid spam
+                    if frame_count % 50 == 0:
+                        print("\n" + "="*60)
+                        print("❌ CRITICAL ERROR: Azure Computer Vision Public Access Disabled")
+                        print("="*60)
+                        print("Your Azure Computer Vision resource has public access disabled.")
+                        print("To fix: Azure Portal → Your Resource → Networking → Enable Public Access")
+                        print("See AZURE_FIX_GUIDE.md for detailed instructions")
+                        print("="*60 + "\n")
+                elif error_code == 'RATE_LIMIT':
+                    if frame_count % 10 == 0:
+                        print(f"[Processing] Rate limit hit. Waiting before next analysis...")
+                    return
+                # Don't process further if there's an error
+                session.publish(analysis)
                 return
-            # Don't process further if there's an error
-            last_analysis = analysis
+            
+            if analysis.get('text'):
+                print(f"[Processing] Text extracted: {analysis['text'][:50]}...")
+            if analysis.get('faces'):
+                print(f"[Processing] Faces detected: {len(analysis['faces'])}")
+            
+            with pipeline_stage('postprocess'):
+                late = False
+                if lanes_enabled():
+                    _, late = publish_fast_lane(session, analysis, started)
+                else:
+                    session.publish(analysis)
+                
+                # Generate audio feedback (only if no errors)
+                print("[Processing] Generating audio feedback...")
+                generate_audio_feedback(analysis, session)
+            
+            if lanes_enabled():
+                schedule_enrichment(session, frame_bytes, started, analysis.get('objects'), speak=True, late=late)
+            
+        except Exception as e:
+            print(f"Frame processing error: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            service_time = time.time() - started
+            admission.release(service_time)
+            session.capture.observe(service_time)
+
+
+def publish_fast_lane(session: SessionState, result: dict, arrived_at: float, features=None):
+    """
+    Publish an obstacle (fast lane) result, merged with the latest enrichment.
+    
+    Args:
+        session: Session the frame belongs to
+        result: Fast lane result (objects and obstacles)
+        arrived_at: When the frame arrived
+        features: Features requested for the frame; the lane's other fields are kept
+    
+    Returns:
+        (published analysis, whether FAST_LANE_DEADLINE_MS was missed)
+    """
+    merged = session.publish_lane('fast', result, features)
+    latency = time.time() - arrived_at
+    metrics.LANE_LATENCY.observe(latency, lane='fast')
+    late = latency > config.Config.FAST_LANE_DEADLINE_MS / 1000.0
+    if late:
+        metrics.FAST_LANE_DEADLINE_MISSES.inc()
+    return merged, late
+
+
+def schedule_enrichment(session: SessionState, image_bytes: bytes, arrived_at: float, objects=None,
+                        content_hash: str = None, speak: bool = False, late: bool = False, features=None):
+    """
+    Run the slow lane (description, OCR, faces) for a frame in the background.
+    
+    At most one enrichment runs per session, at most every
+    SLOW_LANE_INTERVAL_MS. Frames whose obstacle result missed its deadline
+    are not enriched, so enrichment does not compete with the fast lane for
+    an overloaded backend.
+    
+    Args:
+        session: Session the frame belongs to
+        image_bytes: Encoded frame
+        arrived_at: When the frame arrived
+        objects: Objects found by the fast lane
+        content_hash: Image hash for result store lookups, if available
+        speak: Announce the enrichment on the server speaker
+        late: The fast lane missed its deadline for this frame
+        features: Result fields requested for the frame; None for all
+    """
+    if not wants(features, *SLOW_LANE_FEATURES):
+        metrics.SLOW_LANE_SKIPPED.inc(reason='not_requested')
+        return
+    if late:
+        metrics.SLOW_LANE_SKIPPED.inc(reason='fast_lane_late')
+        return
+    reason = session.try_start_enrichment(config.Config.SLOW_LANE_INTERVAL_MS / 1000.0)
+    if reason:
+        metrics.SLOW_LANE_SKIPPED.inc(reason=reason)
+        return
+    slow_lane_executor.submit(
+        _run_slow_lane, session, image_bytes, arrived_at, objects, content_hash, speak, features,
+        tracing.current_span()
+    )
+
+
+def _run_slow_lane(session: SessionState, image_bytes: bytes, arrived_at: float, objects,
+                   content_hash, speak: bool, features, parent):
+    """Enrich one frame and merge the result into the session (slow lane thread)."""
+    try:
+        # A newer frame will be along by now; enrich that one instead
+        if time.time() - arrived_at > config.Config.SLOW_LANE_INTERVAL_MS / 1000.0:
+            metrics.SLOW_LANE_SKIPPED.inc(reason='stale')
             return
         
-        # Extract text if needed (only if analysis succeeded)
-        text_result = vision_service.read_text(frame_bytes)
-        if text_result.get('text'):
-            analysis['text'] = text_result['text']
-            print(f"[Processing] Text extracted: {text_result['text'][:50]}...")
-        
-        # Detect faces (only every 10 frames to reduce API calls)
-        if face_service and face_service.client:
-            if frame_count % 10 == 0:  # Only every 10th frame
-                try:
-                    faces = face_service.detect_faces(frame_bytes)
-                    if faces:
-                        analysis['faces'] = faces
-                        print(f"[Processing] Faces detected: {len(faces)}")
-                except Exception as face_error:
-                    # Silently skip - face detection is optional
-                    pass
-        
-        last_analysis = analysis
-        
-        # Generate audio feedback (only if no errors)
-        print("[Processing] Generating audio feedback...")
-        generate_audio_feedback(analysis)
+        with tracing.span('slow_lane', parent=parent):
+            enrichment = slow_key = face_key = None
+            if content_hash:
+                enrichment, _, slow_key, face_key = lookup_stored_result(image_bytes, 'describe,read', features,
+                                                                         content_hash=content_hash)
+            
+            if enrichment is None:
+                if not session.rate_budget.try_consume():
+                    metrics.SLOW_LANE_SKIPPED.inc(reason='rate_budget')
+                    return
+                face_interval = session.capture.params()['face_interval']
+                want_faces = wants(features, 'faces') and face_detection_wanted(
+                    session.frame_count - session.last_face_frame >= face_interval
+                )
+                if want_faces:
+                    session.last_face_frame = session.frame_count
+                enrichment, complete = analyze_frame(image_bytes, want_faces, lane='slow', objects=objects,
+                                                     face_tracker=session_face_tracker(session), features=features)
+                if 'error' in enrichment:
+                    return  # Nice-to-have: keep the previous enrichment
+                store_result(slow_key, face_key, enrichment, complete)
         
+        session.publish_lane('slow', enrichment, features)
+        metrics.LANE_LATENCY.observe(time.time() - arrived_at, lane='slow')
+        if speak:
+            generate_audio_feedback(enrichment, session)
     except Exception as e:
-        print(f"Frame processing error: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"[Slow lane] Enrichment error: {e}")
+    finally:
+        session.finish_enrichment()
+
 
+def _should_announce(session: SessionState, text: str) -> bool:
+    """Check the session's announcement state so repeats are not spoken every frame."""
+    return session is None or session.should_announce(text)
 
-def generate_audio_feedback(analysis: dict):
+
+def generate_audio_feedback(analysis: dict, session: SessionState = None):
     """Generate audio feedback from analysis results."""
     if not analysis or 'error' in analysis:
         print(f"[Audio] Skipping feedback - analysis error or empty: {analysis}")
@@ -111,7 +606,11 @@ def generate_audio_feedback(analysis: dict):
     # Priority 1: Obstacle warnings
     if analysis.get('obstacles') and len(analysis.get('obstacles', [])) > 0:
         print(f"[Audio] Obstacles detected: {len(analysis['obstacles'])}")
-        audio_service.speak_obstacle_warning(analysis['obstacles'])
+        warning_key = 'obstacles:' + ','.join(sorted(
+            f"{o.get('name')}@{o.get('distance_estimate')}" for o in analysis['obstacles']
+        ))
+        if _should_announce(session, warning_key):
+            audio_service.speak_obstacle_warning(analysis['obstacles'])
         # Continue to also speak objects after obstacle warning
     
     # Priority 2: Always speak detected objects
@@ -138,27 +637,30 @@ def generate_audio_feedback(analysis: dict):
             if len(detected_objects) > 5:
                 objects_text += f", and {len(detected_objects) - 5} more objects"
             
-            print(f"[Audio] Speaking objects: {objects_text}")
-            audio_service.speak(objects_text, priority=6)
+            if _should_announce(session, objects_text):
+                print(f"[Audio] Speaking objects: {objects_text}")
+                audio_service.speak(objects_text, priority=6)
     
     # Priority 3: Scene description (after objects)
     description = analysis.get('description', '')
-    if description and description.strip():
+    if description and description.strip() and _should_announce(session, description):
         print(f"[Audio] Speaking description: {description[:50]}...")
         audio_service.speak(description, priority=5)
     
     # Priority 4: Text content
     if analysis.get('text') and analysis['text'].strip():
         text = analysis['text'][:200]  # Limit length
-        print(f"[Audio] Speaking text: {text[:50]}...")
-        audio_service.speak(f"Text detected: {text}", priority=2)
+        if _should_announce(session, f"Text detected: {text}"):
+            print(f"[Audio] Speaking text: {text[:50]}...")
+            audio_service.speak(f"Text detected: {text}", priority=2)
     
     # Priority 5: Tags (if no description)
     if not description and analysis.get('tags') and len(analysis.get('tags', [])) > 0:
         tags = analysis['tags'][:5]
         tags_text = f"Scene contains: {', '.join(tags)}"
-        print(f"[Audio] Speaking tags: {tags_text}")
-        audio_service.speak(tags_text, priority=4)
+        if _should_announce(session, tags_text):
+            print(f"[Audio] Speaking tags: {tags_text}")
+            audio_service.speak(tags_text, priority=4)
     
     # Priority 6: Faces
     if analysis.get('faces') and len(analysis.get('faces', [])) > 0:
@@ -166,8 +668,9 @@ def generate_audio_feedback(analysis: dict):
         face_text = f"Detected {len(faces)} face"
         if len(faces) > 1:
             face_text += "s"
-        print(f"[Audio] Speaking faces: {face_text}")
-        audio_service.speak(face_text, priority=1)
+        if _should_announce(session, face_text):
+            print(f"[Audio] Speaking faces: {face_text}")
+            audio_service.speak(face_text, priority=1)
 
 
 @app.route('/')
@@ -179,18 +682,26 @@ def index():
 @app.route('/api/camera/start', methods=['POST'])
 def start_camera():
     """Start camera capture."""
-    global camera_processor, processing_enabled
+    global camera_processor, camera_session
     
     try:
+        if config.Config.CAMERA_MODE == 'process':
+            from capture_pipeline import SharedMemoryCameraProcessor as CameraProcessor
+        else:
+            from camera_processor import CameraProcessor
         camera_index = request.json.get('camera_index', 0) if request.json else 0
+        session = get_session()
         
         if camera_processor:
             camera_processor.stop()
+        if camera_session:
+            camera_session.processing_enabled = False
         
         camera_processor = CameraProcessor(camera_index)
         if camera_processor.start():
-            camera_processor.add_callback(process_frame)
-            processing_enabled = True
+            camera_processor.add_callback(functools.partial(process_frame, session=session))
+            camera_session = session
+            session.processing_enabled = True
             return jsonify({'success': True, 'message': 'Camera started'})
         else:
             return jsonify({'success': False, 'message': 'Failed to start camera'}), 400
@@ -202,13 +713,15 @@ def start_camera():
 @app.route('/api/camera/stop', methods=['POST'])
 def stop_camera():
     """Stop camera capture."""
-    global camera_processor, processing_enabled
+    global camera_processor, camera_session
     
     try:
         if camera_processor:
             camera_processor.stop()
             camera_processor = None
-        processing_enabled = False
+        if camera_session:
+            camera_session.processing_enabled = False
+            camera_session = None
         return jsonify({'success': True, 'message': 'Camera stopped'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -232,59 +745,308 @@ def get_frame():
 @app.route('/api/analysis', methods=['GET'])
 def get_analysis():
     """Get latest analysis results."""
-    return jsonify(last_analysis)
+    try:
+        profile = parse_profile(request.args.get('profile'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    session = get_session()
+    analysis, _ = session.latest()
+    return analysis_response(analysis, profile, session)
+
+
+@app.route('/api/analysis/stream', methods=['GET'])
+def stream_analysis():
+    """Stream analysis results as Server-Sent Events."""
+    try:
+        profile = parse_profile(request.args.get('profile'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not stream_slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many open streams on this worker, poll /api/analysis instead'}), 503
+    broadcaster = get_session().broadcaster
+    if not broadcaster.try_subscribe():
+        stream_slots.release()
+        return jsonify({'error': 'Too many stream subscribers'}), 503
+    
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_event_id = 0
+    
+    response = Response(
+        stream_with_context(broadcaster.stream(last_event_id, profile)),
+        mimetype='text/event-stream'
+    )
+    response.call_on_close(broadcaster.unsubscribe)
+    response.call_on_close(stream_slots.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+    return response
 
 
 @app.route('/api/process', methods=['POST'])
 def process_image():
     """Process uploaded image."""
-    global vision_service, face_service
-    
-    if not vision_service:
+    with tracing.start_trace('frame', source='upload') as trace:
+        response = make_response(_process_upload())
+        trace.set_attribute('http.status_code', response.status_code)
+    response.headers['X-Trace-ID'] = trace.trace_id
+    return response
+
+
+def _process_upload():
+    """Analyse the uploaded image for process_image()."""
+    ensure_services()
+    if not analysis_available():
         return jsonify({'error': 'Vision service not available'}), 503
     
     try:
         if 'image' not in request.files:
             return jsonify({'error': 'No image provided'}), 400
         
-        image_file = request.files['image']
-        image_bytes = image_file.read()
+        with pipeline_stage('upload_decode'):
+            image_file = request.files['image']
+            image_bytes = image_file.read()
         
         if len(image_bytes) == 0:
             return jsonify({'error': 'Empty image file'}), 400
         
-        # Analyze image
-        analysis = vision_service.analyze_image(image_bytes)
+        # Only the requested fields are computed, and returned trimmed to the response profile
+        try:
+            features = parse_features(request.values.get('features'))
+            profile = parse_profile(request.values.get('profile'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Check for errors
-        if 'error' in analysis:
-            return jsonify(analysis)
+        session = get_session()
+        metrics.FRAMES_TOTAL.inc(source='upload')
+        tracing.current_span().set_attribute('session', session.session_id)
+        if features is not None:
+            tracing.current_span().set_attribute('features', ','.join(sorted(features)))
+        record_client_timings()
         
-        # Extract text
-        text_result = vision_service.read_text(image_bytes)
-        if text_result.get('text'):
-            analysis['text'] = text_result['text']
+        # A slightly old answer now beats a fresh one later: never queue
+        frame_age = get_frame_age()
+        if frame_age is not None and frame_age > config.Config.FRAME_MAX_AGE_MS / 1000.0:
+            admission.record_expired()
+            return shed_response(session, 'stale', admission.retry_after(), features, profile)
         
-        # Detect faces (less frequently to avoid rate limits)
-        import random
-        if face_service and face_service.client and random.random() < 0.1:  # 10% chance
-            try:
-                faces = face_service.detect_faces(image_bytes)
-                if faces:
-                    analysis['faces'] = faces
-            except:
-                pass  # Silently skip face detection errors
+        # Identical images were analysed before: answer from the store without an API call
+        lanes = lanes_enabled()
+        # With lanes, faces come from the slow lane
+        stored, content_hash, vision_key, face_key = lookup_stored_result(
+            image_bytes, 'objects' if lanes else 'analyze,read', features, with_faces=not lanes
+        )
+        if stored is not None:
+            session.next_frame()
+            if lanes:
+                merged, _ = publish_fast_lane(session, stored, g.request_started, features)
+                schedule_enrichment(session, image_bytes, g.request_started, stored.get('objects'), content_hash,
+                                    features=features)
+                stored = merged
+            else:
+                session.publish(stored)
+            response = analysis_response(select_fields(stored, features), profile, session)
+            response.headers['X-Analysis-Store'] = 'hit'
+            return response
+        
+        # Don't spend analysis budget on a blurred or badly exposed frame; the next one is likely better
+        if quality_rejected(session, image_bytes, 'upload'):
+            return shed_response(session, 'low_quality', 0, features, profile)
+        
+        refused = admit_analysis(session)
+        if refused:
+            reason, retry_after = refused
+            return shed_response(session, reason, retry_after, features, profile)
+        
+        frame_count = session.next_frame()
+        face_interval = session.capture.params()['face_interval']
+        started = time.time()
+        
+        try:
+            # Analyze image, extract text and detect faces (less frequently to avoid rate limits);
+            # with lanes, only obstacles are found before answering
+            if lanes:
+                analysis, complete = analyze_frame(image_bytes, False, lane='fast', features=features)
+            else:
+                want_faces = wants(features, 'faces') and face_detection_wanted(frame_count % face_interval == 0)
+                analysis, complete = analyze_frame(image_bytes, want_faces, face_tracker=session_face_tracker(session),
+                                                   features=features)
+            
+            # Check for errors
+            if 'error' in analysis:
+                return jsonify(analysis)
+            
+            store_result(vision_key, face_key, analysis, complete)
+        finally:
+            service_time = time.time() - started
+            admission.release(service_time)
+            session.capture.observe(service_time, get_client_round_trip())
         
         # Note: Audio feedback is now handled on client side for mobile devices
         # Only generate server-side audio if explicitly requested
         # generate_audio_feedback(analysis)  # Commented out - client handles it
         
-        return jsonify(analysis)
+        if lanes:
+            merged, late = publish_fast_lane(session, analysis, g.request_started, features)
+            schedule_enrichment(session, image_bytes, g.request_started, analysis.get('objects'), content_hash,
+                                late=late, features=features)
+            return analysis_response(select_fields(merged, features), profile, session)
+        
+        session.publish(analysis)
+        return analysis_response(analysis, profile, session)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+BATCH_REFUSALS = {  # admit_analysis() reason -> error of the image's record
+    'saturated': 'Server busy, image not analysed. Please retry shortly.',
+    'rate_budget': 'Analysis budget exhausted, image not analysed.'
+}
+
+
+def read_batch_images():
+    """
+    Read the images of a batch request.
+    
+    Accepts a multipart list (repeated 'images' or 'image' file fields), a
+    zip file in an 'archive' field, or a zip request body
+    (Content-Type: application/zip). Zip entries without an image extension
+    are ignored.
+    
+    Returns:
+        List of (name, image bytes)
+    
+    Raises:
+        ValueError: If the batch is too large or the archive is invalid
+    """
+    max_images = config.Config.BATCH_MAX_IMAGES
+    max_bytes = config.Config.BATCH_MAX_MB * 1024 * 1024
+    
+    archive = request.files.get('archive')
+    if archive is not None or request.mimetype in ('application/zip', 'application/x-zip-compressed'):
+        data = archive.read() if archive is not None else request.get_data()
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                entries = [info for info in zf.infolist()
+                           if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+                           and not os.path.basename(info.filename).startswith('.')]
+                if len(entries) > max_images:
+                    raise ValueError(f"Too many images ({len(entries)}, at most {max_images} per batch)")
+                # Checked before extracting, so a zip bomb is never inflated
+                if sum(info.file_size for info in entries) > max_bytes:
+                    raise ValueError(f"Batch too large (at most {config.Config.BATCH_MAX_MB:g} MB of images)")
+                return [(info.filename, zf.read(info)) for info in entries]
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Invalid zip archive: {e}")
+    
+    files = request.files.getlist('images') + request.files.getlist('image')
+    if len(files) > max_images:
+        raise ValueError(f"Too many images ({len(files)}, at most {max_images} per batch)")
+    images = [(f.filename or f"image{index}", f.read()) for index, f in enumerate(files)]
+    if sum(len(image_bytes) for _, image_bytes in images) > max_bytes:
+        raise ValueError(f"Batch too large (at most {config.Config.BATCH_MAX_MB:g} MB of images)")
+    return images
+
+
+@app.route('/api/process/batch', methods=['POST'])
+def process_batch():
+    """Analyse many uploaded images concurrently, streaming one NDJSON line per image as each completes."""
+    ensure_services()
+    if not analysis_available():
+        return jsonify({'error': 'Vision service not available'}), 503
+    
+    try:
+        features = parse_features(request.values.get('features'))
+        profile = parse_profile(request.values.get('profile'))
+        images = read_batch_images()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not images:
+        return jsonify({'error': 'No images provided'}), 400
+    
+    session = get_session()
+    started = time.time()
+    futures = {
+        batch_executor.submit(_analyze_batch_image, session, image_bytes, features): (index, name)
+        for index, (name, image_bytes) in enumerate(images)
+    }
+    
+    def generate():
+        try:
+            for future in as_completed(futures):
+                index, name = futures[future]
+                status, result, extra = future.result()
+                record = dict({'index': index, 'name': name, 'status': status}, **extra)
+                yield encode_record(record, result, profile) + b'\n'
+            yield dumps({'done': True, 'images': len(images), 'elapsed_ms': int((time.time() - started) * 1000)}) + b'\n'
+        finally:
+            # Client went away: don't analyse what it will never read
+            for future in futures:
+                future.cancel()
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Accel-Buffering'] = 'no'  # Deliver each line as it is ready
+    return response
+
+
+def _analyze_batch_image(session: SessionState, image_bytes: bytes, features):
+    """
+    Analyse one image of a batch (batch worker thread).
+    
+    Each image goes through the same result store, quality gate, admission
+    and rate budget checks as an /api/process upload, and is analysed in one
+    pass. Images over budget are not queued but answered with a 429 and
+    retry_after, like a shed /api/process request.
+    
+    Returns:
+        (HTTP-style status, analysis or error result, extra record fields)
+    """
+    with tracing.start_trace('frame', source='batch') as trace:
+        trace.set_attribute('session', session.session_id)
+        extra = {'trace_id': trace.trace_id}
+        try:
+            if not image_bytes:
+                return 400, {'error': 'Empty image file'}, extra
+            metrics.FRAMES_TOTAL.inc(source='batch')
+            
+            stored, _, vision_key, face_key = lookup_stored_result(image_bytes, 'analyze,read', features)
+            if stored is not None:
+                return 200, select_fields(stored, features), dict(extra, store='hit')
+            
+            if quality_rejected(session, image_bytes, 'batch', streak=False):
+                return 422, {'error': 'Frame too blurred or badly exposed, not analysed.',
+                             'error_code': 'LOW_QUALITY'}, extra
+            
+            refused = admit_analysis(session)
+            if refused:
+                reason, retry_after = refused
+                metrics.FRAMES_DROPPED.inc(reason=reason)
+                return 429, {'error': BATCH_REFUSALS[reason], 'error_code': 'RATE_LIMIT'}, \
+                    dict(extra, retry_after=retry_after)
+            
+            frame_count = session.next_frame()
+            face_interval = session.capture.params()['face_interval']
+            want_faces = wants(features, 'faces') and face_detection_wanted(frame_count % face_interval == 0,
+                                                                             tracked=False)
+            analysis_started = time.time()
+            try:
+                # Batch images finish out of order, so they don't go through the session's face tracker
+                analysis, complete = analyze_frame(image_bytes, want_faces, features=features)
+            finally:
+                admission.release(time.time() - analysis_started)
+            
+            if 'error' in analysis:
+                return 502, analysis, extra
+            store_result(vision_key, face_key, analysis, complete)
+            return 200, analysis, extra
+        except Exception as e:
+            trace.set_error(str(e))
+            return 500, {'error': str(e)}, extra
+
+
 @app.route('/api/audio/speak', methods=['POST'])
 def speak_text():
     """Speak text."""
@@ -323,16 +1085,33 @@ def test_audio():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Expose metrics in Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get application status."""
     global camera_processor, vision_service, face_service
     
+    session = get_session()
     status = {
         'camera_active': camera_processor is not None and camera_processor.is_available(),
-        'vision_service_ready': vision_service is not None,
-        'face_service_ready': face_service is not None and face_service.client is not None,
-        'processing_enabled': processing_enabled,
+        'frame_quality': camera_processor.get_quality_stats() if camera_processor else None,
+        'camera_transport': camera_processor.get_transport_stats() if camera_processor else None,
+        'vision_service_ready': analysis_available(),
+        'face_service_ready': faces_available(),
+        'analysis_mode': 'queue' if job_client else 'local',
+        'vision_backend': job_client.backend_name if job_client else type(vision_service).__name__ if vision_service else None,
+        'processing_enabled': session.processing_enabled,
+        'session': session.get_stats(),
+        'sessions': sessions.get_stats(),
+        'admission': admission.get_stats(),
+        'result_store': result_store.get_stats() if result_store else None,
+        'job_queue': job_client.get_stats() if job_client else None,
+        'hedging': vision_service.get_stats() if hasattr(vision_service, 'get_stats') else None,
         'port': config.Config.PORT
     }
     
@@ -345,43 +1124,155 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'services': {
-            'vision': vision_service is not None,
-            'face': face_service is not None and face_service.client is not None,
+            'vision': analysis_available(),
+            'face': faces_available(),
             'audio': audio_service is not None
         }
     })
 
 
-def initialize_services():
-    """Initialize Azure services."""
-    global vision_service, face_service
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness check endpoint - only accept traffic once the vision backend is loaded."""
+    if not services_ready:
+        start_warm_up()  # Lazy mode: the first probe starts loading
+    ready = services_ready and analysis_available()
+    return jsonify({
+        'ready': ready,
+        'services_initialized': services_ready,
+        'vision': analysis_available()
+    }), (200 if ready else 503)
+
+
+def _register_gauges():
+    """Compute queue depth and budget gauges from live state at scrape time."""
+    metrics.ANALYSES_IN_FLIGHT.set_function(lambda: admission.in_flight)
+    metrics.ANALYSIS_LIMIT.set_function(admission.current_limit)
+    metrics.AUDIO_QUEUE_DEPTH.set_function(lambda: audio_service.queue.qsize())
+    metrics.STREAM_SUBSCRIBERS.set_function(
+        lambda: sum(s.broadcaster.subscriber_count for s in list(sessions.sessions.values()))
+    )
+    metrics.ACTIVE_SESSIONS.set_function(lambda: len(sessions.sessions))
+    metrics.RATE_BUDGET_REMAINING.set_function(
+        lambda: sum(s.rate_budget.remaining() for s in list(sessions.sessions.values()))
+    )
+    metrics.SESSIONS_OVER_BUDGET.set_function(
+        lambda: sum(1 for s in list(sessions.sessions.values()) if s.rate_budget.remaining() < 1.0)
+    )
     
-    try:
-        vision_service = AzureVisionService()
-        print("Azure Computer Vision service initialized")
-    except Exception as e:
-        print(f"Failed to initialize Vision service: {e}")
-        vision_service = None
+    # Job queue signals come from the broker (None outside queue mode, which skips the sample)
+    metrics.JOB_QUEUE_DEPTH.set_function(lambda: job_client.broker_stats['queue_depth'])
+    metrics.JOB_WORKERS.set_function(lambda: job_client.broker_stats['workers'])
+    metrics.JOB_WORKER_UTILISATION.set_function(lambda: job_client.broker_stats['utilisation'] or 0)
+    metrics.JOB_WORKERS_DESIRED.set_function(lambda: job_client.broker_stats['desired_workers'])
+
+
+_register_gauges()
+
+
+def load_services():
+    """Construct the vision, face and result store services (idempotent)."""
+    global vision_service, face_service, job_client, result_store, services_ready
     
-    try:
-        face_service = AzureFaceService()
-        if face_service.client:
-            print("Azure Face service initialized")
+    with services_lock:
+        if services_ready:
+            return
+        started = time.time()
+        
+        if config.Config.ANALYSIS_MODE == 'queue':
+            # Analysis runs on analysis workers; this process only enqueues frames
+            from job_queue import JobQueueClient
+            job_client = JobQueueClient()
+            job_client.backend_name = vision_backend_class()
+            print(f"Analysis mode: queue (broker {job_client.address}, worker backend {config.Config.VISION_BACKEND})")
         else:
-            print("Azure Face service not available (optional)")
+            try:
+                vision_service = create_vision_service('azure')
+                print(f"Azure Computer Vision service initialized ({type(vision_service).__name__})")
+                if config.Config.VISION_HEDGE_BACKENDS:
+                    from hedging import create_hedged_service
+                    vision_service = create_hedged_service('azure', vision_service)
+            except Exception as e:
+                print(f"Failed to initialize Vision service: {e}")
+                print("WARNING: Azure Computer Vision service not initialized.")
+                print("Please configure AZURE_COMPUTER_VISION_ENDPOINT and AZURE_COMPUTER_VISION_KEY in .env file")
+                vision_service = None
+            
+            try:
+                face_service = create_face_service()
+                if face_service.client:
+                    print("Azure Face service initialized")
+                else:
+                    print("Azure Face service not available (optional)")
+            except Exception as e:
+                print(f"Face service initialization error: {e}")
+                face_service = None
+        
+        if config.Config.RESULT_STORE_ENABLED:
+            try:
+                from result_store import ResultStore
+                result_store = ResultStore()
+                warmed = result_store.warm()
+                print(f"Result store ready ({warmed} results warmed from {result_store.path})")
+            except Exception as e:
+                print(f"Result store unavailable: {e}")
+                result_store = None
+        
+        services_ready = True
+        print(f"Services loaded in {time.time() - started:.2f}s")
+
+
+def ensure_services():
+    """Load services on first use if they are not loaded yet."""
+    if not services_ready:
+        load_services()
+
+
+def _warm_up():
+    """Load services and pre-import/initialise what the first frame needs."""
+    load_services()
+    try:
+        audio_service.warm_up()
     except Exception as e:
-        print(f"Face service initialization error: {e}")
-        face_service = None
+        print(f"Warm-up error: {e}")
+
+
+def start_warm_up():
+    """Start loading services in a background thread (once)."""
+    global warm_up_thread
+    with warm_up_lock:
+        if warm_up_thread is not None or services_ready:
+            return
+        warm_up_thread = threading.Thread(target=_warm_up, daemon=True)
+        warm_up_thread.start()
+
+
+def initialize_services(background: bool = True):
+    """
+    Prepare services according to SERVICE_WARM_UP.
+    
+    'background' loads them in a thread so the server can bind immediately
+    (/api/ready reports 503 until they are loaded), 'eager' loads them
+    before returning, and 'lazy' defers loading to the first request that
+    needs them (or the first readiness probe).
+    
+    Args:
+        background: Allow background loading; pass False where a thread
+            would not survive (e.g. before gunicorn forks its workers)
+    """
+    mode = config.Config.SERVICE_WARM_UP
+    if mode == 'lazy':
+        return
+    if mode == 'background' and background:
+        start_warm_up()
+    else:
+        _warm_up()
 
 
 if __name__ == '__main__':
     print("Initializing AI Navigation Assistant...")
     initialize_services()
     
-    if not vision_service:
-        print("WARNING: Azure Computer Vision service not initialized.")
-        print("Please configure AZURE_COMPUTER_VISION_ENDPOINT and AZURE_COMPUTER_VISION_KEY in .env file")
-    
     # Check if SSL certificates exist
     import os
     ssl_context = None
@@ -393,6 +1284,7 @@ if __name__ == '__main__':
         print(f"🌐 Starting HTTP server on port {config.Config.PORT}")
         print(f"   Access via: http://192.168.1.45:{config.Config.PORT}/")
         print(f"   Note: For mobile camera, HTTPS is required. See setup_ssl.sh or use ngrok")
+    print("   Development server - for production use: gunicorn -c gunicorn.conf.py wsgi:app")
     
     app.run(host='0.0.0.0', port=config.Config.PORT, ssl_context=ssl_context, debug=config.Config.DEBUG)
 
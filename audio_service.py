@@ -1,22 +1,44 @@
 """Text-to-speech and spatial audio service."""
-import pyttsx3
 import threading
 import queue
+import time
 from typing import Optional, Dict, List
+import metrics
+import tracing
 
 
 class AudioService:
     """Handles text-to-speech with spatial audio cues."""
     
     def __init__(self):
-        """Initialize audio service."""
-        self.engine = pyttsx3.init()
-        self.setup_voice()
+        """Initialize audio service (the TTS engine is created on first use)."""
+        self.engine = None
+        self.engine_lock = threading.Lock()
+        self.engine_failed = False
         self.queue = queue.Queue()
         self.is_speaking = False
         self.audio_thread = None
         self.current_priority = 0
     
+    def _get_engine(self):
+        """Get the TTS engine, initialising pyttsx3 on first use."""
+        if self.engine is None and not self.engine_failed:
+            with self.engine_lock:
+                if self.engine is None and not self.engine_failed:
+                    try:
+                        import pyttsx3
+                        self.engine = pyttsx3.init()
+                        self.setup_voice()
+                    except Exception as e:
+                        print(f"[Audio] Text-to-speech unavailable: {e}")
+                        self.engine = None
+                        self.engine_failed = True
+        return self.engine
+    
+    def warm_up(self):
+        """Initialise the TTS engine ahead of the first announcement."""
+        self._get_engine()
+    
     def setup_voice(self):
         """Configure TTS engine settings."""
         # Set speech rate (words per minute)
@@ -47,7 +69,8 @@ class AudioService:
             self.queue.queue.clear()
             self.is_speaking = False
         
-        self.queue.put((priority, text))
+        # Carry the frame's trace so playback shows up in it
+        self.queue.put((priority, text, time.time(), tracing.current_span()))
         
         if not self.is_speaking:
             self._start_speaking_thread()
@@ -135,14 +158,23 @@ class AudioService:
         """Background loop for processing speech queue."""
         while True:
             try:
-                priority, text = self.queue.get(timeout=1)
+                priority, text, enqueued_at, trace_parent = self.queue.get(timeout=1)
                 self.is_speaking = True
                 self.current_priority = priority
+                dequeued_at = time.time()
+                metrics.STAGE_LATENCY.observe(dequeued_at - enqueued_at, stage='audio_queue_wait')
+                tracing.record_span('tts.queue_wait', int(enqueued_at * 1e9), int(dequeued_at * 1e9), parent=trace_parent)
                 
                 # Speak the text
                 print(f"[Audio] Speaking: {text[:50]}...")  # Debug log
-                self.engine.say(text)
-                self.engine.runAndWait()
+                engine = self._get_engine()
+                if engine is None:
+                    self.is_speaking = False
+                    continue  # No TTS on this host - drop the announcement
+                with metrics.STAGE_LATENCY.time(stage='audio_speak'), \
+                        tracing.span('tts.speak', parent=trace_parent, priority=priority):
+                    engine.say(text)
+                    engine.runAndWait()
                 
                 self.is_speaking = False
                 
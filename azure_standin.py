@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Azure Computer Vision and Face endpoints.
+
+Implements the calls made by the Azure vision and face services (SDK and
+REST clients: v3.2 analyze, read + read-result polling, Image
+Analysis 4.0 analyze, Face v1.0 detect) with canned or recorded payloads, configurable latency, rate limiting and error
+injection, so the app can be load-tested without network or API quota.
+
+Usage:
+    python azure_standin.py --port 5055
+    AZURE_COMPUTER_VISION_ENDPOINT=http://127.0.0.1:5055 \\
+    AZURE_FACE_ENDPOINT=http://127.0.0.1:5055 python app.py
+
+Fault settings can be changed while running:
+    curl -X POST localhost:5055/_standin/config -H 'Content-Type: application/json' \\
+         -d '{"error_rate": 0.1, "error_mode": "500"}'
+"""
+import argparse
+import glob
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from flask import Flask, Response, jsonify, request
+
+
+ERROR_MODES = ('500', '503', '401', '403', 'timeout')
+IMAGE_ANALYSIS_FEATURES = ('tags', 'caption', 'denseCaptions', 'objects', 'read', 'smartCrops', 'people')
+
+# (median_ms, p95_ms) per operation, roughly matching the S1 tier
+DEFAULT_LATENCY = {
+    'analyze': (350.0, 900.0),
+    'image_analysis': (450.0, 1100.0),  # Image Analysis 4.0, read included
+    'read_submit': (150.0, 400.0),
+    'read_processing': (600.0, 1500.0),
+    'read_poll': (40.0, 120.0),
+    'face_detect': (250.0, 700.0)
+}
+
+# Canned scenes; rectangles are fractions of the image size
+SCENES = [
+    {
+        'caption': 'a city street with cars parked on the side',
+        'categories': [('outdoor_street', 0.83)],
+        'tags': [('outdoor', 0.99), ('street', 0.97), ('car', 0.95), ('building', 0.93), ('road', 0.9)],
+        'objects': [('car', 0.86, (0.05, 0.45, 0.35, 0.3)), ('person', 0.78, (0.55, 0.3, 0.1, 0.55)),
+                    ('pole', 0.62, (0.8, 0.1, 0.04, 0.8))],
+        'text': ['MAIN ST', 'NO PARKING'],
+        'faces': [(0.58, 0.32, 0.05)]
+    },
+    {
+        'caption': 'a hallway with a door at the end',
+        'categories': [('indoor_', 0.76)],
+        'tags': [('indoor', 0.99), ('floor', 0.95), ('wall', 0.94), ('door', 0.88)],
+        'objects': [('door', 0.81, (0.42, 0.2, 0.16, 0.6)), ('chair', 0.7, (0.1, 0.55, 0.15, 0.35))],
+        'text': ['EXIT'],
+        'faces': []
+    },
+    {
+        'caption': 'a group of people standing in a room',
+        'categories': [('people_group', 0.9)],
+        'tags': [('person', 0.99), ('indoor', 0.96), ('clothing', 0.93), ('smile', 0.81)],
+        'objects': [('person', 0.92, (0.1, 0.15, 0.25, 0.8)), ('person', 0.9, (0.4, 0.1, 0.22, 0.85)),
+                    ('person', 0.85, (0.68, 0.18, 0.24, 0.78)), ('table', 0.64, (0.3, 0.7, 0.4, 0.3))],
+        'text': [],
+        'faces': [(0.18, 0.18, 0.08), (0.47, 0.13, 0.08), (0.76, 0.21, 0.07)]
+    },
+    {
+        'caption': 'a kitchen with a table and chairs',
+        'categories': [('indoor_kitchen', 0.71)],
+        'tags': [('indoor', 0.99), ('kitchen', 0.96), ('table', 0.9), ('furniture', 0.88)],
+        'objects': [('table', 0.83, (0.25, 0.5, 0.5, 0.4)), ('chair', 0.77, (0.05, 0.5, 0.18, 0.45)),
+                    ('bottle', 0.58, (0.6, 0.4, 0.04, 0.12))],
+        'text': ['MENU', 'COFFEE 2.50'],
+        'faces': []
+    }
+]
+
+
+class LatencyModel:
+    """Log-normal latency distribution described by its median and p95."""
+
+    def __init__(self, median_ms: float, p95_ms: float):
+        """
+        Initialize latency model.
+
+        Args:
+            median_ms: Median latency in milliseconds
+            p95_ms: 95th percentile latency in milliseconds
+        """
+        self.median_ms = max(0.0, median_ms)
+        self.p95_ms = max(self.median_ms, p95_ms)
+        if self.median_ms > 0 and self.p95_ms > self.median_ms:
+            self.sigma = math.log(self.p95_ms / self.median_ms) / 1.645
+        else:
+            self.sigma = 0.0
+
+    def sample(self) -> float:
+        """Draw one latency in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(random.gauss(0.0, self.sigma)) / 1000.0
+
+    def to_dict(self) -> Dict:
+        return {'median_ms': self.median_ms, 'p95_ms': self.p95_ms}
+
+
+class RateLimiter:
+    """Per-key sliding one-minute window, like the Azure free tier."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.calls: Dict[str, List[float]] = {}
+        self.lock = threading.Lock()
+
+    def check(self, key: str) -> Optional[int]:
+        """
+        Record a call.
+
+        Returns:
+            None if allowed, otherwise seconds until the next call is allowed
+        """
+        if self.per_minute <= 0:
+            return None
+        now = time.time()
+        with self.lock:
+            window = [t for t in self.calls.get(key, []) if now - t < 60.0]
+            if len(window) >= self.per_minute:
+                self.calls[key] = window
+                return max(1, int(math.ceil(60.0 - (now - window[0]))))
+            window.append(now)
+            self.calls[key] = window
+        return None
+
+
+class StandInState:
+    """Mutable stand-in settings, payloads and counters."""
+
+    def __init__(self, args):
+        self.lock = threading.Lock()
+        self.latency = {name: LatencyModel(*values) for name, values in DEFAULT_LATENCY.items()}
+        for spec in args.latency or []:
+            self.set_latency(spec)
+        self.latency_scale = args.latency_scale
+        self.rate_limiter = RateLimiter(args.rate_limit)
+        self.throttle_rate = args.throttle_rate
+        self.retry_after = args.retry_after
+        self.error_rate = args.error_rate
+        self.error_mode = args.error_mode
+        self.timeout_seconds = args.timeout_seconds
+        self.face_attributes = not args.no_face_attributes
+        self.image_analysis = not args.no_image_analysis
+        self.api_key = args.key
+        self.recorded = load_recorded(args.payloads) if args.payloads else {}
+        self.operations: Dict[str, Tuple[float, float, Dict]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def set_latency(self, spec: str):
+        """Apply an 'operation=median_ms[:p95_ms]' latency spec."""
+        name, _, values = spec.partition('=')
+        if name not in DEFAULT_LATENCY:
+            raise ValueError(f"Unknown operation '{name}' (expected one of {', '.join(DEFAULT_LATENCY)})")
+        median, _, p95 = values.partition(':')
+        self.latency[name] = LatencyModel(float(median), float(p95 or median))
+
+    def count(self, key: str):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def to_dict(self) -> Dict:
+        return {
+            'latency': {name: model.to_dict() for name, model in self.latency.items()},
+            'latency_scale': self.latency_scale,
+            'rate_limit': self.rate_limiter.per_minute,
+            'throttle_rate': self.throttle_rate,
+            'retry_after': self.retry_after,
+            'error_rate': self.error_rate,
+            'error_mode': self.error_mode,
+            'timeout_seconds': self.timeout_seconds,
+            'face_attributes': self.face_attributes,
+            'image_analysis': self.image_analysis,
+            'recorded_payloads': {name: len(items) for name, items in self.recorded.items()},
+            'pending_read_operations': len(self.operations),
+            'counts': dict(self.counts)
+        }
+
+
+def load_recorded(directory: str) -> Dict[str, List]:
+    """
+    Load recorded responses from a directory.
+
+    Files are named by operation (analyze*.json, read*.json, detect*.json)
+    and hold the raw JSON body returned by Azure; for read, the body of the
+    final analyzeResults poll.
+    """
+    recorded = {}
+    for name in ('analyze', 'read', 'detect'):
+        payloads = []
+        for path in sorted(glob.glob(os.path.join(directory, f"{name}*.json"))):
+            with open(path, encoding='utf-8') as f:
+                payloads.append(json.load(f))
+        if payloads:
+            recorded[name] = payloads
+    return recorded
+
+
+def image_info(image_bytes: bytes) -> Tuple[int, int, str, int]:
+    """Get (width, height, format, scene index) for an uploaded image."""
+    width, height, image_format = 1280, 720, 'Jpeg'
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            width, height = image.size
+            image_format = (image.format or 'JPEG').capitalize()
+    except Exception:
+        pass
+    # Same image -> same scene, so cached results stay consistent
+    scene = int.from_bytes(hashlib.sha1(image_bytes).digest()[:4], 'big') % len(SCENES)
+    return width, height, image_format, scene
+
+
+def _pick_recorded(state: StandInState, name: str, image_bytes: bytes) -> Optional[Dict]:
+    """Choose a recorded payload deterministically for an image."""
+    payloads = state.recorded.get(name)
+    if not payloads:
+        return None
+    index = int.from_bytes(hashlib.sha1(image_bytes).digest()[4:8], 'big') % len(payloads)
+    return payloads[index]
+
+
+def _rect(fraction: Tuple[float, float, float, float], width: int, height: int) -> Dict:
+    x, y, w, h = fraction
+    return {'x': int(x * width), 'y': int(y * height), 'w': int(w * width), 'h': int(h * height)}
+
+
+def analyze_payload(image_bytes: bytes) -> Dict:
+    """Build a v3.2 analyze response for an image."""
+    width, height, image_format, index = image_info(image_bytes)
+    scene = SCENES[index]
+    return {
+        'categories': [{'name': name, 'score': score} for name, score in scene['categories']],
+        'tags': [{'name': name, 'confidence': confidence} for name, confidence in scene['tags']],
+        'description': {
+            'tags': [name for name, _ in scene['tags']],
+            'captions': [{'text': scene['caption'], 'confidence': 0.52}]
+        },
+        'objects': [
+            {'rectangle': _rect(box, width, height), 'object': name, 'confidence': confidence}
+            for name, confidence, box in scene['objects']
+        ],
+        'requestId': str(uuid.uuid4()),
+        'metadata': {'height': height, 'width': width, 'format': image_format},
+        'modelVersion': '2021-05-01'
+    }
+
+
+def read_payload(image_bytes: bytes) -> Dict:
+    """Build the analyzeResult part of a v3.2 read result for an image."""
+    width, height, _, index = image_info(image_bytes)
+    lines = []
+    for number, text in enumerate(SCENES[index]['text']):
+        x1, y1 = int(width * 0.1), int(height * (0.1 + 0.08 * number))
+        x2, y2 = x1 + 24 * len(text), y1 + int(height * 0.06)
+        box = [x1, y1, x2, y1, x2, y2, x1, y2]
+        lines.append({
+            'boundingBox': box,
+            'text': text,
+            'appearance': {'style': {'name': 'other', 'confidence': 0.97}},
+            'words': [{'boundingBox': box, 'text': word, 'confidence': 0.98} for word in text.split()]
+        })
+    return {
+        'version': '3.2.0',
+        'modelVersion': '2022-04-30',
+        'readResults': [{'page': 1, 'angle': 0, 'width': width, 'height': height, 'unit': 'pixel', 'lines': lines}]
+    }
+
+
+def image_analysis_payload(image_bytes: bytes, features: List[str]) -> Dict:
+    """Build an Image Analysis 4.0 analyze response for an image."""
+    width, height, _, index = image_info(image_bytes)
+    scene = SCENES[index]
+    payload = {'modelVersion': '2023-10-01', 'metadata': {'width': width, 'height': height}}
+    if 'caption' in features:
+        payload['captionResult'] = {'text': scene['caption'], 'confidence': 0.78}
+    if 'tags' in features:
+        payload['tagsResult'] = {'values': [{'name': name, 'confidence': c} for name, c in scene['tags']]}
+    if 'objects' in features:
+        payload['objectsResult'] = {'values': [
+            {'boundingBox': _rect(box, width, height), 'tags': [{'name': name, 'confidence': confidence}]}
+            for name, confidence, box in scene['objects']
+        ]}
+    if 'read' in features:
+        lines = []
+        for line in read_payload(image_bytes)['readResults'][0]['lines']:
+            box = line['boundingBox']
+            polygon = [{'x': box[i], 'y': box[i + 1]} for i in range(0, 8, 2)]
+            lines.append({
+                'text': line['text'],
+                'boundingPolygon': polygon,
+                'words': [{'text': word['text'], 'boundingPolygon': polygon, 'confidence': word['confidence']}
+                          for word in line['words']]
+            })
+        payload['readResult'] = {'blocks': [{'lines': lines}] if lines else []}
+    return payload
+
+
+def detect_payload(image_bytes: bytes, attributes: List[str]) -> List[Dict]:
+    """Build a Face v1.0 detect response for an image."""
+    width, height, _, index = image_info(image_bytes)
+    faces = []
+    for number, (x, y, size) in enumerate(SCENES[index]['faces']):
+        face = {
+            'faceId': str(uuid.uuid4()),
+            'faceRectangle': {
+                'top': int(y * height), 'left': int(x * width),
+                'width': int(size * width), 'height': int(size * width)
+            }
+        }
+        face_attributes = {}
+        if 'age' in attributes:
+            face_attributes['age'] = 25.0 + 7 * number
+        if 'gender' in attributes:
+            face_attributes['gender'] = 'female' if number % 2 == 0 else 'male'
+        if 'emotion' in attributes:
+            face_attributes['emotion'] = {
+                'anger': 0.0, 'contempt': 0.0, 'disgust': 0.0, 'fear': 0.0,
+                'happiness': 0.7 if number % 2 == 0 else 0.1, 'neutral': 0.3 if number % 2 == 0 else 0.9,
+                'sadness': 0.0, 'surprise': 0.0
+            }
+        if face_attributes:
+            face['faceAttributes'] = face_attributes
+        faces.append(face)
+    return faces
+
+
+def error_response(status: int, code: str, message: str, headers: Optional[Dict] = None) -> Response:
+    """Build an Azure-style JSON error response."""
+    response = jsonify({'error': {'code': code, 'message': message}})
+    response.status_code = status
+    for key, value in (headers or {}).items():
+        response.headers[key] = value
+    return response
+
+
+def create_app(state: StandInState) -> Flask:
+    """Create the stand-in Flask app."""
+    app = Flask(__name__)
+
+    def delay(operation: str):
+        """Sleep for a latency drawn from the operation's distribution."""
+        seconds = state.latency[operation].sample() * state.latency_scale
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def check_request(operation: str) -> Optional[Response]:
+        """Apply auth, rate limiting and fault injection. Returns an error response or None."""
+        state.count(operation)
+        key = request.headers.get('Ocp-Apim-Subscription-Key', '')
+        if not key or (state.api_key and key != state.api_key):
+            state.count('error_401')
+            return error_response(401, '401', 'Access denied due to invalid subscription key or wrong API endpoint. '
+                                  'Make sure to provide a valid key for an active subscription and use a correct '
+                                  'regional API endpoint for your resource.')
+
+        wait = state.rate_limiter.check(key)
+        if wait is None and state.throttle_rate > 0 and random.random() < state.throttle_rate:
+            wait = state.retry_after
+        if wait is not None:
+            state.count('error_429')
+            return error_response(429, '429', f'Rate limit is exceeded. Try again in {wait} seconds.',
+                                  {'Retry-After': str(wait)})
+
+        if state.error_rate > 0 and random.random() < state.error_rate:
+            mode = state.error_mode
+            state.count(f'error_{mode}')
+            if mode == 'timeout':
+                time.sleep(state.timeout_seconds)
+                return error_response(504, 'Timeout', 'The operation was timeout.')
+            if mode == '401':
+                return error_response(401, '401', 'Access denied due to invalid subscription key.')
+            if mode == '403':
+                return error_response(403, '403', 'Public access is disabled. Please configure private endpoint.')
+            if mode == '503':
+                return error_response(503, 'ServiceUnavailable', 'The service is temporarily unavailable.',
+                                      {'Retry-After': str(state.retry_after)})
+            return error_response(500, 'InternalServerError', 'An internal server error occurred.')
+        return None
+
+    @app.route('/vision/v3.2/analyze', methods=['POST'])
+    def analyze():
+        error = check_request('analyze')
+        if error is not None:
+            return error
+        image_bytes = request.get_data()
+        delay('analyze')
+        payload = _pick_recorded(state, 'analyze', image_bytes) or analyze_payload(image_bytes)
+        return jsonify(payload)
+
+    @app.route('/vision/v3.2/read/analyze', methods=['POST'])
+    def read_submit():
+        error = check_request('read_submit')
+        if error is not None:
+            return error
+        image_bytes = request.get_data()
+        delay('read_submit')
+
+        recorded = _pick_recorded(state, 'read', image_bytes)
+        result = recorded.get('analyzeResult', recorded) if recorded else read_payload(image_bytes)
+        operation_id = str(uuid.uuid4())
+        now = time.time()
+        ready_at = now + state.latency['read_processing'].sample() * state.latency_scale
+        with state.lock:
+            # Keep the operation table bounded
+            expired = [op for op, (_, created, _) in state.operations.items() if now - created > 600]
+            for op in expired:
+                del state.operations[op]
+            state.operations[operation_id] = (ready_at, now, result)
+
+        response = Response(status=202)
+        response.headers['Operation-Location'] = f"{request.host_url.rstrip('/')}/vision/v3.2/read/analyzeResults/{operation_id}"
+        response.headers['apim-request-id'] = operation_id
+        return response
+
+    @app.route('/vision/v3.2/read/analyzeResults/<operation_id>', methods=['GET'])
+    def read_result(operation_id):
+        state.count('read_poll')
+        delay('read_poll')
+        with state.lock:
+            operation = state.operations.get(operation_id)
+        if operation is None:
+            return error_response(404, 'NotFound', 'The requested operation was not found.')
+
+        ready_at, created, result = operation
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(created))
+        body = {'status': 'running', 'createdDateTime': timestamp, 'lastUpdatedDateTime': timestamp}
+        if time.time() >= ready_at:
+            body['status'] = 'succeeded'
+            body['analyzeResult'] = result
+        return jsonify(body)
+
+    @app.route('/computervision/imageanalysis:analyze', methods=['POST'])
+    def image_analysis():
+        if not state.image_analysis:
+            state.count('error_404')
+            return error_response(404, '404', 'Resource not found')
+        error = check_request('image_analysis')
+        if error is not None:
+            return error
+        features = [f for f in request.args.get('features', '').split(',') if f]
+        unknown = [f for f in features if f not in IMAGE_ANALYSIS_FEATURES]
+        if not features or unknown:
+            state.count('error_400')
+            return error_response(400, 'InvalidRequest', f"Invalid features: {','.join(unknown) or '(none)'}")
+        image_bytes = request.get_data()
+        delay('image_analysis')
+        return jsonify(image_analysis_payload(image_bytes, features))
+
+    @app.route('/face/v1.0/detect', methods=['POST'])
+    def face_detect():
+        error = check_request('face_detect')
+        if error is not None:
+            return error
+        attributes = [a for a in request.args.get('returnFaceAttributes', '').split(',') if a]
+        if attributes and not state.face_attributes:
+            state.count('error_400')
+            return error_response(400, 'InvalidRequest', 'Invalid request has been sent.')
+        image_bytes = request.get_data()
+        delay('face_detect')
+        payload = _pick_recorded(state, 'detect', image_bytes)
+        if payload is None:
+            payload = detect_payload(image_bytes, attributes)
+        return jsonify(payload)
+
+    @app.route('/_standin/config', methods=['GET', 'POST'])
+    def standin_config():
+        """Inspect or change fault settings at runtime."""
+        if request.method == 'POST':
+            updates = request.get_json(force=True) or {}
+            try:
+                for spec in updates.pop('latency', []):
+                    state.set_latency(spec)
+                if 'rate_limit' in updates:
+                    state.rate_limiter = RateLimiter(int(updates.pop('rate_limit')))
+                if updates.get('error_mode', state.error_mode) not in ERROR_MODES:
+                    raise ValueError(f"error_mode must be one of {', '.join(ERROR_MODES)}")
+                for key in ('latency_scale', 'throttle_rate', 'retry_after', 'error_rate',
+                            'error_mode', 'timeout_seconds', 'face_attributes', 'image_analysis'):
+                    if key in updates:
+                        setattr(state, key, type(getattr(state, key))(updates.pop(key)))
+                if updates:
+                    raise ValueError(f"Unknown settings: {', '.join(updates)}")
+            except (TypeError, ValueError) as e:
+                return jsonify({'error': str(e)}), 400
+        return jsonify(state.to_dict())
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Azure Computer Vision and Face APIs")
+    parser.add_argument('--host', default='127.0.0.1', help="Bind address")
+    parser.add_argument('--port', type=int, default=5055, help="Port")
+    parser.add_argument('--key', help="Require this subscription key (default: accept any non-empty key)")
+    parser.add_argument('--payloads', help="Directory of recorded responses (analyze*.json, read*.json, detect*.json)")
+    parser.add_argument('--latency', action='append', metavar='OP=MEDIAN[:P95]',
+                        help=f"Latency in ms for an operation ({', '.join(DEFAULT_LATENCY)}); repeatable")
+    parser.add_argument('--latency-scale', type=float, default=1.0, help="Multiply all latencies (0 disables)")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Calls per minute per key before 429 (0 = unlimited)")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds for injected 429/503")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of calls answered with --error-mode")
+    parser.add_argument('--error-mode', choices=ERROR_MODES, default='500', help="Injected error type")
+    parser.add_argument('--timeout-seconds', type=float, default=30.0, help="Delay for the 'timeout' error mode")
+    parser.add_argument('--no-face-attributes', action='store_true',
+                        help="Reject face attribute requests with 400, like detection_03 on current Azure")
+    parser.add_argument('--no-image-analysis', action='store_true',
+                        help="Answer Image Analysis 4.0 requests with 404, like a region without it")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    try:
+        state = StandInState(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    if not args.verbose:
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    endpoint = f"http://{args.host}:{args.port}"
+    print(f"Azure stand-in listening on {endpoint}")
+    print(f"  AZURE_COMPUTER_VISION_ENDPOINT={endpoint}")
+    print(f"  AZURE_FACE_ENDPOINT={endpoint}")
+    create_app(state).run(host=args.host, port=args.port, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 """Azure Computer Vision integration for object detection, OCR, and scene analysis."""
 import io
-from typing import List, Dict, Optional
+from typing import Collection, List, Dict, Optional
 from azure.cognitiveservices.vision.computervision import ComputerVisionClient
 from azure.cognitiveservices.vision.computervision.models import (
     VisualFeatureTypes,
@@ -9,105 +9,182 @@ from azure.cognitiveservices.vision.computervision.models import (
 from msrest.authentication import CognitiveServicesCredentials
 from PIL import Image
 import config
+import tracing
+
+
+# Result field -> visual feature it needs (obstacles are picked from detected objects)
+VISUAL_FEATURES = {
+    'objects': VisualFeatureTypes.objects,
+    'obstacles': VisualFeatureTypes.objects,
+    'description': VisualFeatureTypes.description,
+    'tags': VisualFeatureTypes.tags,
+    'categories': VisualFeatureTypes.categories
+}
+
+
+def visual_features(fields: Collection[str]) -> List:
+    """Get the minimal visual_features list for the requested result fields."""
+    features = []
+    for field in fields:
+        feature = VISUAL_FEATURES[field]
+        if feature not in features:
+            features.append(feature)
+    return features
 
 
 class AzureVisionService:
     """Service for interacting with Azure Computer Vision API."""
     
-    def __init__(self):
-        """Initialize Azure Computer Vision client."""
-        if not config.Config.AZURE_COMPUTER_VISION_KEY:
+    def __init__(self, endpoint: Optional[str] = None, key: Optional[str] = None):
+        """
+        Initialize Azure Computer Vision client.
+        
+        Args:
+            endpoint: Resource endpoint (defaults to AZURE_COMPUTER_VISION_ENDPOINT)
+            key: API key (defaults to AZURE_COMPUTER_VISION_KEY)
+        """
+        key = key or config.Config.AZURE_COMPUTER_VISION_KEY
+        if not key:
             raise ValueError("Azure Computer Vision API key not configured")
         
-        credentials = CognitiveServicesCredentials(config.Config.AZURE_COMPUTER_VISION_KEY)
+        credentials = CognitiveServicesCredentials(key)
         self.client = ComputerVisionClient(
-            config.Config.AZURE_COMPUTER_VISION_ENDPOINT,
+            endpoint or config.Config.AZURE_COMPUTER_VISION_ENDPOINT,
             credentials
         )
     
-    def analyze_image(self, image_bytes: bytes) -> Dict:
+    def analyze_image(self, image_bytes: bytes, features: Optional[Collection[str]] = None) -> Dict:
         """
         Analyze image for objects, text, and scene description.
         
         Args:
             image_bytes: Image data as bytes
+            features: Result fields wanted ('objects', 'obstacles',
+                'description', 'tags', 'categories'); None for all. Only the
+                visual features they need are requested.
             
         Returns:
             Dictionary containing analysis results
         """
         try:
-            # Convert bytes to image stream
-            image_stream = io.BytesIO(image_bytes)
+            fields = features if features is not None else list(VISUAL_FEATURES)
+            analysis = self._analyze(image_bytes, visual_features(fields))
             
-            # Analyze image with multiple features
-            features = [
-                VisualFeatureTypes.objects,
-                VisualFeatureTypes.description,
-                VisualFeatureTypes.tags,
-                VisualFeatureTypes.categories
-            ]
+            # Extract results
+            result = self._extract_scene(analysis, fields)
+            if 'objects' in fields:
+                result['objects'] = self._extract_objects(analysis)
+            if 'obstacles' in fields:
+                result['obstacles'] = self._identify_obstacles(analysis)
+            
+            print(f"[Azure Vision] Analysis complete - Description: {result.get('description', '')[:50]}..., "
+                  f"Objects: {len(result.get('objects', []))}, Tags: {len(result.get('tags', []))}")
             
-            analysis = self.client.analyze_image_in_stream(
+            return result
+            
+        except Exception as e:
+            return self._error_result(e)
+    
+    def detect_obstacles(self, image_bytes: bytes) -> Dict:
+        """
+        Detect objects and obstacles only (the fast lane of the pipeline).
+        
+        Args:
+            image_bytes: Image data as bytes
+            
+        Returns:
+            Dictionary with 'objects' and 'obstacles'
+        """
+        try:
+            analysis = self._analyze(image_bytes, [VisualFeatureTypes.objects])
+            return {
+                'objects': self._extract_objects(analysis),
+                'obstacles': self._identify_obstacles(analysis)
+            }
+        except Exception as e:
+            return self._error_result(e)
+    
+    def describe_scene(self, image_bytes: bytes, objects: Optional[List[Dict]] = None,
+                       features: Optional[Collection[str]] = None) -> Dict:
+        """
+        Describe the scene without object detection (the slow lane of the pipeline).
+        
+        Args:
+            image_bytes: Image data as bytes
+            objects: Objects already detected in the frame (unused by Azure)
+            features: Fields wanted ('description', 'tags', 'categories'); None for all
+            
+        Returns:
+            Dictionary with 'description', 'tags' and 'categories' (those requested)
+        """
+        try:
+            fields = features if features is not None else ['description', 'tags', 'categories']
+            return self._extract_scene(self._analyze(image_bytes, visual_features(fields)), fields)
+        except Exception as e:
+            return self._error_result(e)
+    
+    def _analyze(self, image_bytes: bytes, features: List):
+        """Run analyze_image_in_stream for the given visual features."""
+        # Convert bytes to image stream
+        image_stream = io.BytesIO(image_bytes)
+        with tracing.span('azure.analyze', features=','.join(str(f.value) for f in features)):
+            return self.client.analyze_image_in_stream(
                 image_stream,
                 visual_features=features
             )
-            
-            # Extract results
-            description = self._extract_description(analysis)
-            objects = self._extract_objects(analysis)
-            tags = []
-            categories = []
-            
+    
+    def _extract_scene(self, analysis, fields: Collection[str] = ('description', 'tags', 'categories')) -> Dict:
+        """Extract description, tags and categories (those in fields) from analysis."""
+        scene = {}
+        
+        if 'description' in fields:
+            scene['description'] = self._extract_description(analysis)
+        
+        if 'tags' in fields:
+            scene['tags'] = []
             try:
                 if hasattr(analysis, 'tags') and analysis.tags:
-                    tags = [tag.name for tag in analysis.tags if hasattr(tag, 'name')]
+                    scene['tags'] = [tag.name for tag in analysis.tags if hasattr(tag, 'name')]
             except Exception as e:
                 print(f"Error extracting tags: {e}")
-            
+        
+        if 'categories' in fields:
+            scene['categories'] = []
             try:
                 if hasattr(analysis, 'categories') and analysis.categories:
-                    categories = [cat.name for cat in analysis.categories if hasattr(cat, 'name')]
+                    scene['categories'] = [cat.name for cat in analysis.categories if hasattr(cat, 'name')]
             except Exception as e:
                 print(f"Error extracting categories: {e}")
-            
-            result = {
-                'description': description,
-                'objects': objects,
-                'tags': tags,
-                'categories': categories,
-                'obstacles': self._identify_obstacles(analysis)
+        
+        return scene
+    
+    def _error_result(self, e: Exception) -> Dict:
+        """Turn an analysis exception into an error result."""
+        error_msg = str(e)
+        print(f"[Azure Vision] Analysis error: {error_msg}")
+        
+        # Provide user-friendly error messages
+        if '403' in error_msg and 'Public access is disabled' in error_msg:
+            return {
+                'error': 'Azure Computer Vision resource has public access disabled. Please enable public network access in Azure Portal.',
+                'error_code': 'PUBLIC_ACCESS_DISABLED',
+                'solution': 'Go to Azure Portal > Your Computer Vision resource > Networking > Enable public network access'
             }
-            
-            print(f"[Azure Vision] Analysis complete - Description: {description[:50]}..., Objects: {len(objects)}, Tags: {len(tags)}")
-            
-            return result
-            
-        except Exception as e:
-            error_msg = str(e)
-            print(f"[Azure Vision] Analysis error: {error_msg}")
-            
-            # Provide user-friendly error messages
-            if '403' in error_msg and 'Public access is disabled' in error_msg:
-                return {
-                    'error': 'Azure Computer Vision resource has public access disabled. Please enable public network access in Azure Portal.',
-                    'error_code': 'PUBLIC_ACCESS_DISABLED',
-                    'solution': 'Go to Azure Portal > Your Computer Vision resource > Networking > Enable public network access'
-                }
-            elif '401' in error_msg or 'Unauthorized' in error_msg:
-                return {
-                    'error': 'Invalid API key or endpoint. Please check your Azure credentials in .env file.',
-                    'error_code': 'AUTH_ERROR'
-                }
-            elif '429' in error_msg or 'rate limit' in error_msg.lower():
-                return {
-                    'error': 'API rate limit exceeded. Please wait a moment and try again.',
-                    'error_code': 'RATE_LIMIT',
-                    'solution': 'Free tier allows 20 calls/minute. Consider upgrading or reducing processing frequency.'
-                }
-            
-            import traceback
-            traceback.print_exc()
-            return {'error': error_msg, 'error_code': 'UNKNOWN'}
+        elif '401' in error_msg or 'Unauthorized' in error_msg:
+            return {
+                'error': 'Invalid API key or endpoint. Please check your Azure credentials in .env file.',
+                'error_code': 'AUTH_ERROR'
+            }
+        elif '429' in error_msg or 'rate limit' in error_msg.lower():
+            return {
+                'error': 'API rate limit exceeded. Please wait a moment and try again.',
+                'error_code': 'RATE_LIMIT',
+                'solution': 'Free tier allows 20 calls/minute. Consider upgrading or reducing processing frequency.'
+            }
+        
+        import traceback
+        traceback.print_exc()
+        return {'error': error_msg, 'error_code': 'UNKNOWN'}
     
     def read_text(self, image_bytes: bytes) -> Dict:
         """
@@ -123,10 +200,11 @@ class AzureVisionService:
             image_stream = io.BytesIO(image_bytes)
             
             # Use read API for better text extraction
-            read_response = self.client.read_in_stream(
-                image_stream,
-                raw=True
-            )
+            with tracing.span('azure.read.submit'):
+                read_response = self.client.read_in_stream(
+                    image_stream,
+                    raw=True
+                )
             
             # Get operation ID
             read_operation_location = read_response.headers["Operation-Location"]
@@ -134,8 +212,11 @@ class AzureVisionService:
             
             # Wait for operation to complete
             import time
+            poll = 0
             while True:
-                read_result = self.client.get_read_result(operation_id)
+                poll += 1
+                with tracing.span('azure.read.poll', attempt=poll):
+                    read_result = self.client.get_read_result(operation_id)
                 if read_result.status not in ['notStarted', 'running']:
                     break
                 time.sleep(0.1)
@@ -251,12 +332,14 @@ class AzureFaceService:
             print(f"Face API initialization failed: {e}")
             self.client = None
     
-    def detect_faces(self, image_bytes: bytes) -> List[Dict]:
+    def detect_faces(self, image_bytes: bytes, raise_errors: bool = False) -> List[Dict]:
         """
         Detect faces in image.
         
         Args:
             image_bytes: Image data as bytes
+            raise_errors: Raise when the call fails instead of returning [],
+                so the caller can tell a failure from an image without faces
             
         Returns:
             List of detected faces with positions
@@ -269,20 +352,22 @@ class AzureFaceService:
             
             # Try with face attributes first
             try:
-                detected_faces = self.client.face.detect_with_stream(
-                    image_stream,
-                    detection_model=self.detection_model,
-                    return_face_attributes=['age', 'gender', 'emotion']
-                )
+                with tracing.span('azure.face.detect', attempt=1):
+                    detected_faces = self.client.face.detect_with_stream(
+                        image_stream,
+                        detection_model=self.detection_model,
+                        return_face_attributes=['age', 'gender', 'emotion']
+                    )
             except Exception as attr_error:
                 # Fallback: try without emotion attribute (some API versions don't support it)
                 print(f"Warning: Could not get emotion attribute: {attr_error}")
                 image_stream.seek(0)  # Reset stream
-                detected_faces = self.client.face.detect_with_stream(
-                    image_stream,
-                    detection_model=self.detection_model,
-                    return_face_attributes=['age', 'gender']
-                )
+                with tracing.span('azure.face.detect', attempt=2):
+                    detected_faces = self.client.face.detect_with_stream(
+                        image_stream,
+                        detection_model=self.detection_model,
+                        return_face_attributes=['age', 'gender']
+                    )
             
             faces = []
             for face in detected_faces:
@@ -339,6 +424,8 @@ class AzureFaceService:
                 if '403' not in error_msg and '401' not in error_msg:
                     import traceback
                     traceback.print_exc()
+            if raise_errors:
+                raise
             return []
     
     def _get_primary_emotion(self, emotion) -> str:
@@ -0,0 +1,623 @@
+#!/usr/bin/env python3
+"""Offline micro-benchmarks for the CPU hot paths.
+
+Runs against deterministic synthetic frames and detections, so results are
+comparable between commits on the same machine. No network or camera needed.
+
+Usage:
+    python benchmark.py                       # run all, save JSON
+    python benchmark.py --filter camera       # run matching benchmarks only
+    python benchmark.py --compare old.json    # compare against a previous run
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+import config
+
+# Keep the benchmarks free of tracing I/O and per-session budgets
+config.Config.TRACE_SAMPLE_RATE = 0.0
+config.Config.SESSION_ANALYSES_PER_MINUTE = 1e9
+
+RESULTS_DIR = 'benchmark_results'
+BENCHMARK_ENDPOINT = 'http://azure.benchmark.invalid'  # Azure calls are answered by _canned_azure_session()
+
+COCO_CLASSES = [
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck', 'boat',
+    'traffic light', 'fire hydrant', 'stop sign', 'parking meter', 'bench', 'bird', 'cat', 'dog',
+    'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra', 'giraffe', 'backpack', 'umbrella',
+    'handbag', 'tie', 'suitcase', 'frisbee', 'skis', 'snowboard', 'sports ball', 'kite',
+    'baseball bat', 'baseball glove', 'skateboard', 'surfboard', 'tennis racket', 'bottle',
+    'wine glass', 'cup', 'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple', 'sandwich', 'orange',
+    'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair', 'couch', 'potted plant',
+    'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse', 'remote', 'keyboard', 'cell phone',
+    'microwave', 'oven', 'toaster', 'sink', 'refrigerator', 'book', 'clock', 'vase', 'scissors',
+    'teddy bear', 'hair drier', 'toothbrush'
+]
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def make_frame(width: int = 1280, height: int = 720, seed: int = 0) -> np.ndarray:
+    """Build a deterministic street-like BGR test frame with edges, noise and text."""
+    import cv2
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[..., 0] = (80 + 100 * y + 20 * x).astype(np.uint8)
+    frame[..., 1] = (90 + 80 * y).astype(np.uint8)
+    frame[..., 2] = (100 + 60 * x).astype(np.uint8)
+    for _ in range(12):
+        x1, y1 = int(rng.integers(0, width - 100)), int(rng.integers(0, height - 100))
+        w, h = int(rng.integers(40, 300)), int(rng.integers(40, 300))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(frame, (x1, y1), (x1 + w, y1 + h), color, -1)
+    cv2.putText(frame, 'MAIN ST EXIT', (100, 120), cv2.FONT_HERSHEY_SIMPLEX, 2.0, (255, 255, 255), 4)
+    noise = rng.integers(0, 12, frame.shape, dtype=np.uint8)
+    return cv2.add(frame, noise)
+
+
+class _FakeTensor:
+    """Minimal stand-in for a torch tensor (.cpu().numpy())."""
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        self.tensor = self
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class _FakeInstances:
+    """Minimal stand-in for detectron2 Instances."""
+
+    def __init__(self, boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray):
+        self.pred_boxes = _FakeTensor(boxes)
+        self.scores = _FakeTensor(scores)
+        self.pred_classes = _FakeTensor(classes)
+
+    def __len__(self):
+        return len(self.scores.array)
+
+
+def make_detections(count: int = 40, seed: int = 0, width: int = 1280, height: int = 720) -> Dict:
+    """Build deterministic Detectron2-style outputs with count detections."""
+    rng = np.random.default_rng(seed)
+    x1 = rng.uniform(0, width - 50, count)
+    y1 = rng.uniform(0, height - 50, count)
+    x2 = np.minimum(width, x1 + rng.uniform(5, 400, count))
+    y2 = np.minimum(height, y1 + rng.uniform(5, 400, count))
+    boxes = np.stack([x1, y1, x2, y2], axis=1).astype(np.float32)
+    scores = rng.uniform(0.5, 1.0, count).astype(np.float32)
+    classes = rng.integers(0, len(COCO_CLASSES), count)
+    return {'instances': _FakeInstances(boxes, scores, classes)}
+
+
+def make_analysis(seed: int = 0) -> Dict:
+    """Build a representative analysis dict as produced by the vision backends."""
+    rng = np.random.default_rng(seed)
+    objects = []
+    for i in range(12):
+        objects.append({
+            'name': COCO_CLASSES[int(rng.integers(0, 20))],
+            'confidence': float(rng.uniform(0.5, 1.0)),
+            'position': {'x': float(rng.uniform(0, 1200)), 'y': float(rng.uniform(0, 700)),
+                         'width': float(rng.uniform(20, 400)), 'height': float(rng.uniform(20, 400))}
+        })
+    obstacles = [dict(o, distance_estimate='close') for o in objects[:4]]
+    return {
+        'description': 'a city street with cars and people walking on the sidewalk',
+        'objects': objects,
+        'tags': ['outdoor', 'street', 'car', 'person', 'building', 'road', 'city'],
+        'categories': ['outdoor_street'],
+        'obstacles': obstacles,
+        'text': 'MAIN ST EXIT\nNO PARKING',
+        'faces': [{'position': {'x': 10, 'y': 10, 'width': 50, 'height': 50},
+                   'age': 30, 'gender': 'female', 'emotion': 'neutral'}]
+    }
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+class BenchmarkSkipped(Exception):
+    """Raised by a benchmark setup when its dependencies are unavailable."""
+
+
+def measure(func: Callable, min_time: float = 0.2, rounds: int = 7) -> Dict:
+    """
+    Time func over several rounds.
+
+    Args:
+        func: Zero-argument callable to time
+        min_time: Target seconds per round (iterations are calibrated to reach it)
+        rounds: Number of timed rounds
+
+    Returns:
+        Per-operation timing statistics in microseconds
+    """
+    # Warm up and calibrate the iteration count
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 5 or iterations >= 1_000_000:
+            break
+        iterations *= 2
+    iterations = max(1, int(iterations * (min_time / max(elapsed, 1e-9))))
+
+    per_op = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        per_op.append((time.perf_counter() - started) / iterations * 1e6)
+
+    return {
+        'iterations': iterations,
+        'rounds': rounds,
+        'min_us': round(min(per_op), 3),
+        'median_us': round(statistics.median(per_op), 3),
+        'mean_us': round(statistics.mean(per_op), 3),
+        'stdev_us': round(statistics.stdev(per_op), 3) if rounds > 1 else 0.0,
+        'ops_per_sec': round(1e6 / statistics.median(per_op), 1)
+    }
+
+
+BENCHMARKS: List = []
+
+
+def benchmark(name: str):
+    """Register a benchmark setup function returning the callable to time."""
+    def decorator(setup: Callable[[], Callable]):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def _camera_processor():
+    """CameraProcessor holding the sample frame, without opening a device."""
+    from camera_processor import CameraProcessor
+    processor = CameraProcessor(0)
+    processor.current_frame = make_frame()
+    return processor
+
+
+@benchmark('camera.get_frame_copy')
+def bench_camera_copy():
+    processor = _camera_processor()
+    return processor.get_frame
+
+
+@benchmark('camera.get_frame_bytes_jpeg')
+def bench_camera_jpeg():
+    processor = _camera_processor()
+    return processor.get_frame_bytes
+
+
+@benchmark('camera.get_frame_base64')
+def bench_camera_base64():
+    processor = _camera_processor()
+    return processor.get_frame_base64
+
+
+def _detectron2_service():
+    """Detectron2VisionService with COCO metadata but no model loaded."""
+    try:
+        from detectron2_vision import Detectron2VisionService
+    except ImportError as e:
+        raise BenchmarkSkipped(f"detectron2_vision not importable: {e}")
+
+    class _Metadata:
+        thing_classes = COCO_CLASSES
+
+    service = object.__new__(Detectron2VisionService)
+    service.metadata = _Metadata()
+    return service
+
+
+@benchmark('detectron2.extract_objects')
+def bench_detectron2_extract_objects():
+    service = _detectron2_service()
+    outputs = make_detections()
+    return lambda: service._extract_objects(outputs, (720, 1280, 3))
+
+
+@benchmark('detectron2.identify_obstacles')
+def bench_detectron2_identify_obstacles():
+    service = _detectron2_service()
+    objects = service._extract_objects(make_detections(), (720, 1280, 3))
+    return lambda: service._identify_obstacles(objects)
+
+
+@benchmark('detectron2.extract_categories')
+def bench_detectron2_extract_categories():
+    service = _detectron2_service()
+    objects = service._extract_objects(make_detections(), (720, 1280, 3))
+    return lambda: service._extract_categories(objects)
+
+
+class _NullAudio:
+    """Audio sink that records nothing, so only string assembly is timed."""
+
+    queue = None
+
+    def speak(self, text, priority=0, interrupt=False):
+        pass
+
+    def speak_obstacle_warning(self, obstacles):
+        pass
+
+
+def _import_app():
+    """Import the Flask app, skipping if its runtime dependencies are missing."""
+    try:
+        import app
+    except Exception as e:
+        raise BenchmarkSkipped(f"app not importable: {e}")
+    return app
+
+
+@benchmark('app.generate_audio_feedback')
+def bench_generate_audio_feedback():
+    app = _import_app()
+    app.audio_service = _NullAudio()
+    analysis = make_analysis()
+    return lambda: app.generate_audio_feedback(analysis)
+
+
+@benchmark('audio.calculate_direction')
+def bench_calculate_direction():
+    try:
+        from audio_service import AudioService
+    except Exception as e:
+        raise BenchmarkSkipped(f"audio_service not importable: {e}")
+    service = object.__new__(AudioService)
+    positions = [{'x': float(x), 'y': 100.0, 'width': 120.0, 'height': 200.0} for x in range(0, 1280, 80)]
+
+    def run():
+        for position in positions:
+            service._calculate_direction(position)
+    return run
+
+
+class _CannedVision:
+    """Vision backend returning a fixed result, so only request handling is timed."""
+
+    def __init__(self):
+        self.analysis = make_analysis()
+
+    def analyze_image(self, image_bytes, features=None):
+        return dict(self.analysis)
+
+    def read_text(self, image_bytes):
+        return {'text': '', 'lines': []}
+
+
+@benchmark('flask.api_process_request')
+def bench_api_process():
+    import cv2
+    app = _import_app()
+    app.vision_service = _CannedVision()
+    app.face_service = None
+    _, buffer = cv2.imencode('.jpg', make_frame(), [cv2.IMWRITE_JPEG_QUALITY, 85])
+    image_bytes = buffer.tobytes()
+    client = app.app.test_client()
+
+    def run():
+        response = client.post(
+            '/api/process',
+            data={'image': (io.BytesIO(image_bytes), 'frame.jpg')},
+            headers={'X-Session-ID': 'benchmark'}
+        )
+        assert response.status_code == 200, response.status_code
+    return run
+
+
+def _serialization():
+    """serialization module with the sample analysis (larger lists, like a busy street scene)."""
+    import serialization
+    analysis = make_analysis()
+    analysis['objects'] = analysis['objects'] * 3
+    analysis['tags'] = analysis['tags'] * 4
+    return serialization, analysis
+
+
+@benchmark('serialization.stdlib_json')
+def bench_serialization_stdlib():
+    _, analysis = _serialization()
+    return lambda: json.dumps(analysis, separators=(',', ':')).encode('utf-8')
+
+
+@benchmark('serialization.encode_full')
+def bench_serialization_full():
+    serialization, analysis = _serialization()
+    return lambda: serialization.dumps(serialization.round_floats(serialization.trim(analysis, 'full')))
+
+
+@benchmark('serialization.encode_ui')
+def bench_serialization_ui():
+    serialization, analysis = _serialization()
+    return lambda: serialization.dumps(serialization.round_floats(serialization.trim(analysis, 'ui')))
+
+
+@benchmark('serialization.encode_minimal')
+def bench_serialization_minimal():
+    serialization, analysis = _serialization()
+    return lambda: serialization.dumps(serialization.round_floats(serialization.trim(analysis, 'minimal')))
+
+
+@benchmark('serialization.encode_cached')
+def bench_serialization_cached():
+    serialization, analysis = _serialization()
+    encodings = {}
+    return lambda: serialization.encode_analysis(analysis, 'ui', encodings)
+
+
+def make_azure_responses(seed: int = 0) -> Dict[str, bytes]:
+    """Build canned Azure v3.2 analyze, Read and Face detect JSON bodies, keyed by URL path suffix."""
+    rng = np.random.default_rng(seed)
+    analysis = make_analysis(seed)
+    objects = [{
+        'rectangle': {'x': int(o['position']['x']), 'y': int(o['position']['y']),
+                      'w': int(o['position']['width']), 'h': int(o['position']['height'])},
+        'object': o['name'],
+        'confidence': round(o['confidence'], 3),
+        'parent': {'object': 'thing', 'confidence': 0.9}
+    } for o in analysis['objects']]
+    lines = [{
+        'boundingBox': [float(v) for v in rng.integers(0, 1280, 8)],
+        'text': text,
+        'appearance': {'style': {'name': 'other', 'confidence': 0.9}},
+        'words': [{'boundingBox': [float(v) for v in rng.integers(0, 1280, 8)], 'text': word, 'confidence': 0.98}
+                  for word in text.split()]
+    } for text in analysis['text'].split('\n')]
+    return {
+        '/vision/v3.2/analyze': json.dumps({
+            'categories': [{'name': name, 'score': 0.8} for name in analysis['categories']],
+            'tags': [{'name': name, 'confidence': 0.9} for name in analysis['tags']],
+            'description': {'tags': analysis['tags'], 'captions': [{'text': analysis['description'], 'confidence': 0.5}]},
+            'objects': objects,
+            'requestId': 'benchmark',
+            'metadata': {'height': 720, 'width': 1280, 'format': 'Jpeg'},
+            'modelVersion': '2021-05-01'
+        }).encode(),
+        '/vision/v3.2/read/analyze': b'',
+        '/vision/v3.2/read/analyzeResults/benchmark': json.dumps({
+            'status': 'succeeded',
+            'createdDateTime': '2024-01-01T00:00:00Z',
+            'lastUpdatedDateTime': '2024-01-01T00:00:01Z',
+            'analyzeResult': {'version': '3.2.0', 'modelVersion': '2022-04-30', 'readResults': [
+                {'page': 1, 'angle': 0, 'width': 1280, 'height': 720, 'unit': 'pixel', 'lines': lines}
+            ]}
+        }).encode(),
+        '/face/v1.0/detect': json.dumps([{
+            'faceRectangle': {'top': 10 + 60 * i, 'left': 20 + 60 * i, 'width': 50, 'height': 50},
+            'faceAttributes': {'age': 30.0, 'gender': 'female', 'emotion': {
+                'anger': 0.0, 'contempt': 0.0, 'disgust': 0.0, 'fear': 0.0, 'happiness': 0.9,
+                'neutral': 0.1, 'sadness': 0.0, 'surprise': 0.0}}
+        } for i in range(3)]).encode()
+    }
+
+
+def _canned_azure_session():
+    """requests.Session answering Azure calls from make_azure_responses(), without any network I/O."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from requests.structures import CaseInsensitiveDict
+    from urllib.parse import urlsplit
+
+    responses = make_azure_responses()
+
+    class _CannedAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            path = urlsplit(request.url).path
+            response = requests.Response()
+            response.request, response.url, response.reason = request, request.url, 'OK'
+            response.status_code = 202 if path.endswith('/read/analyze') else 200
+            response._content = responses[path]
+            response.encoding = 'utf-8'
+            response.headers = CaseInsensitiveDict({'Content-Type': 'application/json; charset=utf-8'})
+            if response.status_code == 202:
+                response.headers['Operation-Location'] = f"{BENCHMARK_ENDPOINT}/vision/v3.2/read/analyzeResults/benchmark"
+            return response
+
+    session = requests.Session()
+    session.mount('http://', _CannedAdapter())
+    return session
+
+
+def _sdk_services():
+    """SDK vision and face services whose HTTP calls are answered by _canned_azure_session()."""
+    try:
+        from azure_vision import AzureVisionService, AzureFaceService
+    except ImportError as e:
+        raise BenchmarkSkipped(f"Azure SDK not importable: {e}")
+    config.Config.AZURE_FACE_ENDPOINT, config.Config.AZURE_FACE_KEY = BENCHMARK_ENDPOINT, 'benchmark'
+    vision, face = AzureVisionService(BENCHMARK_ENDPOINT, 'benchmark'), AzureFaceService()
+    for client in (vision.client, face.client):
+        client._client.config.pipeline._sender.driver.session = _canned_azure_session()
+    return vision, face
+
+
+def _rest_services():
+    """REST vision and face services whose HTTP calls are answered by _canned_azure_session()."""
+    from azure_rest import AzureVisionRestService, AzureFaceRestService
+    vision, face = AzureVisionRestService(BENCHMARK_ENDPOINT, 'benchmark'), AzureFaceRestService(BENCHMARK_ENDPOINT, 'benchmark')
+    vision.session = face.client = _canned_azure_session()
+    return vision, face
+
+
+@benchmark('azure.sdk_analyze_image')
+def bench_azure_sdk_analyze():
+    vision, _ = _sdk_services()
+    return lambda: vision.analyze_image(b'frame')
+
+
+@benchmark('azure.rest_analyze_image')
+def bench_azure_rest_analyze():
+    vision, _ = _rest_services()
+    return lambda: vision.analyze_image(b'frame')
+
+
+@benchmark('azure.sdk_read_text')
+def bench_azure_sdk_read():
+    vision, _ = _sdk_services()
+    return lambda: vision.read_text(b'frame')
+
+
+@benchmark('azure.rest_read_text')
+def bench_azure_rest_read():
+    vision, _ = _rest_services()
+    return lambda: vision.read_text(b'frame')
+
+
+@benchmark('azure.sdk_detect_faces')
+def bench_azure_sdk_faces():
+    _, face = _sdk_services()
+    return lambda: face.detect_faces(b'frame')
+
+
+@benchmark('azure.rest_detect_faces')
+def bench_azure_rest_faces():
+    _, face = _rest_services()
+    return lambda: face.detect_faces(b'frame')
+
+
+def _import_time(module: str):
+    """Time importing a module in a fresh interpreter (includes interpreter start-up)."""
+    command = [sys.executable, '-c', f"import {module}"]
+    if subprocess.run(command, capture_output=True).returncode != 0:
+        raise BenchmarkSkipped(f"{module} not importable")
+    return lambda: subprocess.run(command, capture_output=True, check=True)
+
+
+@benchmark('azure.sdk_import')
+def bench_azure_sdk_import():
+    return _import_time('azure_vision')
+
+
+@benchmark('azure.rest_import')
+def bench_azure_rest_import():
+    return _import_time('azure_rest')
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def git_commit() -> str:
+    """Get the current git commit (or 'unknown')."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def environment() -> Dict:
+    """Describe the machine and library versions."""
+    info = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__
+    }
+    try:
+        import cv2
+        info['opencv'] = cv2.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def compare(current: Dict, baseline_path: str, threshold: float):
+    """Print the change in median time against a baseline results file."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nComparison against {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    print(f"  {'benchmark':36} {'base us':>12} {'now us':>12} {'change':>9}")
+    regressions = 0
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base or 'median_us' not in base or 'median_us' not in result:
+            continue
+        change = (result['median_us'] - base['median_us']) / base['median_us'] * 100
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"  {name:36} {base['median_us']:12.2f} {result['median_us']:12.2f} {change:+8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the CPU hot paths")
+    parser.add_argument('--filter', help="Only run benchmarks whose name contains this string")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Seconds per timed round")
+    parser.add_argument('--rounds', type=int, default=7, help="Timed rounds per benchmark")
+    parser.add_argument('--output', help=f"Results file (default: {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument('--compare', help="Baseline results file to compare against")
+    parser.add_argument('--threshold', type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    results = {}
+    for name, setup in BENCHMARKS:
+        if args.filter and args.filter not in name:
+            continue
+        try:
+            # Silence the pipeline's print logging so terminal I/O is not timed
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                func = setup()
+                func()  # Fail fast before timing
+                results[name] = measure(func, args.min_time, args.rounds)
+            print(f"{name:36} {results[name]['median_us']:12.2f} us/op  ({results[name]['ops_per_sec']:.0f} ops/s)")
+        except BenchmarkSkipped as e:
+            results[name] = {'skipped': str(e)}
+            print(f"{name:36} skipped: {e}")
+
+    report = {'environment': environment(), 'results': results}
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        return 1 if compare(report, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,8 @@ from typing import Optional, Callable
 import threading
 import time
 import config
+import metrics
+from frame_quality import BestFrameSelector
 
 
 class CameraProcessor:
@@ -24,6 +26,10 @@ class CameraProcessor:
         self.current_frame = None
         self.frame_lock = threading.Lock()
         self.frame_count = 0
+        self.frame_stride = config.Config.FRAME_RATE
+        self.last_capture_ns = None
+        self.frame_selector = BestFrameSelector(self.frame_stride) if config.Config.QUALITY_GATE_ENABLED else None
+        self.last_frame_quality = None  # Quality of the frame passed to callbacks
         self.callbacks = []
     
     def start(self) -> bool:
@@ -60,18 +66,36 @@ class CameraProcessor:
     def _capture_loop(self):
         """Internal loop for capturing frames."""
         while self.is_running:
-            ret, frame = self.camera.read()
+            capture_started = time.time_ns()
+            with metrics.STAGE_LATENCY.time(stage='capture'):
+                ret, frame = self.camera.read()
+            # Read by callbacks (same thread) to trace the capture stage
+            self.last_capture_ns = (capture_started, time.time_ns())
             if ret:
                 with self.frame_lock:
                     self.current_frame = frame.copy()
                     self.frame_count += 1
                 
-                # Process frame if needed
-                if self.frame_count % config.Config.FRAME_RATE == 0:
+                # Process frame if needed: the best frame of each stride window, or every Nth frame
+                if self.frame_selector is not None:
+                    chosen = self.frame_selector.offer(frame)
+                    if chosen is not None:
+                        frame, self.last_frame_quality = chosen
+                        metrics.CHOSEN_FRAME_SHARPNESS.observe(self.last_frame_quality['sharpness'])
+                        self._notify_callbacks(frame)
+                elif self.frame_count % self.frame_stride == 0:
                     self._notify_callbacks(frame)
             
             time.sleep(0.033)  # ~30 FPS
     
+    def get_quality_stats(self) -> Optional[dict]:
+        """Get frame selection statistics (None if the quality gate is disabled)."""
+        return self.frame_selector.get_stats() if self.frame_selector is not None else None
+    
+    def get_transport_stats(self) -> dict:
+        """Get how frames reach the analysis code."""
+        return {'mode': 'thread', 'frames_captured': self.frame_count}
+    
     def get_frame(self) -> Optional[np.ndarray]:
         """Get current frame."""
         with self.frame_lock:
@@ -97,6 +121,17 @@ class CameraProcessor:
         _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
         return buffer.tobytes()
     
+    def set_frame_stride(self, stride: int):
+        """
+        Set how often frames are passed to callbacks.
+        
+        Args:
+            stride: Notify callbacks on every Nth captured frame
+        """
+        self.frame_stride = max(1, int(stride))
+        if self.frame_selector is not None:
+            self.frame_selector.set_window(self.frame_stride)
+    
     def add_callback(self, callback: Callable):
         """Add callback function to be called when new frame is available."""
         self.callbacks.append(callback)
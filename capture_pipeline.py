@@ -0,0 +1,368 @@
+"""Multi-process camera pipeline (CAMERA_MODE=process).
+
+In-process capture competes with Flask and the analysis code for the GIL.
+Here the camera runs in its own process, which reads frames, picks the best
+frame of each window (frame_quality) and copies it into a shared-memory
+FrameRing. Only small metadata (sequence number, capture time, quality)
+crosses the process boundary through a queue.
+
+With CAMERA_ANALYSIS_PROCESSES > 0, frames are also resized, JPEG-encoded
+and analysed in a pool of processes that read them from the ring by
+sequence number, so these CPU-bound stages scale across cores. The web
+process then handles only session state, publishing and audio.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+import cv2
+import config
+import metrics
+import tracing
+from camera_processor import CameraProcessor
+from shm_transport import FrameRing
+
+
+RingFrame = namedtuple('RingFrame', ['seq', 'captured_ns'])  # Passed to callbacks when frames are analysed in the pool
+
+START_TIMEOUT = 20.0  # Seconds to wait for the capture process to open the camera
+
+
+def _capture_main(camera_index, ring_name: str, frames, stride, stop_event):
+    """Capture process: read frames, pick the best of each window, write them to the ring."""
+    from frame_quality import BestFrameSelector
+    ring = FrameRing.attach(ring_name)
+    camera = cv2.VideoCapture(camera_index)
+    if not camera.isOpened():
+        frames.put({'error': f"Failed to open camera {camera_index}"})
+        ring.close()
+        return
+    camera.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    camera.set(cv2.CAP_PROP_FPS, 30)
+    frames.put({'started': True})
+
+    window = stride.value
+    selector = BestFrameSelector(window) if config.Config.QUALITY_GATE_ENABLED else None
+    max_width, max_height = config.Config.FRAME_RING_MAX_WIDTH, config.Config.FRAME_RING_MAX_HEIGHT
+    frame_count = 0
+    dropped = 0
+    try:
+        while not stop_event.is_set():
+            capture_started = time.time_ns()
+            ret, frame = camera.read()
+            capture_ended = time.time_ns()
+            if not ret:
+                time.sleep(0.033)
+                continue
+            frame_count += 1
+            if stride.value != window:
+                window = stride.value
+                if selector is not None:
+                    selector.set_window(window)
+
+            quality = None
+            if selector is not None:
+                chosen = selector.offer(frame)
+                if chosen is None:
+                    time.sleep(0.033)
+                    continue
+                frame, quality = chosen
+            elif frame_count % window != 0:
+                time.sleep(0.033)
+                continue
+
+            height, width = frame.shape[:2]
+            if width > max_width or height > max_height:
+                scale = min(max_width / width, max_height / height)
+                frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+            seq = ring.write(frame, capture_started)
+            message = {
+                'seq': seq,
+                'capture_ns': (capture_started, capture_ended),
+                'frame_count': frame_count,
+                'quality': quality,
+                'selector': selector.get_stats() if selector is not None else None,
+                'dropped': dropped
+            }
+            try:
+                frames.put_nowait(message)
+            except queue.Full:
+                dropped += 1  # The web process is behind; it will pick up newer frames
+            time.sleep(0.033)  # ~30 FPS
+    finally:
+        camera.release()
+        ring.close()
+
+
+# Analysis pool process state
+_ring = None
+_vision_service = None
+_face_service = None
+
+
+def _init_analysis_process(ring_name: str, analyze: bool):
+    """Attach an analysis pool process to the ring and build its services."""
+    global _ring, _vision_service, _face_service
+    _ring = FrameRing.attach(ring_name)
+    if analyze:
+        from analysis_pipeline import create_services
+        try:
+            _vision_service, _face_service = create_services()
+        except Exception as e:
+            print(f"[Analysis process] Vision service not available: {e}")
+
+
+def _process_ring_frame(seq: int, max_width: int, jpeg_quality: int, lane: Optional[str], want_faces: bool) -> Dict:
+    """
+    Encode (and analyse) one ring frame in an analysis pool process.
+
+    Returns:
+        Dictionary with 'frame_bytes', 'timings' [(stage, start_ns, end_ns,
+        error_code)] and, if lane is set, 'analysis' and 'complete'; or
+        'error' if the frame was overwritten before it could be read
+    """
+    from image_utils import encode_frame
+    timings = []
+    started = time.time_ns()
+    entry = _ring.read(seq)
+    if entry is None:
+        return {'error': 'Frame overwritten before analysis', 'error_code': 'FRAME_OVERWRITTEN'}
+    frame_bytes = encode_frame(entry[0], max_width, jpeg_quality)
+    timings.append(('encode', started, time.time_ns(), None))
+    result = {'frame_bytes': frame_bytes, 'timings': timings}
+    if lane is None:
+        return result
+    if _vision_service is None:
+        result.update(analysis={'error': 'Vision service not available', 'error_code': 'NO_SERVICE'}, complete=False)
+        return result
+
+    def call(name, func, *args):
+        call_started = time.time_ns()
+        value = func(*args)
+        error_code = value.get('error_code', 'UNKNOWN') if isinstance(value, dict) and 'error' in value else None
+        timings.append((name, call_started, time.time_ns(), error_code))
+        return value
+
+    from analysis_pipeline import analyze_lane
+    analysis, complete = analyze_lane(lane, _vision_service, _face_service, frame_bytes, want_faces, call)
+    result.update(analysis=analysis, complete=complete)
+    return result
+
+
+class SharedMemoryCameraProcessor(CameraProcessor):
+    """
+    CameraProcessor whose capture runs in a separate process.
+
+    Callbacks receive the chosen frames as arrays copied out of the ring or,
+    with analysis processes, as RingFrame references to pass to
+    process_ring_frame().
+    """
+
+    def __init__(self, camera_index=0, analysis_processes: int = None):
+        """
+        Initialize camera processor.
+
+        Args:
+            camera_index: Camera device index (or video file / stream URL)
+            analysis_processes: Size of the encode and analysis pool
+                (defaults to CAMERA_ANALYSIS_PROCESSES; 0 analyses in this process)
+        """
+        super().__init__(camera_index)
+        self.frame_selector = None  # Runs in the capture process
+        self.analysis_processes = (analysis_processes if analysis_processes is not None
+                                   else config.Config.CAMERA_ANALYSIS_PROCESSES)
+        self.context = multiprocessing.get_context('spawn')  # Never fork a threaded web process
+        self.ring = None
+        self.process = None
+        self.pool = None
+        self.dispatcher = None
+        self.quality_stats = None
+        self.frames_rejected = 0
+        self.frames_overwritten = 0
+        self.frames_dropped = 0
+
+    def start(self) -> bool:
+        """Start the capture process (and analysis pool)."""
+        try:
+            self.ring = FrameRing.create(
+                config.Config.FRAME_RING_SLOTS,
+                (config.Config.FRAME_RING_MAX_HEIGHT, config.Config.FRAME_RING_MAX_WIDTH, 3)
+            )
+            self.frames = self.context.Queue(maxsize=4)
+            self.stride = self.context.Value('i', self.frame_stride)
+            self.stop_event = self.context.Event()
+            self.process = self.context.Process(
+                target=_capture_main, name='camera-capture', daemon=True,
+                args=(self.camera_index, self.ring.name, self.frames, self.stride, self.stop_event)
+            )
+            self.process.start()
+
+            message = self.frames.get(timeout=START_TIMEOUT)
+            if 'error' in message:
+                print(f"Camera initialization error: {message['error']}")
+                self.stop()
+                return False
+
+            if self.analysis_processes > 0:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.analysis_processes, mp_context=self.context,
+                    initializer=_init_analysis_process,
+                    initargs=(self.ring.name, config.Config.ANALYSIS_MODE != 'queue')
+                )
+                # Frames are handed to callbacks concurrently, one thread per pool process
+                self.dispatcher = ThreadPoolExecutor(max_workers=self.analysis_processes, thread_name_prefix='ring-frame')
+                self.dispatch_slots = threading.Semaphore(self.analysis_processes)
+
+            self.is_running = True
+            self.receive_thread = threading.Thread(target=self._receive_loop, daemon=True)
+            self.receive_thread.start()
+            return True
+
+        except Exception as e:
+            print(f"Camera initialization error: {e}")
+            self.stop()
+            return False
+
+    def stop(self):
+        """Stop the capture process and analysis pool."""
+        self.is_running = False
+        if self.process is not None:
+            self.stop_event.set()
+            self.process.join(timeout=3.0)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        if self.dispatcher is not None:
+            self.dispatcher.shutdown(wait=False, cancel_futures=True)
+            self.dispatcher = None
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def _receive_loop(self):
+        """Take frame metadata from the capture process and notify callbacks."""
+        while self.is_running:
+            try:
+                message = self.frames.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self._record_capture(message)
+
+            ring = self.ring
+            if ring is None:
+                break
+            if self.dispatcher is not None:
+                if not self.dispatch_slots.acquire(blocking=False):
+                    metrics.FRAMES_DROPPED.inc(reason='pool_busy')  # A newer frame will follow
+                    continue
+                self.dispatcher.submit(self._dispatch, RingFrame(message['seq'], message['capture_ns'][0]))
+                continue
+            entry = ring.read(message['seq'])
+            if entry is None:
+                self.frames_overwritten += 1
+                metrics.FRAMES_DROPPED.inc(reason='overwritten')
+                continue
+            self._notify_callbacks(entry[0])
+
+    def _dispatch(self, frame: RingFrame):
+        try:
+            self._notify_callbacks(frame)
+        finally:
+            self.dispatch_slots.release()
+
+    def _record_capture(self, message: Dict):
+        """Update capture state and metrics from a capture process message."""
+        self.last_capture_ns = message['capture_ns']
+        self.frame_count = message['frame_count']
+        metrics.STAGE_LATENCY.observe((message['capture_ns'][1] - message['capture_ns'][0]) / 1e9, stage='capture')
+        if message['dropped'] > self.frames_dropped:
+            metrics.FRAMES_DROPPED.inc(message['dropped'] - self.frames_dropped, reason='ring_behind')
+            self.frames_dropped = message['dropped']
+        if message['quality'] is not None:
+            self.last_frame_quality = message['quality']
+            metrics.CHOSEN_FRAME_SHARPNESS.observe(message['quality']['sharpness'])
+        stats = message['selector']
+        if stats is not None:
+            if stats['frames_rejected'] > self.frames_rejected:
+                metrics.FRAMES_LOW_QUALITY.inc(stats['frames_rejected'] - self.frames_rejected, source='camera')
+                self.frames_rejected = stats['frames_rejected']
+            self.quality_stats = stats
+
+    def process_ring_frame(self, frame: RingFrame, max_width: int, jpeg_quality: int,
+                           lane: Optional[str], want_faces: bool) -> Tuple[Optional[bytes], Optional[Dict], bool]:
+        """
+        Encode and (optionally) analyse a ring frame in the analysis pool.
+
+        Args:
+            frame: Frame reference passed to a callback
+            max_width: Maximum width of the encoded frame
+            jpeg_quality: JPEG quality (0-100)
+            lane: Pipeline lane to run, or None to only encode
+            want_faces: Whether to run face detection
+
+        Returns:
+            (frame_bytes, analysis, complete) - frame_bytes is None if the
+            frame was overwritten; analysis is None if lane is None
+        """
+        pool = self.pool
+        if pool is None:
+            return None, None, False
+        try:
+            result = pool.submit(_process_ring_frame, frame.seq, max_width, jpeg_quality, lane, want_faces).result()
+        except Exception as e:
+            print(f"[Camera] Analysis process error: {e}")
+            return None, None, False
+        if 'error' in result:
+            self.frames_overwritten += 1
+            metrics.FRAMES_DROPPED.inc(reason='overwritten')
+            return None, None, False
+
+        # Replay the pool process's stage timings into this process's metrics and trace
+        for stage, start_ns, end_ns, error_code in result['timings']:
+            metrics.STAGE_LATENCY.observe((end_ns - start_ns) / 1e9, stage=stage)
+            tracing.record_span(stage, start_ns, end_ns, process='analysis')
+            if stage != 'encode':
+                metrics.VISION_CALLS.inc(call=stage)
+                if error_code:
+                    metrics.VISION_ERRORS.inc(call=stage, error_code=error_code)
+        return result['frame_bytes'], result.get('analysis'), result.get('complete', False)
+
+    def get_frame(self):
+        """Get the most recently captured frame."""
+        ring = self.ring
+        entry = ring.latest() if ring is not None else None
+        return entry[0] if entry is not None else None
+
+    def set_frame_stride(self, stride: int):
+        """Set how often frames are passed to callbacks (applied in the capture process)."""
+        self.frame_stride = max(1, int(stride))
+        if self.process is not None:
+            self.stride.value = self.frame_stride
+
+    def get_quality_stats(self) -> Optional[dict]:
+        """Get frame selection statistics from the capture process."""
+        return self.quality_stats
+
+    def get_transport_stats(self) -> Dict:
+        """Get ring transport statistics."""
+        return {
+            'mode': 'process',
+            'ring_slots': self.ring.slots if self.ring is not None else 0,
+            'analysis_processes': self.analysis_processes,
+            'frames_captured': self.frame_count,
+            'frames_overwritten': self.frames_overwritten,
+            'frames_dropped': self.frames_dropped
+        }
+
+    def is_available(self) -> bool:
+        """Check if the capture process is running."""
+        return self.is_running and self.process is not None and self.process.is_alive()
@@ -19,6 +19,15 @@ class Config:
         'https://your-resource-name.cognitiveservices.azure.com/'
     )
     AZURE_COMPUTER_VISION_KEY = os.getenv('AZURE_COMPUTER_VISION_KEY', '')
+    # Second region, used as a hedging backend (VISION_HEDGE_BACKENDS=azure_secondary)
+    AZURE_COMPUTER_VISION_SECONDARY_ENDPOINT = os.getenv('AZURE_COMPUTER_VISION_SECONDARY_ENDPOINT', '')
+    AZURE_COMPUTER_VISION_SECONDARY_KEY = os.getenv('AZURE_COMPUTER_VISION_SECONDARY_KEY', '')
+    AZURE_CLIENT = os.getenv('AZURE_CLIENT', 'sdk')  # v3.2 and Face calls through the 'sdk' or plain 'rest' (azure_rest.py)
+    # Objects, caption, tags and OCR in one Image Analysis 4.0 call (azure_rest.AzureUnifiedVisionService)
+    AZURE_UNIFIED_ANALYSIS = os.getenv('AZURE_UNIFIED_ANALYSIS', 'false')  # 'true', 'auto' (use it if a startup probe call succeeds) or 'false'
+    AZURE_IMAGE_ANALYSIS_API_VERSION = os.getenv('AZURE_IMAGE_ANALYSIS_API_VERSION', '2023-10-01')
+    AZURE_HTTP_POOL_SIZE = int(os.getenv('AZURE_HTTP_POOL_SIZE', 16))  # Kept-alive connections per endpoint for REST calls
+    AZURE_HTTP_TIMEOUT = float(os.getenv('AZURE_HTTP_TIMEOUT', 10))  # Seconds per REST call
     
     # Azure Face API (optional)
     AZURE_FACE_ENDPOINT = os.getenv(
@@ -30,10 +39,103 @@ class Config:
     # Application settings
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     PORT = int(os.getenv('PORT', 5000))
+    SERVICE_WARM_UP = os.getenv('SERVICE_WARM_UP', 'background')  # 'background', 'eager' or 'lazy' service loading
+    
+    # Production server settings (gunicorn.conf.py)
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', os.cpu_count() or 1))  # Worker processes
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 8))  # Request threads per worker
     
     # Processing settings
     FRAME_RATE = 2  # Process every Nth frame to reduce processing load
     OBSTACLE_DETECTION_THRESHOLD = 0.7  # Confidence threshold for obstacle detection
     MIN_OBJECT_SIZE = 50  # Minimum object size in pixels to report
-
-
+    FACE_DETECTION_INTERVAL = int(os.getenv('FACE_DETECTION_INTERVAL', 10))  # Detect faces every Nth analysed frame per session
+    FACE_PREDETECT_ENABLED = os.getenv('FACE_PREDETECT_ENABLED', 'True').lower() == 'true'  # Find faces locally; call the Face API only for new ones
+    FACE_PREDETECT_MODEL = os.getenv('FACE_PREDETECT_MODEL', '')  # YuNet ONNX model; the Haar cascade is used if unset
+    FACE_TRACK_MAX_AGE = float(os.getenv('FACE_TRACK_MAX_AGE', 10))  # Seconds unseen before a face counts as new again
+    FACE_REFRESH_INTERVAL = float(os.getenv('FACE_REFRESH_INTERVAL', 60))  # Seconds before a tracked face is sent again
+    
+    # Frame quality gate: skip blurred or badly exposed frames before analysis
+    QUALITY_GATE_ENABLED = os.getenv('QUALITY_GATE_ENABLED', 'True').lower() == 'true'
+    QUALITY_MIN_SHARPNESS = float(os.getenv('QUALITY_MIN_SHARPNESS', 50))  # Laplacian variance at 320 px width
+    QUALITY_MAX_CLIPPED = float(os.getenv('QUALITY_MAX_CLIPPED', 0.35))  # Max share of crushed or blown-out pixels
+    QUALITY_MAX_SKIPPED_WINDOWS = int(os.getenv('QUALITY_MAX_SKIPPED_WINDOWS', 3))  # Analyse the best frame anyway after this many rejections
+    
+    # OCR gate: run OCR only on frames with text, sending just the text regions
+    OCR_GATE_ENABLED = os.getenv('OCR_GATE_ENABLED', 'True').lower() == 'true'
+    OCR_CROP_MAX_AREA = float(os.getenv('OCR_CROP_MAX_AREA', 0.4))  # Send the whole frame if text regions cover more of it
+    OCR_GATE_MAX_REGIONS = int(os.getenv('OCR_GATE_MAX_REGIONS', 4000))  # Send the whole frame if MSER finds more candidates (noise, texture)
+    DECODE_MIN_SIZE = int(os.getenv('DECODE_MIN_SIZE', 1080))  # Large uploads are decoded at 1/2, 1/4 or 1/8 scale down to this shorter side (0: full size)
+    
+    # Camera process mode: capture (and optionally encoding and analysis) in separate processes
+    CAMERA_MODE = os.getenv('CAMERA_MODE', 'thread')  # 'thread' (in the web process) or 'process'
+    CAMERA_ANALYSIS_PROCESSES = int(os.getenv('CAMERA_ANALYSIS_PROCESSES', 0))  # Processes that encode and analyse camera frames (0: the web process)
+    FRAME_RING_SLOTS = int(os.getenv('FRAME_RING_SLOTS', 8))  # Shared-memory frame slots
+    FRAME_RING_MAX_WIDTH = int(os.getenv('FRAME_RING_MAX_WIDTH', 1280))  # Larger frames are downscaled to fit a slot
+    FRAME_RING_MAX_HEIGHT = int(os.getenv('FRAME_RING_MAX_HEIGHT', 720))
+    
+    # Session settings
+    SESSION_IDLE_TIMEOUT = float(os.getenv('SESSION_IDLE_TIMEOUT', 300))  # Seconds before an idle session is evicted
+    MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', 1000))  # Sessions kept in memory
+    SESSION_ANALYSES_PER_MINUTE = float(os.getenv('SESSION_ANALYSES_PER_MINUTE', 120))  # Per-session analysis budget
+    ANNOUNCEMENT_REPEAT_INTERVAL = float(os.getenv('ANNOUNCEMENT_REPEAT_INTERVAL', 5))  # Seconds before repeating the same announcement
+    
+    # Pipeline lanes: a fast obstacle lane per frame and a slower enrichment lane
+    PIPELINE_LANES = os.getenv('PIPELINE_LANES', 'split')  # 'split' or 'combined' (one pass per frame)
+    FAST_LANE_DEADLINE_MS = float(os.getenv('FAST_LANE_DEADLINE_MS', 1000))  # Obstacle warning latency objective
+    SLOW_LANE_INTERVAL_MS = float(os.getenv('SLOW_LANE_INTERVAL_MS', 3000))  # Minimum time between enrichments per session
+    SLOW_LANE_WORKERS = int(os.getenv('SLOW_LANE_WORKERS', 4))  # Enrichment threads per process
+    
+    # Hedged requests: fire the same call at a second backend when the first is slow
+    VISION_HEDGE_BACKENDS = os.getenv('VISION_HEDGE_BACKENDS', '')  # Comma-separated, e.g. 'detectron2' or 'azure_secondary'; empty disables
+    HEDGE_QUANTILE = float(os.getenv('HEDGE_QUANTILE', 0.95))  # Hedge once a call is slower than this latency quantile
+    HEDGE_DELAY_MS = float(os.getenv('HEDGE_DELAY_MS', 800))  # Hedge delay until enough latency samples exist
+    HEDGE_MIN_DELAY_MS = float(os.getenv('HEDGE_MIN_DELAY_MS', 50))
+    HEDGE_MAX_DELAY_MS = float(os.getenv('HEDGE_MAX_DELAY_MS', 3000))
+    HEDGE_MAX_RATIO = float(os.getenv('HEDGE_MAX_RATIO', 0.2))  # Share of calls that may be hedged for slowness
+    
+    # Server-Sent Events settings
+    SSE_HEARTBEAT_INTERVAL = float(os.getenv('SSE_HEARTBEAT_INTERVAL', 15))  # Seconds between keep-alive comments
+    SSE_MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', 500))  # Concurrent streams per session
+    # Open streams per worker process; each holds a request thread, so keep this below WEB_THREADS
+    SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', max(1, WEB_THREADS // 2)))
+    
+    # Analysis responses (serialization.py)
+    RESPONSE_PROFILE = os.getenv('RESPONSE_PROFILE', 'full')  # Default 'profile': 'minimal', 'ui' or 'full'
+    
+    # Admission control / load shedding
+    ANALYSIS_MAX_IN_FLIGHT = int(os.getenv('ANALYSIS_MAX_IN_FLIGHT', 8))  # Concurrent analyses per process
+    ANALYSIS_LATENCY_BUDGET_MS = float(os.getenv('ANALYSIS_LATENCY_BUDGET_MS', 2500))  # Target service time per analysis
+    FRAME_MAX_AGE_MS = float(os.getenv('FRAME_MAX_AGE_MS', 1500))  # Drop uploaded frames older than this
+    
+    # Batch uploads (/api/process/batch)
+    BATCH_MAX_IMAGES = int(os.getenv('BATCH_MAX_IMAGES', 64))  # Images per batch request
+    BATCH_MAX_MB = float(os.getenv('BATCH_MAX_MB', 64))  # Total image bytes per batch (after unzipping)
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 4))  # Batch images analysed at once, shared by all batch requests
+    
+    # Adaptive capture control
+    TARGET_LATENCY_MS = float(os.getenv('TARGET_LATENCY_MS', 1500))  # Target round trip per analysed frame
+    CAPTURE_INTERVAL_MS = float(os.getenv('CAPTURE_INTERVAL_MS', 400))  # Initial interval between uploaded frames
+    CAPTURE_INTERVAL_MIN_MS = float(os.getenv('CAPTURE_INTERVAL_MIN_MS', 200))
+    CAPTURE_INTERVAL_MAX_MS = float(os.getenv('CAPTURE_INTERVAL_MAX_MS', 3000))
+    
+    # Tracing
+    TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.05))  # Fraction of frames traced (0 disables)
+    TRACE_FILE = os.getenv('TRACE_FILE', 'traces/spans.jsonl')
+    TRACE_MAX_BYTES = int(os.getenv('TRACE_MAX_BYTES', 10 * 1024 * 1024))  # Rotate trace file at this size
+    TRACE_BACKUP_COUNT = int(os.getenv('TRACE_BACKUP_COUNT', 5))  # Rotated trace files to keep
+    
+    # Persistent analysis result store
+    RESULT_STORE_ENABLED = os.getenv('RESULT_STORE_ENABLED', 'True').lower() == 'true'
+    RESULT_STORE_PATH = os.getenv('RESULT_STORE_PATH', 'cache/results.sqlite3')
+    RESULT_STORE_MAX_MB = float(os.getenv('RESULT_STORE_MAX_MB', 256))  # Evict least recently used results beyond this
+    RESULT_STORE_MEMORY_ENTRIES = int(os.getenv('RESULT_STORE_MEMORY_ENTRIES', 1000))  # In-process cache in front of SQLite
+    RESULT_STORE_WARM_ENTRIES = int(os.getenv('RESULT_STORE_WARM_ENTRIES', 1000))  # Recent results loaded at startup
+    
+    # Analysis job queue (ANALYSIS_MODE=queue runs the vision backend in analysis_worker.py processes)
+    ANALYSIS_MODE = os.getenv('ANALYSIS_MODE', 'local')  # 'local' (in the web process) or 'queue'
+    VISION_BACKEND = os.getenv('VISION_BACKEND', 'azure')  # Backend run by analysis workers: 'azure' or 'detectron2'
+    JOB_QUEUE_ADDRESS = os.getenv('JOB_QUEUE_ADDRESS', '127.0.0.1:5600')  # Broker host:port
+    JOB_QUEUE_AUTHKEY = os.getenv('JOB_QUEUE_AUTHKEY', 'navassist')  # Shared secret for broker connections
+    JOB_DEADLINE_MS = float(os.getenv('JOB_DEADLINE_MS', 5000))  # Workers skip jobs older than this
+    WORKER_THREADS = int(os.getenv('WORKER_THREADS', 4))  # Concurrent jobs per worker process
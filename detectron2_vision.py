@@ -1,11 +1,9 @@
 """Detectron2 integration for object detection, instance segmentation, and scene analysis."""
-import io
-import cv2
 import numpy as np
-from typing import List, Dict, Optional
-from PIL import Image
+from typing import Collection, List, Dict, Optional
 import torch
 import config
+from image_utils import decode_image
 
 # Try to import Detectron2
 try:
@@ -74,20 +72,21 @@ class Detectron2VisionService:
         
         print(f"Detectron2 Vision Service initialized (device: {self.cfg.MODEL.DEVICE})")
     
-    def analyze_image(self, image_bytes: bytes) -> Dict:
+    def analyze_image(self, image_bytes: bytes, features: Optional[Collection[str]] = None) -> Dict:
         """
         Analyze image for objects, scene description, and tags.
         
         Args:
             image_bytes: Image data as bytes
+            features: Result fields wanted ('objects', 'obstacles',
+                'description', 'tags', 'categories'); None for all. Inference
+                always runs, but unrequested post-processing is skipped.
             
         Returns:
             Dictionary containing analysis results
         """
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            image, scale = self._decode(image_bytes)
             
             if image is None:
                 return {'error': 'Failed to decode image', 'error_code': 'INVALID_IMAGE'}
@@ -96,27 +95,17 @@ class Detectron2VisionService:
             outputs = self.predictor(image)
             
             # Extract detected objects
-            objects = self._extract_objects(outputs, image.shape)
+            objects = self._extract_objects(outputs, image.shape, scale)
             
-            # Generate scene description from detected objects
-            description = self._generate_description(objects)
+            # Scene description, tags, categories and obstacles are all derived from the objects
+            result = self.describe_scene(image_bytes, objects, features)
+            if features is None or 'objects' in features:
+                result['objects'] = objects
+            if features is None or 'obstacles' in features:
+                result['obstacles'] = self._identify_obstacles(objects)
             
-            # Extract tags/categories from detected objects
-            tags = self._extract_tags(objects)
-            categories = self._extract_categories(objects)
-            
-            # Identify obstacles
-            obstacles = self._identify_obstacles(objects)
-            
-            result = {
-                'description': description,
-                'objects': objects,
-                'tags': tags,
-                'categories': categories,
-                'obstacles': obstacles
-            }
-            
-            print(f"[Detectron2] Analysis complete - Description: {description[:50]}..., Objects: {len(objects)}, Tags: {len(tags)}")
+            print(f"[Detectron2] Analysis complete - Description: {result.get('description', '')[:50]}..., "
+                  f"Objects: {len(objects)}, Tags: {len(result.get('tags', []))}")
             
             return result
             
@@ -127,6 +116,75 @@ class Detectron2VisionService:
             traceback.print_exc()
             return {'error': error_msg, 'error_code': 'UNKNOWN'}
     
+    def detect_obstacles(self, image_bytes: bytes) -> Dict:
+        """
+        Detect objects and obstacles only (the fast lane of the pipeline).
+        
+        Args:
+            image_bytes: Image data as bytes
+            
+        Returns:
+            Dictionary with 'objects' and 'obstacles'
+        """
+        try:
+            image, scale = self._decode(image_bytes)
+            if image is None:
+                return {'error': 'Failed to decode image', 'error_code': 'INVALID_IMAGE'}
+            
+            objects = self._extract_objects(self.predictor(image), image.shape, scale)
+            return {'objects': objects, 'obstacles': self._identify_obstacles(objects)}
+            
+        except Exception as e:
+            print(f"[Detectron2] Detection error: {e}")
+            return {'error': str(e), 'error_code': 'UNKNOWN'}
+    
+    def describe_scene(self, image_bytes: bytes, objects: Optional[List[Dict]] = None,
+                       features: Optional[Collection[str]] = None) -> Dict:
+        """
+        Describe the scene (the slow lane of the pipeline).
+        
+        The description is generated from detected objects, so objects
+        already found by the fast lane are reused instead of running
+        inference again.
+        
+        Args:
+            image_bytes: Image data as bytes
+            objects: Objects already detected in the frame, if known
+            features: Fields wanted ('description', 'tags', 'categories'); None for all
+            
+        Returns:
+            Dictionary with 'description', 'tags' and 'categories' (those requested)
+        """
+        if objects is None:
+            detected = self.detect_obstacles(image_bytes)
+            if 'error' in detected:
+                return detected
+            objects = detected['objects']
+        
+        scene = {}
+        if features is None or 'description' in features:
+            scene['description'] = self._generate_description(objects)
+        if features is None or 'tags' in features:
+            scene['tags'] = self._extract_tags(objects)
+        if features is None or 'categories' in features:
+            scene['categories'] = self._extract_categories(objects)
+        return scene
+    
+    def _decode(self, image_bytes: bytes, min_size: Optional[int] = None):
+        """
+        Decode image bytes to a BGR array, at reduced size if the image is large.
+        
+        The predictor resizes its input to INPUT.MIN_SIZE_TEST anyway, so
+        detection decodes no larger than that; OCR asks for DECODE_MIN_SIZE.
+        Both reuse one decode of the same bytes where it is large enough.
+        
+        Returns:
+            (image, scale) - image is None if invalid; scale is decoded / original size
+        """
+        if not config.Config.DECODE_MIN_SIZE:
+            return decode_image(image_bytes)
+        return decode_image(image_bytes, min_size or self.cfg.INPUT.MIN_SIZE_TEST)
+    
     def read_text(self, image_bytes: bytes) -> Dict:
         """
         Extract text from image using OCR.
@@ -141,9 +199,7 @@ class Detectron2VisionService:
             return {'error': 'OCR not available. Install pytesseract or easyocr.', 'text': ''}
         
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            image, scale = self._decode(image_bytes, config.Config.DECODE_MIN_SIZE)
             
             if image is None:
                 return {'error': 'Failed to decode image', 'text': ''}
@@ -156,7 +212,7 @@ class Detectron2VisionService:
                 for (bbox, text, confidence) in results:
                     if confidence > 0.5:  # Filter low confidence detections
                         # Convert bbox to format similar to Azure
-                        bbox_array = np.array(bbox)
+                        bbox_array = np.array(bbox) / scale
                         x_coords = bbox_array[:, 0]
                         y_coords = bbox_array[:, 1]
                         bounding_box = [
@@ -181,18 +237,11 @@ class Detectron2VisionService:
                 n_boxes = len(data['text'])
                 for i in range(n_boxes):
                     if int(data['conf'][i]) > 0 and data['text'][i].strip():
+                        left, top = data['left'][i] / scale, data['top'][i] / scale
+                        right, bottom = left + data['width'][i] / scale, top + data['height'][i] / scale
                         text_lines.append({
                             'text': data['text'][i],
-                            'bounding_box': [
-                                data['left'][i],
-                                data['top'][i],
-                                data['left'][i] + data['width'][i],
-                                data['top'][i],
-                                data['left'][i] + data['width'][i],
-                                data['top'][i] + data['height'][i],
-                                data['left'][i],
-                                data['top'][i] + data['height'][i]
-                            ],
+                            'bounding_box': [left, top, right, top, right, bottom, left, bottom],
                             'confidence': float(data['conf'][i]) / 100.0
                         })
             else:
@@ -213,8 +262,8 @@ class Detectron2VisionService:
         except Exception as e:
             return {'error': str(e), 'text': ''}
     
-    def _extract_objects(self, outputs, image_shape: tuple) -> List[Dict]:
-        """Extract detected objects with positions."""
+    def _extract_objects(self, outputs, image_shape: tuple, scale: float = 1.0) -> List[Dict]:
+        """Extract detected objects with positions (in original image coordinates, see _decode)."""
         objects = []
         
         instances = outputs["instances"]
@@ -231,7 +280,7 @@ class Detectron2VisionService:
             class_name = self.metadata.thing_classes[class_id] if class_id < len(self.metadata.thing_classes) else f"class_{class_id}"
             
             # Convert box coordinates (x1, y1, x2, y2) to (x, y, width, height)
-            x1, y1, x2, y2 = box
+            x1, y1, x2, y2 = box / scale
             x = float(x1)
             y = float(y1)
             w = float(x2 - x1)
@@ -0,0 +1,125 @@
+"""Server-Sent Events broadcaster for pushing analysis results to clients."""
+import threading
+import time
+from typing import Dict, Iterator, Optional
+import config
+from serialization import encode_analysis
+
+
+class AnalysisBroadcaster:
+    """
+    Fan-out of analysis results to any number of SSE subscribers.
+
+    Each published result is stored as the latest event and serialised into
+    an SSE frame at most once per response profile, by the first subscriber
+    asking for that profile. Subscribers wait on a shared condition and
+    always pick up the newest frame, so a slow client skips intermediate
+    results instead of building up a backlog (latest-value backpressure).
+    """
+
+    def __init__(self, heartbeat_interval: Optional[float] = None, max_subscribers: Optional[int] = None):
+        """
+        Initialize broadcaster.
+
+        Args:
+            heartbeat_interval: Seconds between keep-alive comments on idle streams
+            max_subscribers: Maximum number of concurrent subscribers
+        """
+        self.heartbeat_interval = heartbeat_interval or config.Config.SSE_HEARTBEAT_INTERVAL
+        self.max_subscribers = max_subscribers or config.Config.SSE_MAX_SUBSCRIBERS
+        self.condition = threading.Condition()
+        self.version = 0
+        self.latest_analysis = None
+        self.latest_events: Dict[str, bytes] = {}  # Profile -> SSE frame of latest_analysis
+        self.latest_encodings: Optional[Dict[str, bytes]] = None  # Profile -> JSON of latest_analysis, shared with polling
+        self.subscriber_count = 0
+        self.skipped_events = 0
+        self.closed = False
+
+    def publish(self, analysis: Dict, encodings: Optional[Dict[str, bytes]] = None):
+        """
+        Publish a new analysis result to all subscribers.
+
+        Args:
+            analysis: Analysis dictionary to broadcast
+            encodings: Cache of the result's encodings (see serialization.encode_analysis)
+        """
+        with self.condition:
+            self.version += 1
+            self.latest_analysis = analysis
+            self.latest_events = {}
+            self.latest_encodings = encodings
+            self.condition.notify_all()
+
+    def close(self):
+        """Wake up and terminate all subscriber streams."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def try_subscribe(self) -> bool:
+        """Reserve a subscriber slot. Returns False if the broadcaster is full."""
+        with self.condition:
+            if self.subscriber_count >= self.max_subscribers:
+                return False
+            self.subscriber_count += 1
+            return True
+
+    def unsubscribe(self):
+        """Release a subscriber slot reserved with try_subscribe()."""
+        with self.condition:
+            self.subscriber_count = max(0, self.subscriber_count - 1)
+
+    def _event(self, version: int, analysis: Dict, events: Dict[str, bytes], profile: str,
+               encodings: Optional[Dict[str, bytes]] = None) -> bytes:
+        """Get the SSE frame of a published result for a profile, encoding it on first use."""
+        event = events.get(profile)
+        if event is None:
+            payload = encode_analysis(analysis, profile, encodings)
+            event = b"id: %d\nevent: analysis\ndata: %s\n\n" % (version, payload)
+            events[profile] = event
+        return event
+
+    def stream(self, last_event_id: int = 0, profile: str = 'full') -> Iterator[bytes]:
+        """
+        Generate SSE frames for one subscriber.
+
+        The caller must have reserved a slot with try_subscribe() and release
+        it with unsubscribe() once the response is closed.
+
+        Args:
+            last_event_id: Last event id the client has already seen
+            profile: Response profile of the events (see serialization.PROFILES)
+
+        Yields:
+            Encoded SSE frames (events and heartbeat comments)
+        """
+        seen = last_event_id
+        
+        # Tell the browser how long to wait before reconnecting
+        yield b"retry: 3000\n\n"
+        
+        while True:
+            with self.condition:
+                if self.version == seen and not self.closed:
+                    self.condition.wait(timeout=self.heartbeat_interval)
+                if self.closed:
+                    return
+                version = self.version
+                analysis, events, encodings = self.latest_analysis, self.latest_events, self.latest_encodings
+                if version != seen and analysis is not None and 0 < seen < version - 1:
+                    self.skipped_events += version - seen - 1
+            
+            if version != seen and analysis is not None:
+                seen = version
+                yield self._event(version, analysis, events, profile, encodings)
+            else:
+                yield f": keepalive {int(time.time())}\n\n".encode('utf-8')
+
+    def get_stats(self) -> Dict:
+        """Get broadcaster statistics."""
+        return {
+            'subscribers': self.subscriber_count,
+            'events_published': self.version,
+            'events_skipped': self.skipped_events
+        }
@@ -0,0 +1,176 @@
+"""Local face pre-detection used to gate Face API calls.
+
+A CPU face detector runs on each analysed frame: YuNet (cv2.FaceDetectorYN)
+if FACE_PREDETECT_MODEL points at its ONNX model, otherwise OpenCV's
+frontal-face Haar cascade. The Face API is only called for faces that were
+not seen in the session's recent frames, and only with crops of those
+faces; faces already identified are reported from the tracker at their
+current position.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import cv2
+import config
+from image_utils import Box
+
+
+DETECT_WIDTH = 640  # Frames are searched for faces at this width
+MIN_FACE_SIZE = 24  # Pixels, at DETECT_WIDTH
+CROP_PADDING = 0.5  # Context kept around a face crop, as a fraction of the face size
+
+
+class FacePreDetector:
+    """Finds face boxes on the CPU."""
+
+    def __init__(self, model_path: Optional[str] = None):
+        """
+        Initialize detector.
+
+        Args:
+            model_path: YuNet ONNX model (defaults to FACE_PREDETECT_MODEL);
+                the Haar cascade is used if it is not set or not found
+
+        Raises:
+            RuntimeError: If no detector is available in this OpenCV build
+        """
+        model_path = model_path if model_path is not None else config.Config.FACE_PREDETECT_MODEL
+        cascade_path = os.path.join(getattr(getattr(cv2, 'data', None), 'haarcascades', ''),
+                                    'haarcascade_frontalface_default.xml')
+        if model_path and os.path.exists(model_path) and hasattr(cv2, 'FaceDetectorYN'):
+            self.kind = 'yunet'
+            self.detector = cv2.FaceDetectorYN.create(model_path, '', (DETECT_WIDTH, DETECT_WIDTH), 0.7)
+        elif hasattr(cv2, 'CascadeClassifier') and os.path.exists(cascade_path):
+            self.kind = 'haar'
+            self.detector = cv2.CascadeClassifier(cascade_path)
+        else:
+            raise RuntimeError("No face detector available (set FACE_PREDETECT_MODEL to a YuNet model, "
+                               "or use an OpenCV build with Haar cascades)")
+        self.lock = threading.Lock()  # YuNet keeps per-call input size state
+
+    def detect(self, frame) -> List[Box]:
+        """
+        Find faces in a frame.
+
+        Args:
+            frame: BGR frame
+
+        Returns:
+            (x, y, width, height) face boxes in frame coordinates
+        """
+        height, width = frame.shape[:2]
+        scale = 1.0
+        if width > DETECT_WIDTH:
+            scale = DETECT_WIDTH / width
+            frame = cv2.resize(frame, (DETECT_WIDTH, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+        with self.lock:
+            if self.kind == 'yunet':
+                self.detector.setInputSize((frame.shape[1], frame.shape[0]))
+                _, faces = self.detector.detect(frame)
+                boxes = [tuple(face[:4]) for face in faces] if faces is not None else []
+            else:
+                gray = cv2.equalizeHist(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+                boxes = self.detector.detectMultiScale(gray, 1.15, 5, minSize=(MIN_FACE_SIZE, MIN_FACE_SIZE))
+
+        return [
+            (int(x / scale), int(y / scale), int(w / scale), int(h / scale))
+            for x, y, w, h in boxes
+            if min(w, h) >= MIN_FACE_SIZE
+        ]
+
+
+_predetector = None
+_predetector_lock = threading.Lock()
+_predetector_failed = False
+
+
+def get_face_predetector() -> Optional[FacePreDetector]:
+    """Get the shared pre-detector, or None if disabled or unavailable."""
+    global _predetector, _predetector_failed
+    if not config.Config.FACE_PREDETECT_ENABLED or _predetector_failed:
+        return None
+    if _predetector is None:
+        with _predetector_lock:
+            if _predetector is None and not _predetector_failed:
+                try:
+                    _predetector = FacePreDetector()
+                    print(f"Face pre-detector initialized ({_predetector.kind})")
+                except Exception as e:
+                    print(f"Face pre-detector not available, detecting faces every Nth frame instead: {e}")
+                    _predetector_failed = True
+    return _predetector
+
+
+class FaceTracker:
+    """
+    Faces seen in one session's recent frames, with their Face API results.
+
+    A face counts as the same face as a track if its centre is within about
+    a face width of the track's last position and its size is similar.
+    Frames reach the slow lane seconds apart, so this is deliberately looser
+    than an overlap test.
+    """
+
+    def __init__(self, max_age: Optional[float] = None, refresh_interval: Optional[float] = None):
+        """
+        Initialize tracker.
+
+        Args:
+            max_age: Seconds a face may go unseen before it counts as new
+                again (defaults to FACE_TRACK_MAX_AGE)
+            refresh_interval: Seconds before a tracked face is sent to the
+                Face API again (defaults to FACE_REFRESH_INTERVAL)
+        """
+        self.max_age = max_age if max_age is not None else config.Config.FACE_TRACK_MAX_AGE
+        self.refresh_interval = refresh_interval if refresh_interval is not None else config.Config.FACE_REFRESH_INTERVAL
+        self.tracks: List[Dict] = []
+        self.lock = threading.Lock()
+
+    def update(self, boxes: List[Box], now: Optional[float] = None) -> List[Dict]:
+        """
+        Match a frame's face boxes to tracks.
+
+        Args:
+            boxes: Face boxes found in the frame
+            now: Time of the frame (defaults to now)
+
+        Returns:
+            One track per box (new tracks for new faces); a track has 'box',
+            'face' (last Face API result, or None) and 'checked_at'
+        """
+        now = now or time.time()
+        with self.lock:
+            self.tracks = [t for t in self.tracks if now - t['last_seen'] <= self.max_age]
+            unmatched = list(self.tracks)
+            matched = []
+            for box in boxes:
+                track = min(unmatched, key=lambda t: _distance(t['box'], box), default=None)
+                if track is not None and _same_face(track['box'], box):
+                    unmatched.remove(track)
+                else:
+                    track = {'face': None, 'checked_at': 0.0}
+                    self.tracks.append(track)
+                track['box'] = box
+                track['last_seen'] = now
+                matched.append(track)
+            return matched
+
+    def needs_check(self, track: Dict, now: Optional[float] = None) -> bool:
+        """Check whether a track should be sent to the Face API."""
+        return (now or time.time()) - track['checked_at'] >= self.refresh_interval
+
+    def record(self, track: Dict, face: Optional[Dict], now: Optional[float] = None):
+        """Record the Face API result for a track (None if no face was confirmed)."""
+        with self.lock:
+            track['face'] = face
+            track['checked_at'] = now or time.time()
+
+
+def _distance(a: Box, b: Box) -> float:
+    return ((a[0] + a[2] / 2 - b[0] - b[2] / 2) ** 2 + (a[1] + a[3] / 2 - b[1] - b[3] / 2) ** 2) ** 0.5
+
+
+def _same_face(a: Box, b: Box) -> bool:
+    return _distance(a, b) <= max(a[2], b[2]) and 0.5 <= b[2] / max(1, a[2]) <= 2.0
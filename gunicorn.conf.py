@@ -0,0 +1,37 @@
+"""Gunicorn configuration for the AI Navigation Assistant production mode."""
+import gc
+import os
+from config import Config
+
+bind = f"0.0.0.0:{Config.PORT}"
+
+# Pre-fork workers with a thread pool each. Threads keep long-lived
+# /api/analysis/stream connections from pinning a whole worker; each stream
+# still holds one thread, so SSE_MAX_STREAMS stays below WEB_THREADS.
+workers = Config.WEB_WORKERS
+worker_class = 'gthread'
+threads = Config.WEB_THREADS
+
+# Import app (and load the vision backend) in the master so every worker
+# shares the loaded models copy-on-write instead of loading its own copy.
+preload_app = True
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Serve HTTPS directly if certificates are present (mobile camera needs HTTPS)
+if os.path.exists('cert.pem') and os.path.exists('key.pem'):
+    certfile = 'cert.pem'
+    keyfile = 'key.pem'
+
+
+def when_ready(server):
+    """Freeze preloaded objects before forking so GC does not dirty shared pages."""
+    gc.freeze()
+    server.log.info(f"Services preloaded, forking {workers} worker(s) x {threads} thread(s)")
+
+
+def post_fork(server, worker):
+    """Log worker start."""
+    server.log.info(f"Worker {worker.pid} ready")
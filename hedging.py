@@ -0,0 +1,279 @@
+"""Hedged requests across vision backends.
+
+The router sends each call to the backend expected to answer fastest. If no
+answer arrives within that backend's recent latency quantile (p95 by
+default), the same call is sent to the next backend and whichever returns a
+valid result first wins; the loser is cancelled if it has not started, and
+otherwise ignored. A backend that returns an error is failed over to
+immediately.
+
+Hedging for slowness is limited to HEDGE_MAX_RATIO of calls, so a slow
+primary does not double the load on the secondary.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, Tuple
+import config
+import metrics
+import tracing
+from analysis_pipeline import create_vision_service
+
+
+class LatencyWindow:
+    """Latencies and outcomes of the most recent calls to one backend."""
+
+    def __init__(self, size: int = 200):
+        """
+        Initialize latency window.
+
+        Args:
+            size: Number of recent calls kept
+        """
+        self.latencies = deque(maxlen=size)  # Successful calls only
+        self.outcomes = deque(maxlen=size)  # True for success
+        self.last_failure_at = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool):
+        """Record one completed call."""
+        with self.lock:
+            if ok:
+                self.latencies.append(seconds)
+            else:
+                self.last_failure_at = time.time()
+            self.outcomes.append(ok)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Get a latency quantile in seconds (None with fewer than min_samples)."""
+        with self.lock:
+            samples = sorted(self.latencies)
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def error_rate(self) -> float:
+        """Get the fraction of recent calls that failed."""
+        with self.lock:
+            if not self.outcomes:
+                return 0.0
+            return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def get_stats(self) -> Dict:
+        """Get window statistics."""
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+        return {
+            'samples': len(self.latencies),
+            'p50_ms': ms(self.quantile(0.5)),
+            'p95_ms': ms(self.quantile(0.95)),
+            'p99_ms': ms(self.quantile(0.99)),
+            'error_rate': round(self.error_rate(), 3)
+        }
+
+
+class HedgedVisionRouter:
+    """
+    Vision service that routes each call across several backends.
+
+    Exposes the same calls as the backends (analyze_image, detect_obstacles,
+    describe_scene, read_text), so it can stand in for a vision service
+    anywhere in the pipeline.
+    """
+
+    MIN_SAMPLES = 20  # Samples before a backend's quantiles are trusted
+    MAX_ERROR_RATE = 0.5  # Backends failing more often are tried last...
+    FAILURE_COOLDOWN = 30.0  # ...until they have not failed for this many seconds
+
+    def __init__(self, backends: List[Tuple[str, object]], max_workers: int = 32):
+        """
+        Initialize router.
+
+        Args:
+            backends: (name, vision service) pairs, preferred backend first
+            max_workers: Threads available for in-flight backend calls
+        """
+        if not backends:
+            raise ValueError("HedgedVisionRouter needs at least one backend")
+        self.backends = list(backends)
+        self.services = dict(backends)
+        self.windows: Dict[Tuple[str, str], LatencyWindow] = {}
+        self.windows_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+        self.hedge_tokens = 1.0
+        self.tokens_lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.failovers = 0
+        self.wins: Dict[str, int] = {name: 0 for name, _ in self.backends}
+        self.stats_lock = threading.Lock()  # Guards the counters above; calls come from many threads
+        # OCR can come with the analysis call only if every backend that may answer it reads text
+        self.reads_text = all(getattr(service, 'reads_text', False) for _, service in self.backends)
+
+    def analyze_image(self, image_bytes: bytes, features=None) -> Dict:
+        """Route analyze_image (see AzureVisionService.analyze_image)."""
+        return self._route('analyze_image', image_bytes, features)
+
+    def detect_obstacles(self, image_bytes: bytes) -> Dict:
+        """Route detect_obstacles (see AzureVisionService.detect_obstacles)."""
+        return self._route('detect_obstacles', image_bytes)
+
+    def describe_scene(self, image_bytes: bytes, objects=None, features=None) -> Dict:
+        """Route describe_scene (see AzureVisionService.describe_scene)."""
+        return self._route('describe_scene', image_bytes, objects, features)
+
+    def read_text(self, image_bytes: bytes) -> Dict:
+        """Route read_text (see AzureVisionService.read_text)."""
+        return self._route('read_text', image_bytes)
+
+    def _window(self, backend: str, call: str) -> LatencyWindow:
+        """Get (creating if needed) the latency window of a backend call."""
+        window = self.windows.get((backend, call))
+        if window is None:
+            with self.windows_lock:
+                window = self.windows.setdefault((backend, call), LatencyWindow())
+        return window
+
+    def rank(self, call: str) -> List[str]:
+        """
+        Order backends for a call: healthy before recently failing, then by
+        recent p95 latency; backends without enough samples keep their
+        configured order behind those with a known p95.
+        """
+        def key(item):
+            position, (name, _) = item
+            window = self._window(name, call)
+            failing = (window.error_rate() > self.MAX_ERROR_RATE
+                       and time.time() - window.last_failure_at < self.FAILURE_COOLDOWN)
+            p95 = window.quantile(0.95, self.MIN_SAMPLES)
+            return (failing, p95 if p95 is not None else float('inf'), position)
+        return [name for _, (name, _) in sorted(enumerate(self.backends), key=key)]
+
+    def hedge_delay(self, backend: str, call: str) -> float:
+        """Get how long to wait for a backend before hedging, in seconds."""
+        delay = self._window(backend, call).quantile(config.Config.HEDGE_QUANTILE, self.MIN_SAMPLES)
+        if delay is None:
+            delay = config.Config.HEDGE_DELAY_MS / 1000.0
+        return min(max(delay, config.Config.HEDGE_MIN_DELAY_MS / 1000.0), config.Config.HEDGE_MAX_DELAY_MS / 1000.0)
+
+    def _take_hedge_token(self) -> bool:
+        """Check the hedging budget (HEDGE_MAX_RATIO of calls)."""
+        with self.tokens_lock:
+            if self.hedge_tokens >= 1.0:
+                self.hedge_tokens -= 1.0
+                return True
+            return False
+
+    def _attempt(self, backend: str, call: str, args: tuple, parent) -> Dict:
+        """Run one backend call (executor thread), recording its latency."""
+        started = time.perf_counter()
+        with tracing.span(f'backend.{backend}', parent=parent):
+            try:
+                result = getattr(self.services[backend], call)(*args)
+            except Exception as e:
+                result = {'error': str(e), 'error_code': 'UNKNOWN'}
+        elapsed = time.perf_counter() - started
+        ok = _is_valid(result)
+        self._window(backend, call).record(elapsed, ok)
+        if ok:
+            metrics.BACKEND_LATENCY.observe(elapsed, backend=backend, call=call)
+        return result
+
+    def _route(self, call: str, *args) -> Dict:
+        """Run a call on the best backend, hedging to the others as needed."""
+        with self.stats_lock:
+            self.calls += 1
+        with self.tokens_lock:
+            self.hedge_tokens = min(10.0, self.hedge_tokens + config.Config.HEDGE_MAX_RATIO)
+
+        parent = tracing.current_span()
+        remaining = self.rank(call)
+        backend = remaining.pop(0)
+        pending = {self.executor.submit(self._attempt, backend, call, args, parent): backend}
+        timeout = self.hedge_delay(backend, call) if remaining else None
+        first_error = None
+
+        while pending:
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                winner = pending.pop(future)
+                result = future.result()
+                if _is_valid(result):
+                    for loser in pending:
+                        loser.cancel()  # Only stops calls that have not started
+                    with self.stats_lock:
+                        self.wins[winner] += 1
+                    metrics.HEDGED_RESULTS.inc(call=call, backend=winner)
+                    return result
+                first_error = first_error or result
+
+            if not remaining:
+                timeout = None
+                continue
+            if done:
+                reason = 'error'  # Fail over right away
+                with self.stats_lock:
+                    self.failovers += 1
+            elif self._take_hedge_token():
+                reason = 'slow'
+                with self.stats_lock:
+                    self.hedges += 1
+            else:
+                timeout = None  # Over the hedging budget: wait for what is running
+                continue
+            backend = remaining.pop(0)
+            metrics.HEDGES.inc(call=call, reason=reason)
+            pending[self.executor.submit(self._attempt, backend, call, args, parent)] = backend
+            timeout = self.hedge_delay(backend, call) if remaining else None
+
+        return first_error
+
+    def get_stats(self) -> Dict:
+        """Get routing statistics."""
+        with self.stats_lock:
+            counters = {'calls': self.calls, 'hedges': self.hedges, 'failovers': self.failovers,
+                        'wins': dict(self.wins)}
+        with self.windows_lock:
+            windows = sorted(self.windows.items())
+        return {
+            'backends': [name for name, _ in self.backends],
+            **counters,
+            'latency': {
+                f"{backend}.{call}": window.get_stats()
+                for (backend, call), window in windows
+            }
+        }
+
+
+def _is_valid(result) -> bool:
+    """Check whether a backend result can be returned to the caller."""
+    return not (isinstance(result, dict) and 'error' in result)
+
+
+def create_hedged_service(primary: str, primary_service, hedge_backends: Optional[str] = None):
+    """
+    Wrap a vision service in a HedgedVisionRouter if hedge backends are configured.
+
+    Args:
+        primary: Name of the primary backend
+        primary_service: The primary vision service
+        hedge_backends: Comma-separated backend names (defaults to
+            VISION_HEDGE_BACKENDS)
+
+    Returns:
+        A HedgedVisionRouter, or primary_service if no hedge backend is available
+    """
+    names = hedge_backends if hedge_backends is not None else config.Config.VISION_HEDGE_BACKENDS
+    backends = [(primary, primary_service)]
+    for name in (n.strip() for n in names.split(',')):
+        if not name or name == primary:
+            continue
+        try:
+            backends.append((name, create_vision_service(name)))
+            print(f"Hedging backend '{name}' initialized")
+        except Exception as e:
+            print(f"Hedging backend '{name}' not available: {e}")
+    if len(backends) == 1:
+        return primary_service
+    return HedgedVisionRouter(backends)
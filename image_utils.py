@@ -0,0 +1,222 @@
+"""Image helpers: decoding, frame encoding, cropping regions into a mosaic and mapping results back."""
+import io
+import threading
+from typing import List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+
+
+Box = Tuple[int, int, int, int]  # x, y, width, height
+Placement = Tuple[int, int, int, int, int, int]  # mosaic x, mosaic y, frame x, frame y, width, height
+
+# JPEG decoders can decode at 1/2, 1/4 or 1/8 scale in the DCT domain, skipping most of the work
+REDUCED_COLOR = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+REDUCED_GRAYSCALE = {
+    1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8
+}
+DECODE_CACHE_SIZE = 4  # Recent decodes kept, so one frame is decoded once per request
+
+_decode_cache: List[Tuple[bytes, bool, np.ndarray, float]] = []  # (image bytes, gray, image, scale), newest last
+_decode_lock = threading.Lock()
+
+
+def image_size(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from an encoded image's header without decoding it."""
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def decode_image(image_bytes: bytes, min_size: Optional[int] = None, gray: bool = False) -> Tuple[Optional[np.ndarray], float]:
+    """
+    Decode an image at the lowest resolution a consumer needs.
+
+    The image is decoded at the smallest of 1, 1/2, 1/4 and 1/8 scale whose
+    shorter side is still at least min_size. Decodes are cached by bytes
+    object, so later consumers of the same frame (detection, OCR, faces)
+    reuse the first decode if it is large enough; a grayscale request can
+    also be served from a color decode.
+
+    Args:
+        image_bytes: Encoded image
+        min_size: Smallest acceptable shorter side in pixels (None for full size)
+        gray: Decode to grayscale
+
+    Returns:
+        (image, scale) - scale is decoded width / original width, for mapping
+        coordinates back; image is None if the bytes cannot be decoded
+    """
+    size = image_size(image_bytes) if min_size else None
+    needed = 1.0 if size is None else min(1.0, min_size / min(size))
+
+    with _decode_lock:
+        for cached_bytes, cached_gray, image, scale in reversed(_decode_cache):
+            if cached_bytes is image_bytes and scale >= needed * 0.99 and (gray or not cached_gray):
+                if gray and not cached_gray:
+                    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), scale
+                return image, scale
+
+    reduction = 1
+    if size is not None:
+        while reduction < 8 and min(size) // (reduction * 2) >= min_size:
+            reduction *= 2
+    flags = (REDUCED_GRAYSCALE if gray else REDUCED_COLOR)[reduction]
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flags)
+    if image is None:
+        return None, 1.0
+    scale = image.shape[1] / size[0] if size is not None else 1.0
+
+    with _decode_lock:
+        _decode_cache.append((image_bytes, gray, image, scale))
+        del _decode_cache[:-DECODE_CACHE_SIZE]
+    return image, scale
+
+
+def encode_frame(frame: np.ndarray, max_width: int, jpeg_quality: int) -> bytes:
+    """
+    Downscale a frame to at most max_width and encode it as JPEG.
+
+    Args:
+        frame: BGR frame
+        max_width: Maximum width in pixels
+        jpeg_quality: JPEG quality (0-100)
+
+    Returns:
+        JPEG bytes
+    """
+    height, width = frame.shape[:2]
+    if width > max_width:
+        scale = max_width / width
+        frame = cv2.resize(frame, (max_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    return buffer.tobytes()
+
+
+def scale_box(box: Box, factor: float) -> Box:
+    """Scale a box's coordinates, e.g. from a reduced decode back to the original image."""
+    return tuple(int(round(v * factor)) for v in box)
+
+
+def pad_box(box: Box, padding: int, shape: Tuple[int, ...]) -> Box:
+    """Grow a box by padding on every side, clamped to an image of the given shape."""
+    x, y, w, h = box
+    left, top = max(0, x - padding), max(0, y - padding)
+    right, bottom = min(shape[1], x + w + padding), min(shape[0], y + h + padding)
+    return left, top, right - left, bottom - top
+
+
+def merge_boxes(boxes: Sequence[Box], gap: int = 0) -> List[Box]:
+    """
+    Merge boxes that overlap or lie within gap pixels of each other.
+
+    Args:
+        boxes: (x, y, width, height) boxes
+        gap: Maximum distance between boxes that are merged
+
+    Returns:
+        Merged boxes
+    """
+    merged = [list(b) for b in boxes]
+    changed = True
+    while changed:
+        changed = False
+        result = []
+        while merged:
+            x, y, w, h = merged.pop()
+            i = 0
+            while i < len(merged):
+                ox, oy, ow, oh = merged[i]
+                if ox - gap <= x + w and x - gap <= ox + ow and oy - gap <= y + h and y - gap <= oy + oh:
+                    right, bottom = max(x + w, ox + ow), max(y + h, oy + oh)
+                    x, y = min(x, ox), min(y, oy)
+                    w, h = right - x, bottom - y
+                    merged.pop(i)
+                    changed = True
+                else:
+                    i += 1
+            result.append([x, y, w, h])
+        merged = result
+    return [tuple(b) for b in merged]
+
+
+def build_mosaic(image: np.ndarray, boxes: Sequence[Box], spacing: int = 16,
+                 min_size: int = 50, fill: int = 255) -> Tuple[np.ndarray, List[Placement]]:
+    """
+    Stack crops of an image into one smaller image.
+
+    Crops are stacked vertically, left-aligned, with spacing between them so
+    that lines from different crops are not read as one.
+
+    Args:
+        image: Source image (grayscale or BGR)
+        boxes: Regions to crop
+        spacing: Pixels between crops
+        min_size: Minimum mosaic width and height (APIs reject tiny images)
+        fill: Background value
+
+    Returns:
+        (mosaic, placements) - one placement per crop, for map_polygon()
+    """
+    width = max(min_size, max(w for _, _, w, _ in boxes))
+    height = max(min_size, sum(h for _, _, _, h in boxes) + spacing * (len(boxes) - 1))
+    mosaic = np.full((height, width) + image.shape[2:], fill, dtype=image.dtype)
+
+    placements = []
+    top = 0
+    for x, y, w, h in boxes:
+        mosaic[top:top + h, 0:w] = image[y:y + h, x:x + w]
+        placements.append((0, top, x, y, w, h))
+        top += h + spacing
+    return mosaic, placements
+
+
+def find_placement(x: float, y: float, placements: Sequence[Placement]) -> Optional[int]:
+    """Get the index of the crop containing a mosaic point, or None."""
+    for index, (mosaic_x, mosaic_y, _, _, w, h) in enumerate(placements):
+        if mosaic_x <= x <= mosaic_x + w and mosaic_y <= y <= mosaic_y + h:
+            return index
+    return None
+
+
+def map_box(box: Box, placements: Sequence[Placement]) -> Optional[Box]:
+    """
+    Map a box from mosaic to source image coordinates.
+
+    The box is assigned to the crop containing its centre.
+
+    Returns:
+        The box in source coordinates, or None if it lies outside every crop
+    """
+    x, y, w, h = box
+    index = find_placement(x + w / 2, y + h / 2, placements)
+    if index is None:
+        return None
+    mosaic_x, mosaic_y, frame_x, frame_y, _, _ = placements[index]
+    return x + frame_x - mosaic_x, y + frame_y - mosaic_y, w, h
+
+
+def map_polygon(polygon: Optional[Sequence[float]], placements: Sequence[Placement]) -> Optional[List[float]]:
+    """
+    Map a polygon [x1, y1, x2, y2, ...] from mosaic to source image coordinates.
+
+    The polygon is assigned to the crop containing its centre.
+
+    Returns:
+        The polygon in source coordinates, or None if it lies outside every crop
+    """
+    if not polygon:
+        return None
+    xs, ys = polygon[0::2], polygon[1::2]
+    index = find_placement(sum(xs) / len(xs), sum(ys) / len(ys), placements)
+    if index is None:
+        return None
+    mosaic_x, mosaic_y, frame_x, frame_y, _, _ = placements[index]
+    dx, dy = frame_x - mosaic_x, frame_y - mosaic_y
+    mapped = []
+    for px, py in zip(xs, ys):
+        mapped.extend((px + dx, py + dy))
+    return mapped
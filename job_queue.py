@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Analysis job queue: broker, web-tier client and autoscaling signals.
+
+In ANALYSIS_MODE=queue the web tier does not run the vision backend. Each
+frame becomes one job on a shared queue held by a broker process; analysis
+workers (analysis_worker.py, on any machine that can reach the broker) take
+jobs, run the pipeline and put the result on the submitting web process's
+own reply queue.
+
+Run the broker:
+    python job_queue.py
+
+The broker uses multiprocessing.managers, which exchanges pickled objects:
+anyone holding JOB_QUEUE_AUTHKEY can run code on the broker. Keep it on a
+private network and set a strong key.
+"""
+import itertools
+import math
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.managers import BaseManager
+from typing import Collection, Dict, Optional, Tuple
+import config
+
+
+WORKER_HEARTBEAT_INTERVAL = 2.0  # Seconds between worker heartbeats
+WORKER_TIMEOUT = 10.0  # Workers silent for longer are considered gone
+CLIENT_TIMEOUT = 120.0  # Reply queues of web processes silent for longer are dropped
+TARGET_UTILISATION = 0.8  # Busy-slot fraction the desired worker count aims for
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """Parse 'host:port'."""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+class BrokerState:
+    """Queues and worker registry held by the broker process."""
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.replies: Dict[str, queue.Queue] = {}
+        self.clients: Dict[str, float] = {}
+        self.workers: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def job_queue(self) -> queue.Queue:
+        return self.jobs
+
+    def reply_queue(self, client_id: str) -> queue.Queue:
+        """Get (creating if needed) the reply queue of a web process."""
+        with self.lock:
+            self.clients[client_id] = time.time()
+            reply_queue = self.replies.get(client_id)
+            if reply_queue is None:
+                reply_queue = self.replies[client_id] = queue.Queue()
+            return reply_queue
+
+    def heartbeat(self, worker_id: str, info: Dict):
+        """Record a worker heartbeat."""
+        with self.lock:
+            self.workers[worker_id] = dict(info, last_seen=time.time())
+
+    def stats(self, client_id: Optional[str] = None) -> Dict:
+        """
+        Get queue and worker statistics (also marks client_id as alive).
+
+        The desired worker count is the number of workers needed to run the
+        busy and queued jobs at TARGET_UTILISATION - a scaling signal for an
+        autoscaler.
+        """
+        now = time.time()
+        with self.lock:
+            if client_id is not None:
+                self.clients[client_id] = now
+            for worker_id in [w for w, info in self.workers.items() if now - info['last_seen'] > WORKER_TIMEOUT]:
+                del self.workers[worker_id]
+            for gone in [c for c, seen in self.clients.items() if now - seen > CLIENT_TIMEOUT]:
+                del self.clients[gone]
+                self.replies.pop(gone, None)
+            workers = list(self.workers.values())
+            clients = len(self.clients)
+
+        queue_depth = self.jobs.qsize()
+        slots = sum(w.get('slots', 1) for w in workers)
+        busy = sum(w.get('busy', 0) for w in workers)
+        slots_per_worker = slots / len(workers) if workers else config.Config.WORKER_THREADS
+        desired = math.ceil((busy + queue_depth) / (slots_per_worker * TARGET_UTILISATION))
+        return {
+            'queue_depth': queue_depth,
+            'workers': len(workers),
+            'slots': slots,
+            'busy_slots': busy,
+            'utilisation': round(busy / slots, 3) if slots else None,
+            'desired_workers': max(1, desired),
+            'processed': sum(w.get('processed', 0) for w in workers),
+            'expired': sum(w.get('expired', 0) for w in workers),
+            'failed': sum(w.get('failed', 0) for w in workers),
+            'clients': clients
+        }
+
+
+class QueueManager(BaseManager):
+    """Manager exposing the broker's queues over TCP."""
+
+
+QueueManager.register('job_queue')
+QueueManager.register('reply_queue')
+QueueManager.register('broker', exposed=('heartbeat', 'stats'))
+
+
+def connect(address: Optional[str] = None) -> QueueManager:
+    """Connect to the broker."""
+    manager = QueueManager(
+        address=parse_address(address or config.Config.JOB_QUEUE_ADDRESS),
+        authkey=config.Config.JOB_QUEUE_AUTHKEY.encode()
+    )
+    manager.connect()
+    return manager
+
+
+class JobQueueClient:
+    """
+    Web-tier side of the job queue.
+
+    Submits one job per frame and waits for the result on this process's
+    reply queue. A background thread routes replies to waiting requests.
+    Connections are opened lazily per process, so the client can be created
+    before gunicorn forks its workers.
+    """
+
+    STATS_INTERVAL = 2.0  # Seconds between broker stats polls
+
+    def __init__(self, address: Optional[str] = None):
+        """
+        Initialize job queue client.
+
+        Args:
+            address: Broker 'host:port' (defaults to JOB_QUEUE_ADDRESS)
+        """
+        self.address = address or config.Config.JOB_QUEUE_ADDRESS
+        self.backend_name = None  # Set by the app from VISION_BACKEND
+        self.lock = threading.Lock()  # Guards the connection state and pending
+        self.pid = None
+        self.client_id = None
+        self.manager = None
+        self.jobs = None
+        self.replies = None
+        self.broker = None
+        self.pending: Dict[str, Future] = {}
+        self.job_counter = itertools.count(1)
+        self.last_connect_attempt = 0.0
+        self.broker_stats: Dict = {}
+        self.submitted = 0
+        self.timeouts = 0
+        self.late_replies = 0
+
+    def _ensure_connected(self) -> bool:
+        """Connect to the broker in this process if needed."""
+        if self.pid == os.getpid() and self.manager is not None:
+            return True
+        with self.lock:
+            if self.pid == os.getpid() and self.manager is not None:
+                return True
+            if time.time() - self.last_connect_attempt < 1.0:
+                return False  # Don't hammer an unreachable broker
+            self.last_connect_attempt = time.time()
+            try:
+                self.client_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+                manager = connect(self.address)
+                self.jobs = manager.job_queue()
+                self.replies = manager.reply_queue(self.client_id)
+                self.broker = manager.broker()
+                self.pending = {}
+                self.manager = manager
+                self.pid = os.getpid()
+            except Exception as e:
+                print(f"[JobQueue] Cannot reach broker at {self.address}: {e}")
+                self.manager = None
+                return False
+            threading.Thread(target=self._reply_loop, args=(self.pid,), daemon=True).start()
+            threading.Thread(target=self._stats_loop, args=(self.pid,), daemon=True).start()
+            print(f"[JobQueue] Connected to broker at {self.address} as {self.client_id}")
+            return True
+
+    def _disconnect(self):
+        """Drop the broker connection; the next submit reconnects."""
+        with self.lock:
+            self.manager = None
+            for future in list(self.pending.values()):
+                if not future.done():
+                    future.set_result({'status': 'error', 'error': 'Broker connection lost'})
+            self.pending = {}
+
+    def _reply_loop(self, pid: int):
+        """Route replies from the broker to waiting requests."""
+        while self.pid == pid and self.manager is not None:
+            try:
+                reply = self.replies.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except Exception as e:
+                print(f"[JobQueue] Reply queue error: {e}")
+                self._disconnect()
+                return
+            with self.lock:
+                future = self.pending.pop(reply.get('job_id'), None)
+                if future is None:
+                    self.late_replies += 1  # Request already gave up
+                    continue
+            future.set_result(reply)
+
+    def _stats_loop(self, pid: int):
+        """Poll broker statistics (this also keeps the reply queue alive)."""
+        while self.pid == pid and self.manager is not None:
+            try:
+                self.broker_stats = self.broker.stats(self.client_id)
+            except Exception:
+                self.broker_stats = {}
+            time.sleep(self.STATS_INTERVAL)
+
+    def analyze(self, image_bytes: bytes, want_faces: bool, deadline: Optional[float] = None,
+                lane: str = 'full', features: Optional[Collection[str]] = None) -> Tuple[Dict, bool, Dict]:
+        """
+        Run the analysis pipeline for one frame on a worker.
+
+        Args:
+            image_bytes: Encoded image
+            want_faces: Whether to run face detection
+            deadline: Unix time after which the result is useless (defaults
+                to now + JOB_DEADLINE_MS); workers skip expired jobs
+            lane: Pipeline lane to run (see analysis_pipeline.LANES)
+            features: Result fields to produce (see analysis_pipeline.FEATURES); None for all
+
+        Returns:
+            (analysis, complete, reply metadata)
+        """
+        deadline = deadline or time.time() + config.Config.JOB_DEADLINE_MS / 1000.0
+        if not self._ensure_connected():
+            return {'error': 'Analysis queue unavailable', 'error_code': 'QUEUE_UNAVAILABLE'}, False, {'status': 'unavailable'}
+
+        job_id = f"{self.client_id}-{next(self.job_counter)}"
+        future = Future()
+        with self.lock:
+            self.pending[job_id] = future
+        try:
+            self.jobs.put({
+                'job_id': job_id,
+                'reply_to': self.client_id,
+                'enqueued_at': time.time(),
+                'deadline': deadline,
+                'want_faces': want_faces,
+                'lane': lane,
+                'features': sorted(features) if features is not None else None,
+                'image': image_bytes
+            })
+        except Exception as e:
+            with self.lock:
+                self.pending.pop(job_id, None)
+            print(f"[JobQueue] Submit failed: {e}")
+            self._disconnect()
+            return {'error': 'Analysis queue unavailable', 'error_code': 'QUEUE_UNAVAILABLE'}, False, {'status': 'unavailable'}
+        with self.lock:
+            self.submitted += 1
+
+        try:
+            # Small grace period for the reply to travel back
+            reply = future.result(timeout=max(0.0, deadline - time.time()) + 0.25)
+        except FutureTimeoutError:
+            with self.lock:
+                self.pending.pop(job_id, None)
+                self.timeouts += 1
+            return {'error': 'Analysis timed out', 'error_code': 'TIMEOUT'}, False, {'status': 'timeout'}
+
+        status = reply.get('status')
+        if status == 'ok':
+            return reply['analysis'], reply.get('complete', False), reply
+        if status == 'expired':
+            return {'error': 'Analysis deadline expired in queue', 'error_code': 'TIMEOUT'}, False, reply
+        return {'error': reply.get('error', 'Analysis failed'), 'error_code': 'WORKER_ERROR'}, False, reply
+
+    @property
+    def connected(self) -> bool:
+        return self.manager is not None and self.pid == os.getpid()
+
+    def get_stats(self) -> Dict:
+        """Get client and broker statistics."""
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            'address': self.address,
+            'connected': self.connected,
+            'pending': pending,
+            'submitted': self.submitted,
+            'timeouts': self.timeouts,
+            'late_replies': self.late_replies,
+            'broker': self.broker_stats
+        }
+
+
+def serve(address: Optional[str] = None):
+    """Run the broker until interrupted."""
+    state = BrokerState()
+
+    class BrokerManager(BaseManager):
+        pass
+
+    BrokerManager.register('job_queue', callable=state.job_queue)
+    BrokerManager.register('reply_queue', callable=state.reply_queue)
+    BrokerManager.register('broker', callable=lambda: state, exposed=('heartbeat', 'stats'))
+
+    host, port = parse_address(address or config.Config.JOB_QUEUE_ADDRESS)
+    manager = BrokerManager(address=(host, port), authkey=config.Config.JOB_QUEUE_AUTHKEY.encode())
+    server = manager.get_server()
+    print(f"Job queue broker listening on {host}:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Analysis job queue broker")
+    parser.add_argument('--address', help=f"host:port to listen on (default: {config.Config.JOB_QUEUE_ADDRESS})")
+    args = parser.parse_args()
+    try:
+        serve(args.address)
+    except KeyboardInterrupt:
+        sys.exit(0)
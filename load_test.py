@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""End-to-end load generator simulating concurrent mobile clients.
+
+Each virtual client behaves like startMobileFrameCapture/processMobileFrame
+in templates/index.html: it captures on a timer, keeps at most one frame in
+flight, follows the server's X-Capture-Params and honours Retry-After.
+
+Usage:
+    python load_test.py --url http://127.0.0.1:8000 --clients 50 --duration 60
+    python load_test.py --clients 20 --corpus frames/ --server-pid $(pgrep -of gunicorn)
+
+Run the app against azure_standin.py to measure the server without Azure quota.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import requests
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+DEFAULT_PARAMS = {'interval_ms': 400, 'max_width': 1280, 'jpeg_quality': 0.85}
+
+
+class FrameCorpus:
+    """Source frames, encoded on demand at the width and quality a client asks for."""
+
+    def __init__(self, directory: Optional[str] = None, synthetic_count: int = 8):
+        """
+        Initialize frame corpus.
+
+        Args:
+            directory: Directory of .jpg/.jpeg/.png frames (synthetic frames if None)
+            synthetic_count: Number of synthetic frames when no directory is given
+        """
+        self.frames: List[np.ndarray] = []
+        if directory:
+            for path in sorted(glob.glob(os.path.join(directory, '*'))):
+                if path.lower().endswith(('.jpg', '.jpeg', '.png')):
+                    frame = cv2.imread(path)
+                    if frame is not None:
+                        self.frames.append(frame)
+            if not self.frames:
+                raise ValueError(f"No images found in {directory}")
+        else:
+            from benchmark import make_frame
+            self.frames = [make_frame(seed=seed) for seed in range(synthetic_count)]
+        self.cache: Dict[tuple, bytes] = {}
+        self.lock = threading.Lock()
+
+    def encode(self, index: int, max_width: int, quality: float) -> bytes:
+        """
+        Get frame index scaled to max_width and JPEG-encoded at quality.
+
+        Args:
+            index: Frame index (wraps around)
+            max_width: Maximum width in pixels
+            quality: JPEG quality in 0..1 (as passed to canvas.toBlob)
+        """
+        index %= len(self.frames)
+        key = (index, int(max_width), round(quality, 2))
+        data = self.cache.get(key)
+        if data is None:
+            frame = self.frames[index]
+            height, width = frame.shape[:2]
+            scale = min(1.0, max_width / width)
+            if scale < 1.0:
+                frame = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality * 100)])
+            data = buffer.tobytes()
+            with self.lock:
+                self.cache[key] = data
+        return data
+
+
+class Results:
+    """Thread-safe collection of request outcomes."""
+
+    def __init__(self):
+        self.records: List[tuple] = []  # (finished_at, latency_s, outcome)
+        self.skipped_in_flight = 0
+        self.skipped_retry_after = 0
+        self.lock = threading.Lock()
+
+    def add(self, finished_at: float, latency: float, outcome: str):
+        with self.lock:
+            self.records.append((finished_at, latency, outcome))
+
+    def skip(self, reason: str):
+        with self.lock:
+            if reason == 'in_flight':
+                self.skipped_in_flight += 1
+            else:
+                self.skipped_retry_after += 1
+
+    def window(self, start: float, end: float) -> List[tuple]:
+        with self.lock:
+            return [r for r in self.records if start <= r[0] < end]
+
+
+class VirtualClient(threading.Thread):
+    """One simulated phone running the browser capture loop."""
+
+    def __init__(self, number: int, args, corpus: FrameCorpus, results: Results, stop: threading.Event):
+        super().__init__(daemon=True)
+        self.number = number
+        self.args = args
+        self.corpus = corpus
+        self.results = results
+        self.stop_event = stop
+        self.session_id = str(uuid.uuid4())
+        self.params = dict(DEFAULT_PARAMS)
+        if args.interval_ms:
+            self.params['interval_ms'] = args.interval_ms
+        self.retry_after_until = 0.0
+        self.last_round_trip_ms = None
+        self.frame_index = random.randrange(len(corpus.frames))
+        self.http = requests.Session()
+        self.http.headers['X-Session-ID'] = self.session_id
+
+    def run(self):
+        # Spread client start times over the ramp-up period
+        if self.args.ramp > 0:
+            self.stop_event.wait(self.args.ramp * self.number / max(1, self.args.clients))
+        next_tick = time.monotonic()
+        while not self.stop_event.is_set():
+            delay = next_tick - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+            next_tick += self.params['interval_ms'] / 1000.0
+
+            if time.time() < self.retry_after_until:
+                self.results.skip('retry_after')
+                continue
+            self.process_frame()
+
+            # Ticks that fired while the frame was in flight were skipped
+            now = time.monotonic()
+            while next_tick <= now:
+                next_tick += self.params['interval_ms'] / 1000.0
+                self.results.skip('in_flight')
+
+    def process_frame(self):
+        """Capture, encode and upload one frame, like processMobileFrame."""
+        captured_at = time.perf_counter()
+        self.frame_index += 1
+        image = self.corpus.encode(self.frame_index, self.params['max_width'], self.params['jpeg_quality'])
+        encoded_at = time.perf_counter()
+
+        headers = {
+            'X-Frame-Age-Ms': str(round((encoded_at - captured_at) * 1000)),
+            'X-Client-Capture-Ms': '0.0',
+            'X-Client-Encode-Ms': f"{(encoded_at - captured_at) * 1000:.1f}"
+        }
+        if self.last_round_trip_ms is not None:
+            headers['X-Client-RTT-Ms'] = str(self.last_round_trip_ms)
+
+        sent_at = time.perf_counter()
+        try:
+            response = self.http.post(
+                f"{self.args.url}/api/process",
+                files={'image': ('frame.jpg', image, 'image/jpeg')},
+                headers=headers,
+                timeout=self.args.timeout
+            )
+        except requests.RequestException:
+            self.results.add(time.time(), time.perf_counter() - sent_at, 'connection_error')
+            return
+        latency = time.perf_counter() - sent_at
+        self.last_round_trip_ms = round(latency * 1000)
+
+        if not self.args.interval_ms:
+            advertised = response.headers.get('X-Capture-Params')
+            if advertised:
+                try:
+                    self.params.update(json.loads(advertised))
+                except ValueError:
+                    pass
+
+        try:
+            retry_after = int(response.headers.get('Retry-After') or 0)
+        except ValueError:
+            retry_after = 0
+        if retry_after > 0:
+            self.retry_after_until = time.time() + retry_after
+
+        self.results.add(time.time(), latency, classify(response))
+
+
+def classify(response: requests.Response) -> str:
+    """Classify a /api/process response."""
+    if response.status_code == 429:
+        return 'rejected_429'
+    if response.status_code >= 400:
+        return f'http_{response.status_code}'
+    if response.headers.get('X-Analysis-Cached') == 'true':
+        return 'cached'
+    try:
+        body = response.json()
+    except ValueError:
+        return 'invalid_json'
+    if isinstance(body, dict) and body.get('error'):
+        return 'analysis_error'
+    return 'ok'
+
+
+class ProcessSampler:
+    """Samples CPU and RSS of a server process and its children."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.last_cpu = None
+        self.last_time = None
+        self.clock_ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self.page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def _pids(self) -> List[int]:
+        """The server pid plus all descendants (e.g. gunicorn workers)."""
+        if psutil is not None:
+            try:
+                process = psutil.Process(self.pid)
+                return [self.pid] + [child.pid for child in process.children(recursive=True)]
+            except psutil.Error:
+                return []
+        pids, pending = [], [self.pid]
+        while pending:
+            pid = pending.pop()
+            pids.append(pid)
+            for children_file in glob.glob(f"/proc/{pid}/task/*/children"):
+                try:
+                    with open(children_file) as f:
+                        pending.extend(int(child) for child in f.read().split())
+                except OSError:
+                    continue
+        return pids
+
+    def _read(self):
+        """Get (cpu_seconds, rss_bytes) summed over the process tree."""
+        cpu, rss = 0.0, 0
+        for pid in self._pids():
+            try:
+                if psutil is not None:
+                    process = psutil.Process(pid)
+                    times = process.cpu_times()
+                    cpu += times.user + times.system
+                    rss += process.memory_info().rss
+                    continue
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                cpu += (int(fields[11]) + int(fields[12])) / self.clock_ticks
+                rss += int(fields[21]) * self.page_size
+            except Exception:
+                continue
+        return cpu, rss
+
+    def sample(self) -> Dict:
+        """Get CPU % (of one core) since the previous sample and current RSS in MB."""
+        now = time.monotonic()
+        cpu, rss = self._read()
+        percent = None
+        if self.last_cpu is not None and now > self.last_time:
+            percent = 100.0 * (cpu - self.last_cpu) / (now - self.last_time)
+        self.last_cpu, self.last_time = cpu, now
+        return {'cpu_percent': percent, 'rss_mb': rss / (1024 * 1024)}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(records: List[tuple], duration: float) -> Dict:
+    """Summarize a set of request records."""
+    outcomes: Dict[str, int] = {}
+    for _, _, outcome in records:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    total = len(records)
+    analysed = sorted(latency * 1000 for _, latency, outcome in records if outcome in ('ok', 'analysis_error'))
+    errors = sum(count for outcome, count in outcomes.items() if outcome not in ('ok', 'cached', 'rejected_429'))
+    return {
+        'requests': total,
+        'requests_per_sec': round(total / duration, 2) if duration > 0 else 0.0,
+        'analyses_per_sec': round(outcomes.get('ok', 0) / duration, 2) if duration > 0 else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(analysed, 0.50), 1),
+            'p90': round(percentile(analysed, 0.90), 1),
+            'p95': round(percentile(analysed, 0.95), 1),
+            'p99': round(percentile(analysed, 0.99), 1),
+            'max': round(analysed[-1], 1) if analysed else 0.0,
+            'mean': round(statistics.mean(analysed), 1) if analysed else 0.0
+        },
+        'rate_429': round(outcomes.get('rejected_429', 0) / total, 4) if total else 0.0,
+        'cached_rate': round(outcomes.get('cached', 0) / total, 4) if total else 0.0,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'outcomes': outcomes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent mobile clients against /api/process")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help="App base URL")
+    parser.add_argument('--clients', type=int, default=10, help="Number of virtual clients")
+    parser.add_argument('--duration', type=float, default=60.0, help="Test duration in seconds (after ramp-up)")
+    parser.add_argument('--ramp', type=float, default=5.0, help="Seconds over which clients start")
+    parser.add_argument('--interval-ms', type=int,
+                        help="Fixed capture interval; ignores X-Capture-Params (default: follow the server)")
+    parser.add_argument('--corpus', help="Directory of JPEG/PNG frames (default: synthetic frames)")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Request timeout in seconds")
+    parser.add_argument('--server-pid', type=int, help="Server process to sample CPU/RSS from (children included)")
+    parser.add_argument('--report-interval', type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument('--output', help="Write the summary and timeline as JSON")
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+
+    try:
+        corpus = FrameCorpus(args.corpus)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    sampler = ProcessSampler(args.server_pid) if args.server_pid else None
+    if sampler:
+        sampler.sample()
+
+    results = Results()
+    stop = threading.Event()
+    clients = [VirtualClient(number, args, corpus, results, stop) for number in range(args.clients)]
+    print(f"Starting {args.clients} clients against {args.url} "
+          f"(ramp {args.ramp:.0f}s, duration {args.duration:.0f}s, {len(corpus.frames)} frames)")
+    started = time.time()
+    for client in clients:
+        client.start()
+
+    timeline = []
+    print(f"{'t':>6} {'req/s':>7} {'ok/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'429%':>6} {'err%':>6} {'cpu%':>7} {'rss MB':>8}")
+    end_at = started + args.ramp + args.duration
+    window_start = started
+    try:
+        while time.time() < end_at:
+            time.sleep(min(args.report_interval, max(0.0, end_at - time.time())))
+            now = time.time()
+            stats = summarize(results.window(window_start, now), now - window_start)
+            resources = sampler.sample() if sampler else {'cpu_percent': None, 'rss_mb': None}
+            point = {'t': round(now - started, 1), **stats, **resources}
+            timeline.append(point)
+            cpu = f"{resources['cpu_percent']:.0f}" if resources['cpu_percent'] is not None else '-'
+            rss = f"{resources['rss_mb']:.0f}" if resources['rss_mb'] is not None else '-'
+            print(f"{point['t']:6.0f} {stats['requests_per_sec']:7.1f} {stats['analyses_per_sec']:7.1f} "
+                  f"{stats['latency_ms']['p50']:8.0f} {stats['latency_ms']['p95']:8.0f} "
+                  f"{100 * stats['rate_429']:6.1f} {100 * stats['error_rate']:6.1f} {cpu:>7} {rss:>8}")
+            window_start = now
+    except KeyboardInterrupt:
+        print("Interrupted")
+    stop.set()
+    for client in clients:
+        client.join(timeout=args.timeout)
+
+    # Steady state excludes the ramp-up period
+    steady_start = started + args.ramp
+    steady_end = time.time()
+    summary = summarize(results.window(steady_start, steady_end), steady_end - steady_start)
+    cpu_samples = [p['cpu_percent'] for p in timeline if p['cpu_percent'] is not None and p['t'] > args.ramp]
+    rss_samples = [p['rss_mb'] for p in timeline if p['rss_mb'] is not None]
+    if cpu_samples:
+        summary['server_cpu_percent'] = {'mean': round(statistics.mean(cpu_samples), 1), 'max': round(max(cpu_samples), 1)}
+    if rss_samples:
+        summary['server_rss_mb'] = {'max': round(max(rss_samples), 1)}
+    summary['skipped_in_flight'] = results.skipped_in_flight
+    summary['skipped_retry_after'] = results.skipped_retry_after
+
+    print(f"\n=== Steady state ({args.clients} clients, {steady_end - steady_start:.0f}s)")
+    print(f"Throughput: {summary['requests_per_sec']} req/s, {summary['analyses_per_sec']} analyses/s")
+    latency = summary['latency_ms']
+    print(f"Latency:    p50 {latency['p50']} ms, p90 {latency['p90']} ms, p95 {latency['p95']} ms, "
+          f"p99 {latency['p99']} ms, max {latency['max']} ms")
+    print(f"Rates:      429 {100 * summary['rate_429']:.1f}%, cached {100 * summary['cached_rate']:.1f}%, "
+          f"errors {100 * summary['error_rate']:.1f}%")
+    print(f"Outcomes:   {summary['outcomes']}")
+    if cpu_samples:
+        print(f"Server:     CPU mean {summary['server_cpu_percent']['mean']}% max {summary['server_cpu_percent']['max']}%, "
+              f"RSS max {summary['server_rss_mb']['max']} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'summary': summary, 'timeline': timeline}, f, indent=2)
+        print(f"Results saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""Lightweight Prometheus-style metrics for the frame pipeline."""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Sequence[str], values: Tuple) -> str:
+    """Format a label set as {name="value",...}."""
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value."""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metrics."""
+
+    metric_type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        """Convert keyword labels to an ordered key."""
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Render the metric in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Increment the counter."""
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self.lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally computed at scrape time."""
+
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple, float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels):
+        """Set the gauge."""
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the (unlabelled) gauge value by calling function at scrape time."""
+        self.function = function
+
+    def _samples(self) -> List[str]:
+        if self.function is not None:
+            try:
+                return [f"{self.name} {_format_value(self.function())}"]
+            except Exception:
+                return []
+        with self.lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram of observed values."""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple, List] = {}
+
+    def observe(self, value: float, **labels):
+        """Record one observation."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self.series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager observing the elapsed time of its block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self.lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self.series.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames + ('le',), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric to the registry."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Frame pipeline
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    'navassist_stage_duration_seconds',
+    'Latency of each frame pipeline stage',
+    ['stage']
+))
+FRAMES_TOTAL = REGISTRY.register(Counter(
+    'navassist_frames_total',
+    'Frames received for analysis',
+    ['source']
+))
+FRAMES_DROPPED = REGISTRY.register(Counter(
+    'navassist_frames_dropped_total',
+    'Frames dropped without analysis',
+    ['reason']
+))
+VISION_CALLS = REGISTRY.register(Counter(
+    'navassist_vision_calls_total',
+    'Vision backend calls (counts against the API budget)',
+    ['call']
+))
+VISION_ERRORS = REGISTRY.register(Counter(
+    'navassist_vision_errors_total',
+    'Vision backend calls that returned an error',
+    ['call', 'error_code']
+))
+
+# Frame quality gate
+FRAMES_LOW_QUALITY = REGISTRY.register(Counter(
+    'navassist_frames_low_quality_total',
+    'Frames below the quality gate (blurred or badly exposed)',
+    ['source']
+))
+CHOSEN_FRAME_SHARPNESS = REGISTRY.register(Histogram(
+    'navassist_chosen_frame_sharpness',
+    'Sharpness (Laplacian variance at 320 px) of frames sent for analysis',
+    buckets=(10, 25, 50, 100, 200, 400, 800, 1600, 3200)
+))
+
+# OCR gate
+OCR_GATE_DECISIONS = REGISTRY.register(Counter(
+    'navassist_ocr_gate_decisions_total',
+    'OCR gate decisions: skip (no text found), crop (text regions sent) or full (whole frame sent)',
+    ['decision']
+))
+OCR_BYTES = REGISTRY.register(Counter(
+    'navassist_ocr_bytes_total',
+    'Image bytes of frames considered for OCR (frame) and bytes actually sent (sent)',
+    ['kind']
+))
+
+# Face pre-detection
+FACE_GATE_DECISIONS = REGISTRY.register(Counter(
+    'navassist_face_gate_decisions_total',
+    'Face gate decisions: skip (no face found), tracked (all faces known), cropped (new faces sent) or full (no pre-detector)',
+    ['decision']
+))
+FACE_BYTES = REGISTRY.register(Counter(
+    'navassist_face_bytes_total',
+    'Image bytes of frames with new faces (frame) and of the face crops sent (sent)',
+    ['kind']
+))
+
+# Pipeline lanes (PIPELINE_LANES=split)
+LANE_LATENCY = REGISTRY.register(Histogram(
+    'navassist_lane_duration_seconds',
+    'Time from frame arrival until a lane result was published',
+    ['lane']
+))
+FAST_LANE_DEADLINE_MISSES = REGISTRY.register(Counter(
+    'navassist_fast_lane_deadline_misses_total',
+    'Obstacle results published after FAST_LANE_DEADLINE_MS'
+))
+SLOW_LANE_SKIPPED = REGISTRY.register(Counter(
+    'navassist_slow_lane_skipped_total',
+    'Frames not enriched by the slow lane',
+    ['reason']
+))
+
+# Hedged requests (VISION_HEDGE_BACKENDS)
+BACKEND_LATENCY = REGISTRY.register(Histogram(
+    'navassist_backend_duration_seconds',
+    'Successful vision call latency per backend, including calls that lost a hedge',
+    ['backend', 'call']
+))
+HEDGES = REGISTRY.register(Counter(
+    'navassist_hedges_total',
+    'Calls sent to another backend because the first was slow or failed',
+    ['call', 'reason']
+))
+HEDGED_RESULTS = REGISTRY.register(Counter(
+    'navassist_hedged_results_total',
+    'Routed vision calls by the backend whose result was used',
+    ['call', 'backend']
+))
+
+# HTTP
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    'navassist_http_request_duration_seconds',
+    'HTTP handler time per route',
+    ['route', 'method', 'status']
+))
+
+# Analysis responses (serialization.py)
+SERIALIZATION_LATENCY = REGISTRY.register(Histogram(
+    'navassist_serialization_seconds',
+    'Time to trim and encode an analysis result as JSON, by response profile',
+    ['profile'],
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+))
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    'navassist_response_bytes',
+    'Encoded analysis result size in bytes, by response profile',
+    ['profile'],
+    buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+))
+SERIALIZATION_CACHE = REGISTRY.register(Counter(
+    'navassist_serialization_cache_total',
+    'Encodings of published results answered from their cache (hit) or encoded (miss)',
+    ['result']
+))
+
+# Queues and budgets (computed at scrape time, see app.py)
+ANALYSES_IN_FLIGHT = REGISTRY.register(Gauge('navassist_analyses_in_flight', 'Analyses currently running'))
+ANALYSIS_LIMIT = REGISTRY.register(Gauge('navassist_analysis_concurrency_limit', 'Current admission concurrency limit'))
+AUDIO_QUEUE_DEPTH = REGISTRY.register(Gauge('navassist_audio_queue_depth', 'Announcements waiting to be spoken'))
+STREAM_SUBSCRIBERS = REGISTRY.register(Gauge('navassist_stream_subscribers', 'Open /api/analysis/stream connections'))
+ACTIVE_SESSIONS = REGISTRY.register(Gauge('navassist_active_sessions', 'Sessions held in memory'))
+RATE_BUDGET_REMAINING = REGISTRY.register(Gauge(
+    'navassist_rate_budget_remaining',
+    'Analysis budget tokens remaining, summed over sessions'
+))
+SESSIONS_OVER_BUDGET = REGISTRY.register(Gauge(
+    'navassist_sessions_over_budget',
+    'Sessions with an exhausted analysis budget'
+))
+
+# Result store
+RESULT_STORE_LOOKUPS = REGISTRY.register(Counter(
+    'navassist_result_store_lookups_total',
+    'Persistent result store lookups for uploaded frames',
+    ['result']
+))
+
+# Analysis job queue (ANALYSIS_MODE=queue)
+JOB_QUEUE_WAIT = REGISTRY.register(Histogram(
+    'navassist_job_queue_wait_seconds',
+    'Time analysis jobs waited in the queue before a worker took them'
+))
+JOB_RESULTS = REGISTRY.register(Counter(
+    'navassist_job_results_total',
+    'Analysis jobs by outcome',
+    ['status']
+))
+JOB_QUEUE_DEPTH = REGISTRY.register(Gauge('navassist_job_queue_depth', 'Analysis jobs waiting for a worker'))
+JOB_WORKERS = REGISTRY.register(Gauge('navassist_job_workers', 'Analysis workers with a recent heartbeat'))
+JOB_WORKER_UTILISATION = REGISTRY.register(Gauge(
+    'navassist_job_worker_utilisation',
+    'Fraction of worker slots busy'
+))
+JOB_WORKERS_DESIRED = REGISTRY.register(Gauge(
+    'navassist_job_workers_desired',
+    'Workers needed to run busy and queued jobs at the target utilisation (autoscaling signal)'
+))
@@ -0,0 +1,248 @@
+"""Persistent analysis result store keyed by image content hash."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+import config
+
+
+class ResultStore:
+    """
+    SQLite-backed cache of analysis results, shared across worker processes.
+
+    Results are keyed by the SHA-256 of the image bytes plus the backend and
+    feature set that produced them. The database runs in WAL mode so several
+    gunicorn workers can read concurrently while one writes. A small
+    in-process LRU sits in front of SQLite; warm() fills it at startup, and
+    with preload_app the warmed entries are shared copy-on-write by workers.
+
+    Store failures are logged and treated as misses - the cache never breaks
+    analysis.
+    """
+
+    TOUCH_INTERVAL = 60.0  # Seconds between last_used updates for a hot entry
+    EVICT_CHECK_EVERY = 50  # Puts between size checks
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None,
+                 memory_entries: Optional[int] = None):
+        """
+        Initialize result store.
+
+        Args:
+            path: SQLite database file
+            max_bytes: Evict least recently used entries beyond this total size
+            memory_entries: Size of the in-process LRU (0 disables it)
+        """
+        self.path = path or config.Config.RESULT_STORE_PATH
+        self.max_bytes = max_bytes or int(config.Config.RESULT_STORE_MAX_MB * 1024 * 1024)
+        self.memory_entries = config.Config.RESULT_STORE_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self.memory: OrderedDict = OrderedDict()  # key -> (json text, last touched)
+        self.memory_lock = threading.Lock()
+        self.local = threading.local()
+        self.puts_since_check = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted_count = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " backend TEXT NOT NULL,"
+                " features TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, reopening it after a fork."""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def content_hash(image_bytes: bytes) -> str:
+        """Hash encoded image data."""
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    @staticmethod
+    def make_key(content_hash: str, backend: str, features: str) -> str:
+        """
+        Build the store key for an image.
+
+        Args:
+            content_hash: Result of content_hash() for the image
+            backend: Name of the backend producing the result
+            features: Canonical feature set (e.g. 'analyze,read')
+        """
+        return f"{backend}:{features}:{content_hash}"
+
+    def get(self, key: str) -> Optional[Union[Dict, list]]:
+        """
+        Look up a stored result.
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            A fresh copy of the stored result, or None
+        """
+        now = time.time()
+        with self.memory_lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+        if entry is not None:
+            value, touched = entry
+            if now - touched > self.TOUCH_INTERVAL:
+                self._touch(key, now)
+                self._remember(key, value, now)
+            self.hits += 1
+            return json.loads(value)
+
+        try:
+            row = self._connection().execute("SELECT value, last_used FROM results WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"[ResultStore] Lookup failed: {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+
+        value, last_used = row
+        if now - last_used > self.TOUCH_INTERVAL:
+            self._touch(key, now)
+        self._remember(key, value, now)
+        self.hits += 1
+        return json.loads(value)
+
+    def put(self, key: str, result: Union[Dict, list]):
+        """
+        Store a result.
+
+        Args:
+            key: Key from make_key()
+            result: JSON-serialisable analysis result
+        """
+        backend, features, _ = key.split(':', 2)
+        value = json.dumps(result, separators=(',', ':'))
+        now = time.time()
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO results (key, backend, features, value, size, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, backend, features, value, len(value), now, now)
+            )
+        except sqlite3.Error as e:
+            print(f"[ResultStore] Store failed: {e}")
+            return
+        self._remember(key, value, now)
+
+        self.puts_since_check += 1
+        if self.puts_since_check >= self.EVICT_CHECK_EVERY:
+            self.puts_since_check = 0
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the store is under 90% of max_bytes."""
+        try:
+            connection = self._connection()
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            rows = connection.execute("SELECT key, size FROM results ORDER BY last_used").fetchall()
+            doomed = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                doomed.append((key,))
+                total -= size
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany("DELETE FROM results WHERE key = ?", doomed)
+            with self.memory_lock:
+                for (key,) in doomed:
+                    self.memory.pop(key, None)
+            self.evicted_count += len(doomed)
+            print(f"[ResultStore] Evicted {len(doomed)} results")
+        except sqlite3.Error as e:
+            print(f"[ResultStore] Eviction failed: {e}")
+
+    def warm(self, limit: Optional[int] = None) -> int:
+        """
+        Load the most recently used results into the in-process cache.
+
+        Args:
+            limit: Number of entries to load (defaults to RESULT_STORE_WARM_ENTRIES)
+
+        Returns:
+            Number of entries loaded
+        """
+        limit = config.Config.RESULT_STORE_WARM_ENTRIES if limit is None else limit
+        limit = min(limit, self.memory_entries)
+        if limit <= 0:
+            return 0
+        try:
+            rows = self._connection().execute(
+                "SELECT key, value, last_used FROM results ORDER BY last_used DESC LIMIT ?", (limit,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"[ResultStore] Warm-up failed: {e}")
+            return 0
+        # Insert oldest first so the most recent end up at the LRU's hot end
+        for key, value, last_used in reversed(rows):
+            self._remember(key, value, last_used)
+        return len(rows)
+
+    def _remember(self, key: str, value: str, touched: float):
+        """Add an entry to the in-process LRU."""
+        if self.memory_entries <= 0:
+            return
+        with self.memory_lock:
+            self.memory[key] = (value, touched)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def _touch(self, key: str, now: float):
+        """Record that an entry was used, for LRU eviction."""
+        try:
+            self._connection().execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            pass  # Recency is best-effort
+
+    def get_stats(self) -> Dict:
+        """Get store statistics."""
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'memory_entries': len(self.memory),
+            'evicted': self.evicted_count,
+            'max_bytes': self.max_bytes
+        }
+        try:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+            stats['entries'] = entries
+            stats['bytes'] = size
+        except sqlite3.Error:
+            pass
+        return stats
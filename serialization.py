@@ -0,0 +1,183 @@
+"""Compact JSON encoding of analysis results, with response profiles and cached encodings.
+
+Analysis responses are encoded with orjson when it is installed (several
+times faster than the stdlib encoder), with floats rounded to the precision
+the clients use. A profile trims each result to the fields a client needs:
+
+- 'full': every field
+- 'ui': what the browser UI shows (no categories, object positions or face
+  positions; at most 10 tags)
+- 'minimal': obstacles (name, distance and position) and the description
+
+Published results are immutable, so a session keeps the encodings of its
+latest result per profile (see SessionState.encode): SSE subscribers,
+polling clients and shed responses reading that result share one encoding.
+Other results (such as a result trimmed to the requested features) are
+encoded each time.
+"""
+import json
+import time
+from typing import Dict, Optional
+import config
+import metrics
+from analysis_pipeline import FEATURES
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder is used instead
+    orjson = None
+
+
+PROFILES = ('minimal', 'ui', 'full')
+# Profile -> field -> kept item keys (tuple), maximum list length (int) or the whole value (None);
+# fields not listed are dropped, and keys that are not analysis fields (such as 'error') are kept
+PROFILE_FIELDS = {
+    'minimal': {
+        'obstacles': ('name', 'distance_estimate', 'position'),
+        'description': None
+    },
+    'ui': {
+        'obstacles': ('name', 'distance_estimate', 'position'),
+        'description': None,
+        'objects': ('name', 'confidence'),
+        'text': None,
+        'tags': 10,
+        'faces': ('age', 'gender', 'emotion')
+    }
+}
+FLOAT_DIGITS = 3  # Confidences, ages
+COORDINATE_DIGITS = 1  # Pixel positions and polygons
+COORDINATE_KEYS = ('position', 'bounding_box')
+
+
+def parse_profile(value: Optional[str]) -> str:
+    """
+    Parse a response profile name.
+
+    Args:
+        value: 'minimal', 'ui' or 'full'; None or empty for RESPONSE_PROFILE
+
+    Returns:
+        The profile name
+
+    Raises:
+        ValueError: If the name is not one of PROFILES
+    """
+    profile = (value or '').strip().lower() or config.Config.RESPONSE_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}' (expected one of {', '.join(PROFILES)})")
+    return profile
+
+
+def dumps(value) -> bytes:
+    """Encode a value as compact UTF-8 JSON."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            pass  # e.g. non-string keys or numpy scalars; the stdlib encoder is more lenient
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def round_floats(value, digits: int = FLOAT_DIGITS):
+    """Round every float in a JSON-like value (coordinates to COORDINATE_DIGITS)."""
+    # Exact type checks and no call per scalar: this runs over every number of every response
+    if isinstance(value, dict):
+        rounded = {}
+        for k, v in value.items():
+            kind = type(v)
+            if kind is float:
+                rounded[k] = round(v, digits)
+            elif kind is dict or kind is list or kind is tuple:
+                rounded[k] = round_floats(v, COORDINATE_DIGITS if k in COORDINATE_KEYS else digits)
+            else:
+                rounded[k] = v
+        return rounded
+    if isinstance(value, (list, tuple)):
+        rounded = []
+        for v in value:
+            kind = type(v)
+            if kind is float:
+                rounded.append(round(v, digits))
+            elif kind is dict or kind is list or kind is tuple:
+                rounded.append(round_floats(v, digits))
+            else:
+                rounded.append(v)
+        return rounded
+    if type(value) is float:
+        return round(value, digits)
+    return value
+
+
+def trim(result: Dict, profile: str) -> Dict:
+    """Reduce a result to the fields (and item keys) of a profile."""
+    fields = PROFILE_FIELDS.get(profile)
+    if fields is None:
+        return result
+    trimmed = {}
+    for key, value in result.items():
+        if key not in FEATURES:
+            trimmed[key] = value
+        elif key in fields:
+            spec = fields[key]
+            if isinstance(spec, tuple) and isinstance(value, list):
+                value = [{k: item[k] for k in spec if k in item} for item in value]
+            elif isinstance(spec, int) and isinstance(value, list):
+                value = value[:spec]
+            trimmed[key] = value
+    return trimmed
+
+
+def encode_analysis(result: Dict, profile: str = 'full', cache: Optional[Dict[str, bytes]] = None) -> bytes:
+    """
+    Encode an analysis result for a response profile.
+
+    Args:
+        result: Analysis dictionary
+        profile: One of PROFILES
+        cache: Profile -> bytes of this result, to reuse and fill; it must
+            belong to result, which must not be mutated afterwards (published
+            results never are)
+
+    Returns:
+        JSON bytes
+    """
+    if cache is not None:
+        payload = cache.get(profile)
+        if payload is not None:
+            metrics.SERIALIZATION_CACHE.inc(result='hit')
+            return payload
+
+    started = time.perf_counter()
+    payload = dumps(round_floats(trim(result, profile)))
+    _observe(started, payload, profile)
+    if cache is not None:
+        metrics.SERIALIZATION_CACHE.inc(result='miss')
+        cache[profile] = payload  # Racing encoders store equal bytes
+    return payload
+
+
+def encode_record(record: Dict, result: Dict, profile: str = 'full') -> bytes:
+    """
+    Encode a record with an analysis result under 'result' (e.g. one line of a batch response).
+
+    Unlike encode_analysis(), the bytes are not cached: each record is sent once.
+
+    Args:
+        record: Fields sent alongside the result
+        result: Analysis dictionary
+        profile: One of PROFILES
+
+    Returns:
+        JSON bytes
+    """
+    started = time.perf_counter()
+    payload = dumps(dict(record, result=round_floats(trim(result, profile))))
+    _observe(started, payload, profile)
+    return payload
+
+
+def _observe(started: float, payload: bytes, profile: str):
+    """Record encode time and payload size."""
+    metrics.SERIALIZATION_LATENCY.observe(time.perf_counter() - started, profile=profile)
+    metrics.RESPONSE_BYTES.observe(len(payload), profile=profile)
@@ -0,0 +1,307 @@
+"""Per-session pipeline state and session registry."""
+import itertools
+import threading
+import time
+from typing import Collection, Dict, Optional, Tuple
+import config
+from adaptive_control import CaptureController
+from analysis_pipeline import FEATURES
+from event_stream import AnalysisBroadcaster
+from serialization import encode_analysis
+
+
+class RateBudget:
+    """Token bucket limiting how many analyses a session may run per minute."""
+
+    def __init__(self, per_minute: float):
+        """
+        Initialize rate budget.
+
+        Args:
+            per_minute: Sustained number of analyses allowed per minute
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, per_minute / 6.0)  # Allow ~10 seconds of burst
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_consume(self) -> bool:
+        """Take one token. Returns False if the budget is exhausted."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+    def seconds_until_available(self) -> float:
+        """Estimate seconds until the next token is available."""
+        with self.lock:
+            missing = 1.0 - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else 60.0
+
+    def remaining(self) -> float:
+        """Get the number of tokens currently available."""
+        with self.lock:
+            elapsed = time.monotonic() - self.updated_at
+            return min(self.capacity, self.tokens + elapsed * self.rate)
+
+
+class SessionState:
+    """
+    Pipeline state owned by a single client session.
+
+    The latest result is held as one immutable (analysis, timestamp) tuple.
+    Writers publish by swapping the reference and readers take the reference
+    once, so readers never need a lock and never see a half-updated result.
+    With the two-lane pipeline, the fast and slow lanes each publish their
+    own fields; the lane writers are serialised so neither overwrites the
+    other's latest fields.
+    """
+
+    def __init__(self, session_id: str):
+        """
+        Initialize session state.
+
+        Args:
+            session_id: Client-supplied session identifier
+        """
+        self.session_id = session_id
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        self.processing_enabled = False
+        self.frame_counter = itertools.count(1)
+        self.frame_count = 0
+        self.snapshot: Tuple[Dict, float] = ({}, 0.0)
+        self.encodings: Tuple[Dict, Dict[str, bytes]] = ({}, {})  # Latest result and its encodings per profile
+        self.broadcaster = AnalysisBroadcaster()
+        self.rate_budget = RateBudget(config.Config.SESSION_ANALYSES_PER_MINUTE)
+        self.capture = CaptureController()
+        self.last_announcements: Dict[str, float] = {}
+        self.lanes: Dict[str, Dict] = {}  # Latest fields per pipeline lane
+        self.lane_lock = threading.Lock()
+        self.enrichment_running = False
+        self.enrichment_started_at = 0.0
+        self.last_face_frame = 0
+        self.face_tracker = None  # face_predetector.FaceTracker, created on first use
+        self.low_quality_streak = 0  # Uploaded frames rejected by the quality gate in a row
+
+    def touch(self):
+        """Mark the session as active."""
+        self.last_seen = time.time()
+
+    def next_frame(self) -> int:
+        """Advance and return this session's frame counter."""
+        # next() on itertools.count is atomic under the GIL
+        self.frame_count = next(self.frame_counter)
+        return self.frame_count
+
+    def publish(self, analysis: Dict):
+        """
+        Publish a new analysis result for this session.
+
+        Args:
+            analysis: Analysis dictionary (must not be mutated afterwards)
+        """
+        encodings = {}
+        self.encodings = (analysis, encodings)
+        self.snapshot = (analysis, time.time())
+        self.broadcaster.publish(analysis, encodings)
+
+    def publish_lane(self, lane: str, fields: Dict, features: Optional[Collection[str]] = None) -> Dict:
+        """
+        Merge one lane's result into the latest result and publish it.
+
+        Fast-lane fields (objects, obstacles) take precedence; slow-lane
+        fields (description, text, faces) stay until the next enrichment.
+        Only the requested features are replaced: the lane's other fields
+        are kept from its previous result.
+
+        Args:
+            lane: 'fast' or 'slow'
+            fields: The lane's result (must not be mutated afterwards)
+            features: Features the lane was asked for (see analysis_pipeline.FEATURES); None for all
+
+        Returns:
+            The published analysis
+        """
+        with self.lane_lock:
+            if features is not None:
+                kept = {k: v for k, v in self.lanes.get(lane, {}).items() if k in FEATURES and k not in features}
+                fields = dict(kept, **fields)
+            self.lanes = dict(self.lanes, **{lane: fields})
+            merged = dict(self.lanes.get('slow', {}))
+            merged.update(self.lanes.get('fast', {}))
+            self.publish(merged)
+        return merged
+
+    def try_start_enrichment(self, interval: float) -> Optional[str]:
+        """
+        Claim the slow lane for a frame of this session.
+
+        Args:
+            interval: Minimum seconds between enrichments
+
+        Returns:
+            None if the caller should enrich this frame (and must call
+            finish_enrichment() afterwards), else the reason it should not
+        """
+        with self.lane_lock:
+            if self.enrichment_running:
+                return 'busy'
+            now = time.time()
+            if now - self.enrichment_started_at < interval:
+                return 'interval'
+            self.enrichment_running = True
+            self.enrichment_started_at = now
+            return None
+
+    def finish_enrichment(self):
+        """Release the slow lane claimed by try_start_enrichment()."""
+        self.enrichment_running = False
+
+    def latest(self) -> Tuple[Dict, float]:
+        """Get the latest (analysis, timestamp) snapshot."""
+        return self.snapshot
+
+    def encode(self, analysis: Dict, profile: str = 'full') -> bytes:
+        """
+        Encode an analysis result for a response profile (see serialization.PROFILES).
+
+        The latest published result is encoded once per profile; any other
+        result is encoded on every call.
+        """
+        published, encodings = self.encodings
+        return encode_analysis(analysis, profile, encodings if analysis is published else None)
+
+    def should_announce(self, text: str) -> bool:
+        """
+        Check whether text should be spoken, suppressing recent repeats.
+
+        Args:
+            text: Announcement text
+
+        Returns:
+            True if the same text was not announced within the repeat interval
+        """
+        now = time.time()
+        last = self.last_announcements.get(text)
+        if last is not None and now - last < config.Config.ANNOUNCEMENT_REPEAT_INTERVAL:
+            return False
+
+        # Drop expired entries so the map stays small
+        if len(self.last_announcements) > 50:
+            self.last_announcements = {
+                t: ts for t, ts in self.last_announcements.items()
+                if now - ts < config.Config.ANNOUNCEMENT_REPEAT_INTERVAL
+            }
+        self.last_announcements[text] = now
+        return True
+
+    def is_idle(self, now: float, idle_timeout: float) -> bool:
+        """Check whether the session can be evicted."""
+        if self.processing_enabled or self.broadcaster.subscriber_count > 0:
+            return False
+        return now - self.last_seen > idle_timeout
+
+    def get_stats(self) -> Dict:
+        """Get session statistics."""
+        return {
+            'frame_count': self.frame_count,
+            'processing_enabled': self.processing_enabled,
+            'last_analysis_at': self.snapshot[1] or None,
+            'last_enrichment_at': self.enrichment_started_at or None,
+            'rate_budget_remaining': round(self.rate_budget.remaining(), 2),
+            'capture': self.capture.get_stats(),
+            'analysis_stream': self.broadcaster.get_stats()
+        }
+
+
+class SessionRegistry:
+    """
+    Registry of active sessions with idle eviction.
+
+    Lookups of existing sessions are plain dict reads; the lock is only taken
+    to create or evict sessions, so concurrent requests from different
+    sessions do not contend.
+    """
+
+    def __init__(self, idle_timeout: Optional[float] = None, max_sessions: Optional[int] = None):
+        """
+        Initialize session registry.
+
+        Args:
+            idle_timeout: Seconds of inactivity before a session is evicted
+            max_sessions: Maximum number of sessions kept in memory
+        """
+        self.idle_timeout = idle_timeout or config.Config.SESSION_IDLE_TIMEOUT
+        self.max_sessions = max_sessions or config.Config.MAX_SESSIONS
+        self.sessions: Dict[str, SessionState] = {}
+        self.lock = threading.Lock()
+        self.last_sweep = time.time()
+        self.evicted_count = 0
+
+    def get(self, session_id: str) -> SessionState:
+        """
+        Get the session for an id, creating it if needed.
+
+        Args:
+            session_id: Client-supplied session identifier
+
+        Returns:
+            SessionState for the id
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            with self.lock:
+                session = self.sessions.get(session_id)
+                if session is None:
+                    if len(self.sessions) >= self.max_sessions:
+                        self._evict_locked(force=True)
+                    session = SessionState(session_id)
+                    self.sessions[session_id] = session
+        session.touch()
+
+        if time.time() - self.last_sweep > min(60.0, self.idle_timeout / 2):
+            self.evict_idle()
+
+        return session
+
+    def evict_idle(self):
+        """Evict sessions that have been idle longer than the timeout."""
+        with self.lock:
+            self._evict_locked(force=False)
+
+    def _evict_locked(self, force: bool):
+        """Evict idle sessions; if force, also evict the least recently seen one."""
+        now = time.time()
+        self.last_sweep = now
+        keep = {}
+        evicted = []
+        for session_id, session in self.sessions.items():
+            if session.is_idle(now, self.idle_timeout):
+                evicted.append(session)
+            else:
+                keep[session_id] = session
+
+        if force and len(keep) >= self.max_sessions:
+            candidates = [s for s in keep.values() if s.is_idle(now, 0)]
+            if candidates:
+                oldest = min(candidates, key=lambda s: s.last_seen)
+                evicted.append(keep.pop(oldest.session_id))
+
+        # Swap in the new dict so readers never see it mid-update
+        self.sessions = keep
+        for session in evicted:
+            session.broadcaster.close()
+        self.evicted_count += len(evicted)
+
+    def get_stats(self) -> Dict:
+        """Get registry statistics."""
+        return {
+            'active_sessions': len(self.sessions),
+            'evicted_sessions': self.evicted_count
+        }
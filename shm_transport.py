@@ -0,0 +1,146 @@
+"""Shared-memory frame ring for passing frames between processes.
+
+One writer process copies frames into a fixed ring of slots in a
+multiprocessing.shared_memory block; readers in other processes copy them
+out by sequence number. Only the sequence number needs to travel through a
+queue, so a 2.7 MB 720p frame is never pickled.
+
+Each slot is guarded by a seqlock: the writer sets the slot's sequence word
+to an odd value while copying and to an even value when done, and a reader
+accepts a copy only if the word was even and unchanged across its copy. A
+reader that falls more than a ring's length behind the writer gets None
+instead of a torn or newer frame.
+"""
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+import numpy as np
+
+
+RING_HEADER_DTYPE = np.dtype([('slots', '<u8'), ('slot_bytes', '<u8'), ('latest', '<i8')], align=True)
+SLOT_HEADER_DTYPE = np.dtype([
+    ('seq', '<u8'),  # 2 * frame sequence + 1 while writing, + 2 when complete
+    ('height', '<u4'),
+    ('width', '<u4'),
+    ('channels', '<u4'),
+    ('captured_ns', '<u8')
+], align=True)
+ALIGNMENT = 64
+
+
+def _aligned(size: int) -> int:
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class FrameRing:
+    """Fixed-size ring of frame slots in shared memory (one writer, many readers)."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """Use FrameRing.create() or FrameRing.attach()."""
+        self.shm = shm
+        self.owner = owner
+        self.name = shm.name
+        self.ring_header = np.ndarray((), RING_HEADER_DTYPE, buffer=shm.buf)
+        self.slots = int(self.ring_header['slots'])
+        self.slot_bytes = int(self.ring_header['slot_bytes'])
+        headers_offset = _aligned(RING_HEADER_DTYPE.itemsize)
+        self.headers = np.ndarray((self.slots,), SLOT_HEADER_DTYPE, buffer=shm.buf, offset=headers_offset)
+        data_offset = _aligned(headers_offset + SLOT_HEADER_DTYPE.itemsize * self.slots)
+        self.data = np.ndarray((self.slots, self.slot_bytes), np.uint8, buffer=shm.buf, offset=data_offset)
+        self.next_seq = 0  # Writer side only
+
+    @classmethod
+    def create(cls, slots: int, max_shape: Tuple[int, int, int]) -> 'FrameRing':
+        """
+        Create a ring (the creating process owns it and unlinks it on close).
+
+        Args:
+            slots: Number of frame slots
+            max_shape: Largest (height, width, channels) frame that fits a slot
+        """
+        slot_bytes = _aligned(int(np.prod(max_shape)))
+        headers_size = _aligned(_aligned(RING_HEADER_DTYPE.itemsize) + SLOT_HEADER_DTYPE.itemsize * slots)
+        shm = shared_memory.SharedMemory(create=True, size=headers_size + slot_bytes * slots)
+        ring_header = np.ndarray((), RING_HEADER_DTYPE, buffer=shm.buf)
+        ring_header['slots'] = slots
+        ring_header['slot_bytes'] = slot_bytes
+        ring_header['latest'] = -1
+        del ring_header  # Views must not outlive the block
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'FrameRing':
+        """Attach to a ring created by another process."""
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)  # The creator unlinks it
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+    def write(self, frame: np.ndarray, captured_ns: Optional[int] = None) -> int:
+        """
+        Copy a frame into the next slot (writer process only).
+
+        Args:
+            frame: uint8 frame of at most the ring's max_shape
+            captured_ns: Capture time (Unix nanoseconds)
+
+        Returns:
+            The frame's sequence number, for read()
+        """
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes} byte slot")
+        seq = self.next_seq
+        self.next_seq += 1
+        header = self.headers[seq % self.slots]
+        header['seq'] = 2 * seq + 1
+        height, width = frame.shape[:2]
+        header['height'] = height
+        header['width'] = width
+        header['channels'] = frame.shape[2] if frame.ndim == 3 else 1
+        header['captured_ns'] = captured_ns if captured_ns is not None else time.time_ns()
+        self.data[seq % self.slots, :frame.nbytes] = np.ascontiguousarray(frame).reshape(-1)
+        header['seq'] = 2 * seq + 2
+        self.ring_header['latest'] = seq
+        return seq
+
+    def read(self, seq: int) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Copy a frame out of the ring.
+
+        Args:
+            seq: Sequence number returned by write()
+
+        Returns:
+            (frame, captured_ns), or None if the slot has since been reused
+        """
+        header = self.headers[seq % self.slots]
+        expected = 2 * seq + 2
+        if int(header['seq']) != expected:
+            return None
+        height, width, channels = int(header['height']), int(header['width']), int(header['channels'])
+        captured_ns = int(header['captured_ns'])
+        size = height * width * channels
+        if size > self.slot_bytes:
+            return None  # Header read while the writer was changing it
+        frame = self.data[seq % self.slots, :size].copy()
+        if int(header['seq']) != expected:
+            return None
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        return frame.reshape(shape), captured_ns
+
+    def latest(self) -> Optional[Tuple[np.ndarray, int]]:
+        """Copy out the most recently written frame (see read())."""
+        seq = int(self.ring_header['latest'])
+        return self.read(seq) if seq >= 0 else None
+
+    def close(self):
+        """Detach from the ring; the owner also frees it."""
+        self.ring_header = self.headers = self.data = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
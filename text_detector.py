@@ -0,0 +1,199 @@
+"""Fast CPU text-presence detector used to gate and crop OCR requests.
+
+Character candidates are found with MSER (maximally stable extremal
+regions) on a downscaled grayscale frame. Candidates of character-like
+shape are joined into lines by dilating them horizontally; a line needs
+several candidates of similar height. On 1 vCPU, detection takes about
+50 ms on a 720p frame with a few signs, against hundreds of milliseconds
+(and an API call) for OCR. Noise and fine texture (foliage, gravel, fabric)
+yield thousands of candidates; such frames stop after MSER (about 60 ms at
+640x480, 90 ms at 720p) and are read whole instead of being judged.
+
+prepare_ocr() uses the detector to decide, per frame, whether to skip OCR,
+send a mosaic of the text regions, or send the whole frame.
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+import config
+from image_utils import Box, build_mosaic, decode_image, map_polygon, merge_boxes, pad_box
+
+
+DETECT_WIDTH = 960  # Frames are searched for text at this width
+MIN_CHAR_HEIGHT = 4  # Pixels, at DETECT_WIDTH
+MIN_CHARS_PER_LINE = 3
+
+
+def find_text_regions(gray: np.ndarray) -> Optional[List[Box]]:
+    """
+    Find regions of a frame likely to contain text.
+
+    Args:
+        gray: Grayscale frame
+
+    Returns:
+        (x, y, width, height) boxes in frame coordinates, one per text line;
+        None if MSER finds more than OCR_GATE_MAX_REGIONS candidates, so the
+        frame is too busy to judge
+    """
+    height, width = gray.shape[:2]
+    scale = 1.0
+    if width > DETECT_WIDTH:
+        scale = DETECT_WIDTH / width
+        gray = cv2.resize(gray, (DETECT_WIDTH, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    small_height, small_width = gray.shape[:2]
+
+    # A light blur keeps sensor noise from breaking up character regions
+    gray = cv2.GaussianBlur(gray, (3, 3), 0)
+    mser = cv2.MSER_create(5, MIN_CHAR_HEIGHT * 2, int(small_height * small_width * 0.01), 0.5)
+    _, candidates = mser.detectRegions(gray)
+    if len(candidates) > config.Config.OCR_GATE_MAX_REGIONS:
+        return None
+
+    # Keep character-shaped candidates
+    max_char_height = small_height * 0.25
+    chars = [
+        (x, y, w, h) for x, y, w, h in candidates
+        if MIN_CHAR_HEIGHT <= h <= max_char_height and 0.1 <= w / h <= 1.5
+    ]
+    if len(chars) < MIN_CHARS_PER_LINE:
+        return []
+
+    # Join neighbouring characters into lines
+    mask = np.zeros((small_height, small_width), np.uint8)
+    for x, y, w, h in chars:
+        cv2.rectangle(mask, (x, y), (x + w - 1, y + h - 1), 255, -1)
+    median_height = int(np.median([h for _, _, _, h in chars]))
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, int(median_height * 1.5)), max(1, median_height // 4)))
+    mask = cv2.dilate(mask, kernel)
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+    # Each character lies inside the one line blob its rectangle was dilated into
+    members = defaultdict(list)
+    for char in chars:
+        members[labels[char[1], char[0]]].append(char)
+
+    lines = []
+    for label, line_chars in members.items():
+        x, y, w, h = (int(v) for v in stats[label, :4])
+        if w < h * 1.5 or _count_characters(line_chars) < MIN_CHARS_PER_LINE:
+            continue
+        x, y, w, h = _grow_line((x, y, w, h), candidates)
+        lines.append((int(x / scale), int(y / scale), int(np.ceil(w / scale)), int(np.ceil(h / scale))))
+    return lines
+
+
+def _grow_line(line: Box, candidates) -> Box:
+    """
+    Extend a line along its row over neighbouring regions of similar height.
+
+    Touching letters form regions too wide to pass the character filter, so
+    lines are often found in pieces; OCR needs the whole line.
+    """
+    x, y, w, h = line
+    cx, cy, cw, ch = (candidates[:, i] for i in range(4))
+    in_row = (ch >= 0.5 * h) & (ch <= 1.5 * h) & (np.abs(cy + ch / 2 - (y + h / 2)) <= h / 2) & (cw <= ch * 12)
+    row = sorted(zip(cx[in_row].tolist(), (cx + cw)[in_row].tolist()))
+    left, right = x, x + w
+    gap = h * 1.5
+    for start, end in row:  # Left to right, so right edges extend in order
+        if start <= right + gap and end > right and end >= left:
+            right = end
+    for start, end in reversed(row):
+        if end >= left - gap and start < left and start <= right:
+            left = start
+    return left, y, right - left, h
+
+
+def _count_characters(members: List[Box]) -> int:
+    """
+    Count distinct, aligned characters among a line's candidates.
+
+    MSER reports nested regions for one blob, so candidates are only counted
+    when they sit side by side, have similar heights and share a baseline
+    band - which a few stray blobs rarely do.
+    """
+    if len(members) < MIN_CHARS_PER_LINE:
+        return 0
+    line_height = float(np.median([h for _, _, _, h in members]))
+    line_center = float(np.median([y + h / 2 for _, y, _, h in members]))
+    count = 0
+    last_center = None
+    for x, y, w, h in sorted(members):
+        if not (0.5 * line_height <= h <= 2.0 * line_height):
+            continue
+        if abs(y + h / 2 - line_center) > line_height / 2:
+            continue
+        center = x + w / 2
+        if last_center is None or center - last_center >= line_height * 0.3:
+            count += 1
+            last_center = center
+    return count
+
+
+def text_area_fraction(regions: List[Box], frame_shape: Tuple[int, ...]) -> float:
+    """Get the fraction of the frame covered by text regions."""
+    frame_area = frame_shape[0] * frame_shape[1]
+    return sum(w * h for _, _, w, h in regions) / frame_area if frame_area else 0.0
+
+
+def has_text(image_bytes: bytes) -> bool:
+    """Check whether a frame seems to contain text (True if it cannot be decoded or judged, so the backend decides)."""
+    gray, _ = decode_image(image_bytes, config.Config.DECODE_MIN_SIZE, gray=True)
+    if gray is None:
+        return True
+    regions = find_text_regions(gray)
+    return regions is None or bool(regions)
+
+
+def prepare_ocr(image_bytes: bytes) -> Tuple[str, Optional[bytes], list, float]:
+    """
+    Decide how to OCR a frame.
+
+    Large images are decoded at reduced size (see DECODE_MIN_SIZE).
+
+    Args:
+        image_bytes: Encoded frame
+
+    Returns:
+        (decision, ocr_bytes, placements, scale) - decision is 'skip' (no
+        text found, ocr_bytes is None), 'crop' (ocr_bytes is a mosaic of the
+        text regions; map results back with map_lines(placements, scale)) or
+        'full' (ocr_bytes is the original frame)
+    """
+    if not config.Config.OCR_GATE_ENABLED:
+        return 'full', image_bytes, [], 1.0
+    gray, scale = decode_image(image_bytes, config.Config.DECODE_MIN_SIZE, gray=True)
+    if gray is None:
+        return 'full', image_bytes, [], 1.0  # Let the backend report the bad image
+
+    regions = find_text_regions(gray)
+    if regions is None:
+        return 'full', image_bytes, [], 1.0  # Too busy to judge
+    if not regions:
+        return 'skip', None, [], scale
+
+    # Fragments of one line, and lines of one sign, are cropped together
+    padded = [pad_box(box, max(4, box[3] // 2), gray.shape) for box in regions]
+    crops = merge_boxes(padded, gap=max(h for _, _, _, h in regions))
+    if text_area_fraction(crops, gray.shape) > config.Config.OCR_CROP_MAX_AREA:
+        return 'full', image_bytes, [], 1.0
+
+    crops.sort(key=lambda box: (box[1], box[0]))
+    mosaic, placements = build_mosaic(gray, crops)
+    ok, encoded = cv2.imencode('.jpg', mosaic, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    if not ok or len(encoded) >= len(image_bytes):
+        return 'full', image_bytes, [], 1.0
+    return 'crop', encoded.tobytes(), placements, scale
+
+
+def map_lines(lines: List[Dict], placements: list, scale: float = 1.0) -> List[Dict]:
+    """Map OCR line bounding boxes from mosaic to frame coordinates (scale: decoded / frame size)."""
+    mapped = []
+    for line in lines:
+        polygon = map_polygon(line.get('bounding_box'), placements)
+        if polygon and scale != 1.0:
+            polygon = [v / scale for v in polygon]
+        mapped.append(dict(line, bounding_box=polygon))
+    return mapped
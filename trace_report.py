@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Print critical-path breakdowns for the slowest frames in a trace file.
+
+Usage:
+    python trace_report.py [trace_file] [--top N] [--source camera|upload]
+"""
+import argparse
+import glob
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, List
+from config import Config
+
+
+def load_spans(path: str) -> List[Dict]:
+    """Load spans from a JSONL trace file and its rotated backups."""
+    spans = []
+    for file_path in sorted(glob.glob(f"{path}.*")) + [path]:
+        try:
+            with open(file_path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        span = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    span['start'] = int(span['startTimeUnixNano'])
+                    span['end'] = int(span['endTimeUnixNano'])
+                    span['attrs'] = {a['key']: next(iter(a['value'].values())) for a in span.get('attributes', [])}
+                    spans.append(span)
+        except FileNotFoundError:
+            continue
+    return spans
+
+
+def critical_path(span: Dict, children: Dict[str, List[Dict]], depth: int = 0) -> List[tuple]:
+    """
+    Walk backwards from the end of a span, following the child that finished last.
+
+    Returns:
+        List of (depth, span, critical_ns) tuples, where critical_ns is the
+        span's own time on the critical path (excluding critical children)
+    """
+    result = []
+    cursor = span['end']
+    own = 0
+    nested = []
+    kids = sorted(
+        (c for c in children.get(span['spanId'], []) if c['start'] < span['end']),
+        key=lambda c: c['end'],
+        reverse=True
+    )
+    for child in kids:
+        if child['end'] > cursor:
+            continue  # Overlaps a later critical child - not on the path
+        own += cursor - child['end']
+        nested = critical_path(child, children, depth + 1) + nested
+        cursor = max(span['start'], child['start'])
+    own += max(0, cursor - span['start'])
+    result.append((depth, span, own))
+    return result + nested
+
+
+def ms(nanos: int) -> float:
+    """Convert nanoseconds to milliseconds."""
+    return nanos / 1e6
+
+
+def report(spans: List[Dict], top: int, source: str = None):
+    """Print breakdowns for the slowest frames."""
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span['traceId']].append(span)
+
+    roots = []
+    for trace_spans in by_trace.values():
+        for span in trace_spans:
+            if not span.get('parentSpanId'):
+                if source is None or span['attrs'].get('source') == source:
+                    roots.append(span)
+
+    if not roots:
+        print("No frame traces found.")
+        return
+
+    durations = sorted(ms(r['end'] - r['start']) for r in roots)
+    print(f"Frames traced: {len(roots)}")
+    print(f"Frame latency: p50 {durations[len(durations) // 2]:.1f} ms, "
+          f"p95 {durations[int(len(durations) * 0.95)]:.1f} ms, max {durations[-1]:.1f} ms")
+
+    slowest = sorted(roots, key=lambda r: r['end'] - r['start'], reverse=True)[:top]
+    stage_totals = defaultdict(int)
+
+    for root in slowest:
+        trace_spans = by_trace[root['traceId']]
+        children = defaultdict(list)
+        for span in trace_spans:
+            if span.get('parentSpanId'):
+                children[span['parentSpanId']].append(span)
+
+        total = root['end'] - root['start']
+        attrs = ', '.join(f"{k}={v}" for k, v in root['attrs'].items())
+        print(f"\n=== trace {root['traceId']}  {ms(total):.1f} ms  ({attrs})")
+        print(f"    {'critical ms':>11}  {'share':>6}  span")
+        for depth, span, own in critical_path(root, children):
+            if own <= 0 and depth > 0:
+                continue
+            stage_totals[span['name']] += own
+            marker = ' !' if span.get('status', {}).get('code') == 'STATUS_CODE_ERROR' else ''
+            print(f"    {ms(own):11.1f}  {100.0 * own / total:5.1f}%  {'  ' * depth}{span['name']}"
+                  f" [{ms(span['end'] - span['start']):.1f} ms]{marker}")
+
+        # Work that finished after the frame (e.g. speech playback)
+        late = [s for s in trace_spans if s['end'] > root['end'] and s is not root]
+        for span in sorted(late, key=lambda s: s['start']):
+            print(f"    {'after frame':>11}  {'':>6}  {span['name']} "
+                  f"[+{ms(span['start'] - root['start']):.1f} ms, {ms(span['end'] - span['start']):.1f} ms]")
+
+    grand_total = sum(stage_totals.values())
+    if grand_total:
+        print(f"\n=== critical-path share across the {len(slowest)} slowest frames")
+        for name, nanos in sorted(stage_totals.items(), key=lambda kv: kv[1], reverse=True):
+            print(f"    {ms(nanos):11.1f} ms  {100.0 * nanos / grand_total:5.1f}%  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Critical-path report for the slowest traced frames")
+    parser.add_argument('trace_file', nargs='?', default=Config.TRACE_FILE, help="JSONL trace file")
+    parser.add_argument('--top', type=int, default=10, help="Number of slowest frames to show")
+    parser.add_argument('--source', choices=['camera', 'upload'], help="Only frames from this source")
+    args = parser.parse_args()
+
+    spans = load_spans(args.trace_file)
+    if not spans:
+        print(f"No spans found in {args.trace_file}")
+        return 1
+    report(spans, args.top, args.source)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""Per-frame trace spans with a sampled, buffered JSONL exporter."""
+import atexit
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import config
+
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def _new_id(num_bytes: int) -> str:
+    """Generate a random hex identifier."""
+    return os.urandom(num_bytes).hex()
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_span_id', 'name', 'start_ns', 'end_ns',
+                 'attributes', 'status', 'sampled')
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], sampled: bool,
+                 start_ns: Optional[int] = None):
+        self.trace_id = trace_id
+        self.span_id = _new_id(8) if sampled else ''
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes: Dict = {}
+        self.status = 'OK'
+        self.sampled = sampled
+
+    def set_attribute(self, key: str, value):
+        """Attach an attribute (no-op for unsampled spans)."""
+        if self.sampled:
+            self.attributes[key] = value
+
+    def set_error(self, message: str):
+        """Mark the span as failed."""
+        if self.sampled:
+            self.status = 'ERROR'
+            self.attributes['error.message'] = message
+
+    def end(self, end_ns: Optional[int] = None):
+        """Finish the span and hand it to the exporter."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if self.sampled:
+            exporter.export(self)
+
+    def to_dict(self) -> Dict:
+        """Serialise in the OpenTelemetry (OTLP/JSON) span shape."""
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_span_id or '',
+            'name': self.name,
+            'kind': 'SPAN_KIND_INTERNAL',
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': k, 'value': _attribute_value(v)} for k, v in self.attributes.items()],
+            'status': {'code': 'STATUS_CODE_ERROR' if self.status == 'ERROR' else 'STATUS_CODE_OK'}
+        }
+
+
+def _attribute_value(value) -> Dict:
+    """Encode an attribute value as an OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class SpanExporter:
+    """
+    Buffered exporter writing finished spans to a rotating JSONL file.
+
+    export() only appends to an in-memory buffer; a background thread
+    serialises and writes batches, so the frame pipeline never waits on
+    disk I/O. If the buffer is full, new spans are dropped.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int,
+                 flush_interval: float = 1.0, max_buffer: int = 10000):
+        """
+        Initialize exporter.
+
+        Args:
+            path: JSONL file to write
+            max_bytes: Rotate the file once it exceeds this size
+            backup_count: Number of rotated files to keep (path.1 ... path.N)
+            flush_interval: Seconds between background flushes
+            max_buffer: Maximum buffered spans before dropping
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.buffer: List[Span] = []
+        self.lock = threading.Lock()
+        self.flush_thread = None
+        self.dropped_count = 0
+
+    def export(self, span: Span):
+        """Queue a finished span for writing."""
+        with self.lock:
+            if len(self.buffer) >= self.max_buffer:
+                self.dropped_count += 1
+                return
+            self.buffer.append(span)
+        if self.flush_thread is None or not self.flush_thread.is_alive():
+            self._start_flush_thread()
+
+    def flush(self):
+        """Write all buffered spans to disk."""
+        with self.lock:
+            spans, self.buffer = self.buffer, []
+        if not spans:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            lines = ''.join(json.dumps(span.to_dict(), separators=(',', ':')) + '\n' for span in spans)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                size = f.tell()
+            if size > self.max_bytes:
+                self._rotate()
+        except Exception as e:
+            print(f"[Tracing] Failed to write spans: {e}")
+
+    def _rotate(self):
+        """Shift path -> path.1 -> ... -> path.N."""
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _start_flush_thread(self):
+        """Start the background flush loop."""
+        with self.lock:
+            if self.flush_thread is not None and self.flush_thread.is_alive():
+                return
+            self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self.flush_thread.start()
+
+    def _flush_loop(self):
+        """Flush buffered spans periodically."""
+        while True:
+            time.sleep(self.flush_interval)
+            if self.buffer:
+                self.flush()
+
+
+exporter = SpanExporter(
+    config.Config.TRACE_FILE,
+    config.Config.TRACE_MAX_BYTES,
+    config.Config.TRACE_BACKUP_COUNT
+)
+atexit.register(exporter.flush)
+
+
+def current_span() -> Optional[Span]:
+    """Get the active span in this context, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Span]:
+    """
+    Start a new trace (one per frame) and make its root span current.
+
+    The sampling decision is taken here; unsampled traces still get a trace
+    id but their spans are never recorded or exported.
+
+    Args:
+        name: Root span name
+        **attributes: Attributes for the root span
+    """
+    sampled = random.random() < config.Config.TRACE_SAMPLE_RATE
+    span = Span(name, _new_id(16), None, sampled)
+    for key, value in attributes.items():
+        span.set_attribute(key, value)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.set_error(str(e))
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a child span of the current (or given) span.
+
+    Outside a sampled trace this yields None and records nothing.
+
+    Args:
+        name: Span name
+        parent: Explicit parent, for work handed to another thread
+        **attributes: Span attributes
+    """
+    parent = parent or _current_span.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+
+    child = Span(name, parent.trace_id, parent.span_id, True)
+    child.attributes.update(attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.set_error(str(e))
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def record_span(name: str, start_ns: int, end_ns: int, parent: Optional[Span] = None, **attributes):
+    """
+    Record an already-finished span with explicit timestamps.
+
+    Args:
+        name: Span name
+        start_ns: Start time (Unix nanoseconds)
+        end_ns: End time (Unix nanoseconds)
+        parent: Parent span (defaults to the current span)
+        **attributes: Span attributes
+    """
+    parent = parent or _current_span.get()
+    if parent is None or not parent.sampled:
+        return
+    child = Span(name, parent.trace_id, parent.span_id, True, start_ns=start_ns)
+    child.attributes.update(attributes)
+    child.end(end_ns)
@@ -0,0 +1,11 @@
+"""WSGI entry point for production serving (e.g. gunicorn wsgi:app)."""
+from app import app, initialize_services
+
+# Load the vision backend at import time. With gunicorn's preload_app this
+# runs once in the master process, before workers are forked, so it must not
+# happen in a background thread (threads do not survive fork).
+# SERVICE_WARM_UP=lazy instead defers loading to each worker's first request.
+print("Initializing AI Navigation Assistant (production mode)...")
+initialize_services(background=False)
+
+__all__ = ['app']